@@ -22,6 +22,7 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 from src.db import Base
 from src import models  # noqa
+from src.migration_tools import record_version_applied, reset_report, report
 
 target_metadata = Base.metadata
 
@@ -54,11 +55,23 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-
+        # one transaction per revision, so revisions using autocommit blocks
+        # (CREATE INDEX CONCURRENTLY, batched backfills) commit what precedes them cleanly
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
+            on_version_apply=record_version_applied,
+        )
+
+        reset_report()
         with context.begin_transaction():
             context.run_migrations()
 
+    for step in report():
+        rows = f", {step['rows']} rows" if step["rows"] is not None else ""
+        print(f"migration step: {step['name']} ({step['seconds']}s{rows})")
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,18 @@
+"""
+Composite index for submission history pagination
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0002"
+down_revision = "20240801_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_submissions_user_created", "submissions", ["user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_submissions_user_created", table_name="submissions")
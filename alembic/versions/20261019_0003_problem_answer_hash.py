@@ -0,0 +1,79 @@
+"""
+Store the canonical answer hash for input problems
+
+The canonicalization below is a frozen copy of src/services/answers.py as of
+this revision, so replaying the migration later hashes with these rules, not
+with whatever the application's rules have become by then.
+"""
+import ast
+import hashlib
+import operator
+import re
+from fractions import Fraction
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0003"
+down_revision = "20261019_0002"
+branch_labels = None
+depends_on = None
+
+MAX_EXPRESSION_LENGTH = 64
+_BIN_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_SYMBOLS = str.maketrans({"×": "*", "·": "*", "÷": "/", "−": "-"})
+_LEADING_ZEROS = re.compile(r"(?<![\d.])0+(?=\d)")
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return Fraction(repr(node.value))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand))
+    raise ValueError("not an arithmetic expression")
+
+
+def _as_number(text):
+    if not text or len(text) > MAX_EXPRESSION_LENGTH:
+        return None
+    try:
+        return _evaluate(ast.parse(_LEADING_ZEROS.sub("", text), mode="eval"))
+    except (SyntaxError, ValueError, ZeroDivisionError, RecursionError):
+        return None
+
+
+def answer_hash(value):
+    text = " ".join(str(value).translate(_SYMBOLS).strip().lower().split())
+    number = _as_number(text)
+    if number is not None:
+        text = str(number.numerator) if number.denominator == 1 else f"{number.numerator}/{number.denominator}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column("problems", sa.Column("correct_answer_hash", sa.String(length=64), nullable=True))
+
+    problems = sa.table(
+        "problems",
+        sa.column("id", sa.Integer()),
+        sa.column("correct_answer_text", sa.String()),
+        sa.column("correct_answer_hash", sa.String()),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(problems.c.id, problems.c.correct_answer_text).where(problems.c.correct_answer_text.isnot(None))
+    ).all()
+    for problem_id, text in rows:
+        bind.execute(
+            problems.update().where(problems.c.id == problem_id).values(correct_answer_hash=answer_hash(text))
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("problems", "correct_answer_hash")
@@ -0,0 +1,59 @@
+"""
+Per-attempt progress counters and precomputed problem/lesson stats
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0004"
+down_revision = "20261019_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows were only written for correct answers: count them as one correct attempt
+    op.add_column("user_problem_progress", sa.Column("attempts", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("user_problem_progress", sa.Column("correct_attempts", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("user_problem_progress", sa.Column("first_attempt_correct", sa.Boolean(), nullable=False, server_default=sa.text("false")))
+    op.alter_column("user_problem_progress", "attempts", server_default="0")
+    op.alter_column("user_problem_progress", "correct_attempts", server_default="0")
+
+    op.create_table(
+        "problem_stats",
+        sa.Column("problem_id", sa.Integer(), sa.ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("correct", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_try_correct", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_problem_stats_lesson_id", "problem_stats", ["lesson_id"])
+
+    op.create_table(
+        "lesson_stats",
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("correct", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_try_correct", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.execute(
+        "INSERT INTO problem_stats (problem_id, lesson_id, attempts, correct, first_try_correct) "
+        "SELECT upp.problem_id, p.lesson_id, sum(upp.attempts), sum(upp.correct_attempts), "
+        "count(*) FILTER (WHERE upp.first_attempt_correct) "
+        "FROM user_problem_progress upp JOIN problems p ON p.id = upp.problem_id "
+        "GROUP BY upp.problem_id, p.lesson_id"
+    )
+    op.execute(
+        "INSERT INTO lesson_stats (lesson_id, attempts, correct, first_try_correct) "
+        "SELECT lesson_id, sum(attempts), sum(correct), sum(first_try_correct) FROM problem_stats GROUP BY lesson_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("lesson_stats")
+    op.drop_index("ix_problem_stats_lesson_id", table_name="problem_stats")
+    op.drop_table("problem_stats")
+    op.drop_column("user_problem_progress", "first_attempt_correct")
+    op.drop_column("user_problem_progress", "correct_attempts")
+    op.drop_column("user_problem_progress", "attempts")
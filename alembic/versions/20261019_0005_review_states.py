@@ -0,0 +1,33 @@
+"""
+Spaced-repetition review state per user and problem
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0005"
+down_revision = "20261019_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "review_states",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("problem_id", sa.Integer(), sa.ForeignKey("problems.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("ease", sa.Float(), nullable=False, server_default="2.5"),
+        sa.Column("interval_days", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("repetitions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("lapses", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.UniqueConstraint("user_id", "problem_id", name="uq_review_user_problem"),
+    )
+    op.create_index("ix_review_states_user_due", "review_states", ["user_id", "due_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_review_states_user_due", table_name="review_states")
+    op.drop_table("review_states")
@@ -0,0 +1,19 @@
+"""
+Partial index on solved user_problem_progress rows, built concurrently
+"""
+from src.migration_tools import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0006"
+down_revision = "20261019_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_concurrently("ix_user_problem_solved", "user_problem_progress", ["user_id", "problem_id"],
+                              where="is_correct")
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_user_problem_solved", "user_problem_progress")
@@ -0,0 +1,39 @@
+"""
+Transactional outbox for derived aggregates
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0007"
+down_revision = "20261019_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("topic", sa.String(length=100), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_outbox_events_pending", "outbox_events", ["id"], postgresql_where=sa.text("processed_at IS NULL"))
+    op.create_table(
+        "outbox_checkpoints",
+        sa.Column("consumer", sa.String(length=100), primary_key=True),
+        sa.Column("last_event_id", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("events_processed", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("events_failed", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("outbox_checkpoints")
+    op.drop_index("ix_outbox_events_pending", table_name="outbox_events")
+    op.drop_table("outbox_events")
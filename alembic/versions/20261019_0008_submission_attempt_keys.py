@@ -0,0 +1,35 @@
+"""
+Idempotency keys table for submissions
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0008"
+down_revision = "20261019_0007"
+branch_labels = None
+depends_on = None
+
+# keep in sync with IDEMPOTENCY_WINDOW_DAYS in src/services/submit.py
+BACKFILL_DAYS = 30
+
+
+def upgrade() -> None:
+    op.create_table(
+        "submission_attempt_keys",
+        sa.Column("attempt_id", sa.String(length=64), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_submission_attempt_keys_created_at", "submission_attempt_keys", ["created_at"])
+    op.execute(
+        "INSERT INTO submission_attempt_keys (attempt_id, user_id, created_at) "
+        "SELECT attempt_id, user_id, created_at FROM submissions "
+        f"WHERE created_at >= now() - interval '{BACKFILL_DAYS} days' "
+        "ON CONFLICT DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_submission_attempt_keys_created_at", table_name="submission_attempt_keys")
+    op.drop_table("submission_attempt_keys")
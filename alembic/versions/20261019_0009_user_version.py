@@ -0,0 +1,20 @@
+"""
+Version column for optimistic locking of users
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0009"
+down_revision = "20261019_0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # a constant default is stored in the catalog, so existing rows are not rewritten
+    op.add_column("users", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "version")
@@ -0,0 +1,41 @@
+"""
+Content revisions and lesson tombstones for delta sync
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0010"
+down_revision = "20261019_0009"
+branch_labels = None
+depends_on = None
+
+CONTENT_TABLES = ("lessons", "problems", "problem_options")
+NEXT_REVISION = sa.text("nextval('content_revision_seq')")
+UTC_NOW = sa.text("(now() at time zone 'utc')")
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE content_revision_seq")
+    for table in CONTENT_TABLES:
+        # a volatile default rewrites the table and numbers the existing rows
+        op.add_column(table, sa.Column("revision", sa.BigInteger(), nullable=False, server_default=NEXT_REVISION))
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=UTC_NOW))
+    op.create_index("ix_lessons_revision", "lessons", ["revision"])
+    op.create_table(
+        "lesson_tombstones",
+        sa.Column("lesson_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("revision", sa.BigInteger(), nullable=False, server_default=NEXT_REVISION),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False, server_default=UTC_NOW),
+    )
+    op.create_index("ix_lesson_tombstones_revision", "lesson_tombstones", ["revision"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_tombstones_revision", table_name="lesson_tombstones")
+    op.drop_table("lesson_tombstones")
+    op.drop_index("ix_lessons_revision", table_name="lessons")
+    for table in CONTENT_TABLES:
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "revision")
+    op.execute("DROP SEQUENCE content_revision_seq")
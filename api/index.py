@@ -7,11 +7,16 @@ from urllib.parse import urlparse
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import Flask app
-from app import create_app
+# The Flask app is created on the first request, not when the module is loaded
+_app = None
 
-# Create Flask app instance
-app = create_app()
+
+def get_app():
+    global _app
+    if _app is None:
+        from app import create_app
+        _app = create_app()
+    return _app
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -21,6 +26,7 @@ class handler(BaseHTTPRequestHandler):
             path = parsed_url.path
             
             # Create Flask request context
+            app = get_app()
             with app.test_request_context(path, query_string=parsed_url.query):
                 response = app.full_dispatch_request()
                 
@@ -59,6 +65,7 @@ class handler(BaseHTTPRequestHandler):
             post_data = self.rfile.read(content_length) if content_length > 0 else b''
             
             # Create Flask request context
+            app = get_app()
             with app.test_request_context(path, data=post_data, method='POST'):
                 response = app.full_dispatch_request()
                 
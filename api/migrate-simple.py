@@ -6,11 +6,12 @@ import json
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.db import engine, SessionLocal
+# src.db is imported inside the handler so loading this module stays cheap
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
+            from src.db import engine
             if engine is None:
                 self.send_response(503)
                 self.send_header('Content-Type', 'application/json')
@@ -6,13 +6,12 @@ import json
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.db import engine, SessionLocal
-from alembic import command
-from alembic.config import Config
+# src.db and alembic are imported inside the handler so loading this module stays cheap
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
+            from src.db import engine
             if engine is None:
                 self.send_response(503)
                 self.send_header('Content-Type', 'application/json')
@@ -48,6 +47,9 @@ class handler(BaseHTTPRequestHandler):
                     if not os.path.exists(alembic_dir):
                         raise Exception("Alembic directory not found")
                     
+                    from alembic import command
+                    from alembic.config import Config
+
                     # Create Alembic config
                     alembic_cfg = Config()
                     alembic_cfg.set_main_option("script_location", "alembic")
@@ -65,6 +67,7 @@ class handler(BaseHTTPRequestHandler):
                     
                     # Run migration
                     command.upgrade(alembic_cfg, "head")
+                    from src.migration_tools import report
                     
                     self.send_response(200)
                     self.send_header('Content-Type', 'application/json')
@@ -72,7 +75,8 @@ class handler(BaseHTTPRequestHandler):
                     self.wfile.write(json.dumps({
                         'status': 'success',
                         'message': 'Database migration completed successfully using Alembic',
-                        'method': 'alembic'
+                        'method': 'alembic',
+                        'steps': report()
                     }).encode())
                     return
                     
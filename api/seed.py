@@ -1,17 +1,23 @@
+from __future__ import annotations
 import os
 import sys
 from http.server import BaseHTTPRequestHandler
 import json
+from typing import TYPE_CHECKING
 
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.models import User, Lesson, Problem, ProblemOption
-from sqlalchemy import select, create_engine
-from sqlalchemy.orm import sessionmaker, Session
+# SQLAlchemy and the models are imported by the functions that use them so
+# loading this module stays cheap
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
 
 def create_db_session():
     """Create a database session using the environment variable"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
     database_url = os.getenv("POSTGRES_URL_NON_POOLING") or os.getenv("DATABASE_URL")
     if not database_url:
         return None
@@ -25,6 +31,8 @@ def create_db_session():
     return SessionLocal()
 
 def ensure_demo_user(db: Session):
+    from src.models import User
+
     user = db.get(User, 1)
     if not user:
         user = User(id=1, username="demo", total_xp=0, current_streak=0, best_streak=0)
@@ -32,6 +40,9 @@ def ensure_demo_user(db: Session):
     return user
 
 def create_lessons(db: Session):
+    from sqlalchemy import select
+    from src.models import Lesson, Problem, ProblemOption
+
     if db.scalar(select(Lesson).limit(1)):
         return "Lessons already exist"
 
@@ -1,9 +1,12 @@
 import os
-from flask import Flask, send_from_directory, request, jsonify
+from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 from src.routes import register_routes
+from src.compression import init_compression
+from src.static_manifest import StaticManifest, serve_path
+from src.request_session import init_request_sessions
 from src.db import init_db
 
 load_dotenv()
@@ -12,6 +15,7 @@ def create_app() -> Flask:
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.getenv("APP_SECRET_KEY", "dev")
     CORS(app, resources={r"/api/*": {"origins": "*"}})
+    init_compression(app)
 
     # Only initialize DB if not in serverless environment
     if not os.getenv("VERCEL"):
@@ -22,20 +26,28 @@ def create_app() -> Flask:
             # Continue without DB initialization in serverless
 
     # Register routes
+    init_request_sessions(app)
     register_routes(app)
 
     @app.get("/api/health")
     def health():
         return {"status": "ok"}
 
-    # Serve frontend static files
+    @app.get("/api/health/ready")
+    def health_ready():
+        """Cached DB latency, pool saturation and migration head; 503 when the DB is unavailable"""
+        from src.health import readiness
+        return readiness()
+
+    # Serve frontend static files from a manifest built once at startup
+    dist_dir = os.getenv("FRONTEND_DIST_DIR", os.path.join(app.root_path, "..", "frontend", "dist"))
+    manifest = StaticManifest.build(os.path.normpath(dist_dir))
+    app.extensions["static_manifest"] = manifest
+
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
-        if path != "" and os.path.exists(f"../frontend/dist/{path}"):
-            return send_from_directory('../frontend/dist', path)
-        else:
-            return send_from_directory('../frontend/dist', 'index.html')
+        return serve_path(manifest, path)
 
     return app
 
@@ -0,0 +1,127 @@
+"""
+Memory footprint of the full catalog: dicts of ORM objects vs CompactCatalog.
+
+Generates a synthetic catalog of `--problems` problems (10 per lesson, half
+multiple choice with 4 options, half free input) in Python. Each variant is
+built from a fresh row generator, so the strings it keeps are counted. The
+tracemalloc size is reported for both variants, along with the time for
+`--lookups` grading lookups (find a problem in its lesson, then check an
+option or read the answer hash). No database is needed.
+
+The ORM objects are transient. Objects loaded through a Session also carry
+identity map and loaded-state overhead, so the baseline is a lower bound.
+
+    python scripts/bench_catalog_memory.py --problems 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import Lesson, Problem, ProblemOption  # noqa: E402
+from src.services.answers import answer_hash  # noqa: E402
+from src.services.catalog import CompactCatalog  # noqa: E402
+
+PROBLEMS_PER_LESSON = 10
+OPTIONS_PER_MCQ = 4
+
+
+def rows(n_problems: int):
+    """(lessons, problems, options) row generators in the order CompactCatalog.build expects."""
+    n_lessons = (n_problems + PROBLEMS_PER_LESSON - 1) // PROBLEMS_PER_LESSON
+    hashes = [answer_hash(str(v)) for v in range(200)]
+
+    def lessons():
+        for lid in range(1, n_lessons + 1):
+            yield lid, f"Lesson {lid}", f"Synthetic lesson number {lid}"
+
+    def problems():
+        for pid in range(1, n_problems + 1):
+            a, b = pid % 97, pid % 89
+            if pid % 2:
+                yield pid, (pid - 1) // PROBLEMS_PER_LESSON + 1, "mcq", None, None, f"What is {a} + {b}? (#{pid})"
+            else:
+                yield pid, (pid - 1) // PROBLEMS_PER_LESSON + 1, "input", hashes[a + b], str(a + b), \
+                    f"Type {a} + {b} (#{pid})"
+
+    def options():
+        for pid in range(1, n_problems + 1, 2):
+            total = pid % 97 + pid % 89
+            for k in range(OPTIONS_PER_MCQ):
+                yield pid * OPTIONS_PER_MCQ + k, pid, str(total + k), k == 0
+
+    return lessons(), problems(), options()
+
+
+def build_orm(n_problems: int):
+    lessons, problems, options = rows(n_problems)
+    lesson_by_id = {lid: Lesson(id=lid, title=title, description=description, order_index=lid)
+                    for lid, title, description in lessons}
+    problem_by_id = {}
+    for pid, lid, type_, hash_, text, prompt in problems:
+        # set the hash after the text; the text validator would recompute it
+        problem = problem_by_id[pid] = Problem(id=pid, lesson_id=lid, type=type_, prompt=prompt)
+        problem.__dict__["correct_answer_text"] = text
+        problem.correct_answer_hash = hash_
+    options_by_problem = {}
+    for oid, pid, text, is_correct in options:
+        options_by_problem.setdefault(pid, []).append(ProblemOption(id=oid, problem_id=pid, text=text,
+                                                                    is_correct=is_correct))
+    return lesson_by_id, problem_by_id, options_by_problem
+
+
+def lookup_orm(catalog, lesson_id: int, problem_id: int):
+    _, problem_by_id, options_by_problem = catalog
+    problem = problem_by_id.get(problem_id)
+    if problem is None or problem.lesson_id != lesson_id:
+        return None
+    if problem.type == "mcq":
+        return next(o.is_correct for o in options_by_problem[problem_id] if o.id == problem_id * OPTIONS_PER_MCQ)
+    return problem.correct_answer_hash
+
+
+def lookup_compact(catalog: CompactCatalog, lesson_id: int, problem_id: int):
+    problem = catalog.find_problem(lesson_id, problem_id)
+    if problem is None:
+        return None
+    if problem.type == "mcq":
+        return problem.option_is_correct(problem_id * OPTIONS_PER_MCQ)
+    return problem.correct_answer_hash
+
+
+def measure(label: str, build, lookup, n_problems: int, n_lookups: int):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    catalog = build(n_problems)
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    targets = [random.randint(1, n_problems) for _ in range(n_lookups)]
+    started = time.perf_counter()
+    for pid in targets:
+        assert lookup(catalog, (pid - 1) // PROBLEMS_PER_LESSON + 1, pid) is not None
+    lookup_us = (time.perf_counter() - started) / n_lookups * 1e6
+    print(f"{label:<10} {size / 2 ** 20:>10.1f} {size / n_problems:>10.0f} {build_seconds:>8.1f} {lookup_us:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, default=200000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'variant':<10} {'MiB':>10} {'B/problem':>10} {'build s':>8} {'lookup us':>10}")
+    measure("orm dicts", build_orm, lookup_orm, args.problems, args.lookups)
+    measure("compact", lambda n: CompactCatalog.build(*rows(n)), lookup_compact, args.problems, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Peak-memory benchmark: GET /api/lessons via jsonify vs the streamed formats.
+
+Seeds `--lessons` throwaway lessons (each with `--problems` input problems) into
+the database pointed at by DATABASE_URL, measures the Python heap peak with
+tracemalloc while each response body is fully consumed, then deletes the rows.
+
+    python scripts/bench_lesson_streaming.py --lessons 20000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from app import create_app  # noqa: E402
+from src.db import SessionLocal  # noqa: E402
+from src.models import Lesson, Problem, User  # noqa: E402
+
+BENCH_PREFIX = "bench-stream-"
+
+
+def seed(n_lessons: int, n_problems: int):
+    db = SessionLocal()
+    try:
+        if not db.get(User, 1):
+            db.add(User(id=1, username="demo"))
+        db.execute(insert(Lesson), [
+            {"title": f"{BENCH_PREFIX}{i}", "description": "x" * 120, "order_index": 100000 + i}
+            for i in range(n_lessons)
+        ])
+        lesson_ids = db.scalars(select(Lesson.id).where(Lesson.title.like(f"{BENCH_PREFIX}%"))).all()
+        if n_problems:
+            db.execute(insert(Problem), [
+                {"lesson_id": lid, "type": "input", "prompt": "1+1?", "correct_answer_text": "2"}
+                for lid in lesson_ids for _ in range(n_problems)
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        db.execute(delete(Lesson).where(Lesson.title.like(f"{BENCH_PREFIX}%")))
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(client, query: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    resp = client.get(f"/api/lessons{query}", buffered=False)
+    size = 0
+    for chunk in resp.response:
+        size += len(chunk)
+    resp.close()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lessons", type=int, default=20000)
+    parser.add_argument("--problems", type=int, default=1)
+    args = parser.parse_args()
+
+    seed(args.lessons, args.problems)
+    try:
+        client = create_app().test_client()
+        print(f"{'mode':<10} {'bytes':>12} {'peak KiB':>10} {'seconds':>8}")
+        for label, query in (("jsonify", ""), ("stream", "?format=stream"), ("ndjson", "?format=ndjson")):
+            size, peak, elapsed = measure(client, query)
+            print(f"{label:<10} {size:>12} {peak / 1024:>10.0f} {elapsed:>8.2f}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Insert and lookup latency of submissions: one plain table vs monthly partitions.
+
+Builds two scratch copies of the submissions schema in the database pointed at
+by DATABASE_URL, filled with `--rows` rows spread over `--months` months:
+
+- bench_sub_plain: the current layout, with a unique index on attempt_id
+- bench_sub_part: converted with convert_to_partitioned, with idempotency
+  keys for the last IDEMPOTENCY_WINDOW_DAYS in a separate keys table
+
+and then measures p50/p99 latency of single-row submit inserts (each in its
+own transaction), idempotency-key lookups and a user's history page, plus the
+index sizes. The scratch tables, users and lesson are dropped at the end.
+
+    python scripts/bench_submissions_partitioning.py --rows 1000000
+    python scripts/bench_submissions_partitioning.py --rows 100000000 --users 100000 --samples 5000
+
+The 100M-row run needs about 25 GB of disk and takes hours to seed.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+from src.db import engine  # noqa: E402
+from src.services.partitioning import convert_to_partitioned  # noqa: E402
+from src.services.submit import IDEMPOTENCY_WINDOW_DAYS  # noqa: E402
+
+BENCH_PREFIX = "bench-part-"
+PLAIN, PART, KEYS = "bench_sub_plain", "bench_sub_part", "bench_sub_keys"
+
+
+def seed(conn, rows: int, users: int, months: int) -> tuple[int, int]:
+    """Returns the id range (first, last) of the bench users."""
+    first_user = conn.scalar(text("SELECT coalesce(max(id), 0) + 1 FROM users"))
+    conn.execute(text(
+        "INSERT INTO users (id, username, total_xp, current_streak, best_streak, created_at) "
+        "SELECT :first + g - 1, :p || g, 0, 0, 0, now() FROM generate_series(1, :users) g"
+    ), {"first": first_user, "p": BENCH_PREFIX, "users": users})
+    lesson_id = conn.scalar(text(
+        "INSERT INTO lessons (title, description, order_index) VALUES (:p, 'bench', 999999) RETURNING id"
+    ), {"p": BENCH_PREFIX})
+    for table in (PLAIN, PART):
+        conn.execute(text(
+            f"CREATE TABLE {table} (id BIGSERIAL PRIMARY KEY, attempt_id VARCHAR(64) NOT NULL, "
+            "user_id INTEGER NOT NULL, lesson_id INTEGER NOT NULL, created_at TIMESTAMP NOT NULL, "
+            "correct_count INTEGER NOT NULL DEFAULT 0)"
+        ))
+    # rows in id order are in created_at order, as in production
+    conn.execute(text(
+        f"INSERT INTO {PLAIN} (attempt_id, user_id, lesson_id, created_at) "
+        "SELECT md5(g::text), :first + mod(g, :users), :lesson, "
+        "now() - make_interval(months => :months) + (interval '1 month' * :months) * (g::float8 / :rows) "
+        "FROM generate_series(1, :rows) g"
+    ), {"first": first_user, "users": users, "lesson": lesson_id, "months": months, "rows": rows})
+    conn.execute(text(f"INSERT INTO {PART} SELECT * FROM {PLAIN}"))
+    conn.execute(text(f"CREATE UNIQUE INDEX {PLAIN}_attempt_id ON {PLAIN} (attempt_id)"))
+    conn.execute(text(f"CREATE INDEX {PLAIN}_user_created ON {PLAIN} (user_id, created_at, id)"))
+    conn.execute(text(f"SELECT setval('{PART}_id_seq', (SELECT max(id) FROM {PART}))"))
+    conn.commit()
+    return first_user, first_user + users - 1
+
+
+def convert(conn, window_days: int):
+    result = convert_to_partitioned(conn, PART)
+    print(f"convert_to_partitioned: {result.rows_copied} rows into {len(result.partitions)} partitions in "
+          f"{result.seconds:.1f}s, writes blocked {result.lock_seconds:.2f}s")
+    conn.execute(text(f"DROP TABLE {PART}_legacy"))
+    conn.execute(text(
+        f"CREATE TABLE {KEYS} (attempt_id VARCHAR(64) PRIMARY KEY, user_id INTEGER NOT NULL, "
+        "created_at TIMESTAMP NOT NULL)"
+    ))
+    conn.execute(text(
+        f"INSERT INTO {KEYS} SELECT attempt_id, user_id, created_at FROM {PART} "
+        f"WHERE created_at >= now() - interval '{window_days} days'"
+    ))
+    conn.execute(text(f"CREATE INDEX {KEYS}_created_at ON {KEYS} (created_at)"))
+    conn.execute(text(f"ANALYZE {PLAIN}; ANALYZE {PART}; ANALYZE {KEYS}"))
+    conn.commit()
+
+
+def timed(conn, samples: int, run) -> str:
+    latencies = []
+    for i in range(samples):
+        started = time.perf_counter()
+        run(i)
+        conn.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(latencies, n=100)
+    return f"p50 {cuts[49]:7.3f} ms  p99 {cuts[98]:7.3f} ms"
+
+
+def measure(conn, users: tuple[int, int], samples: int):
+    lesson_id = conn.scalar(text("SELECT id FROM lessons WHERE title = :p"), {"p": BENCH_PREFIX})
+    recent = conn.scalars(text(f"SELECT attempt_id FROM {KEYS} ORDER BY random() LIMIT :n"), {"n": samples}).all()
+
+    def insert_plain(i):
+        conn.execute(text(
+            f"INSERT INTO {PLAIN} (attempt_id, user_id, lesson_id, created_at) VALUES (:a, :u, :l, now())"
+        ), {"a": uuid.uuid4().hex, "u": random.randint(*users), "l": lesson_id})
+
+    def insert_part(i):
+        # claim the key first, as process_submission does
+        params = {"a": uuid.uuid4().hex, "u": random.randint(*users), "l": lesson_id}
+        conn.execute(text(
+            f"INSERT INTO {KEYS} (attempt_id, user_id, created_at) VALUES (:a, :u, now()) ON CONFLICT DO NOTHING"
+        ), params)
+        conn.execute(text(
+            f"INSERT INTO {PART} (attempt_id, user_id, lesson_id, created_at) VALUES (:a, :u, :l, now())"
+        ), params)
+
+    def history(table):
+        return lambda i: conn.execute(text(
+            f"SELECT id, created_at FROM {table} WHERE user_id = :u ORDER BY created_at DESC, id DESC LIMIT 20"
+        ), {"u": random.randint(*users)}).all()
+
+    for label, run in (
+        ("insert, plain", insert_plain),
+        ("insert + key claim, partitioned", insert_part),
+        ("attempt_id lookup, plain", lambda i: conn.execute(
+            text(f"SELECT 1 FROM {PLAIN} WHERE attempt_id = :a"), {"a": recent[i % len(recent)]}).all()),
+        ("attempt_id lookup, keys table", lambda i: conn.execute(
+            text(f"SELECT 1 FROM {KEYS} WHERE attempt_id = :a"), {"a": recent[i % len(recent)]}).all()),
+        ("history page, plain", history(PLAIN)),
+        ("history page, partitioned", history(PART)),
+    ):
+        print(f"{label:34} {timed(conn, samples, run)}")
+
+    sizes = conn.execute(text(
+        "SELECT c.relname, pg_relation_size(c.oid) FROM pg_class c WHERE c.relname IN "
+        f"('{PLAIN}_attempt_id', '{KEYS}_pkey', '{PLAIN}_user_created') "
+        f"UNION ALL SELECT 'largest {PART} partition attempt_id index', max(pg_relation_size(i.indexrelid)) "
+        f"FROM pg_index i JOIN pg_inherits h ON h.inhrelid = i.indrelid "
+        f"WHERE h.inhparent = '{PART}'::regclass"
+    )).all()
+    for name, size in sizes:
+        print(f"{name:42} {(size or 0) / 1024 / 1024:9.1f} MB")
+
+
+def cleanup(conn):
+    conn.rollback()
+    conn.execute(text(f"DROP TABLE IF EXISTS {PLAIN}, {PART}, {PART}_legacy, {PART}_partitioned, {KEYS} CASCADE"))
+    conn.execute(text("DELETE FROM lessons WHERE title = :p"), {"p": BENCH_PREFIX})
+    conn.execute(text("DELETE FROM users WHERE username LIKE :p"), {"p": f"{BENCH_PREFIX}%"})
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--window-days", type=int, default=IDEMPOTENCY_WINDOW_DAYS)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        cleanup(conn)
+        try:
+            started = time.perf_counter()
+            users = seed(conn, args.rows, args.users, args.months)
+            print(f"Seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+            convert(conn, args.window_days)
+            measure(conn, users, args.samples)
+        finally:
+            cleanup(conn)
+
+
+if __name__ == "__main__":
+    main()
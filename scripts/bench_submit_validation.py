@@ -0,0 +1,83 @@
+"""
+Submit payload validation: the former hand-written loop vs the pydantic schema.
+
+Times validating one payload of N answers (half multiple choice, half free
+input) from its raw JSON body:
+
+- loop:      json.loads, then the isinstance checks process_submission used to do
+- pydantic:  json.loads, then SubmitPayload.model_validate
+- pydantic-json: SubmitPayload.model_validate_json on the bytes (what the route does)
+
+    python scripts/bench_submit_validation.py --sizes 10 100 1000
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schemas import SubmitPayload  # noqa: E402
+
+
+def legacy_validate(payload):
+    """The checks process_submission ran before the schema, minus the DB lookups."""
+    attempt_id = payload.get("attempt_id")
+    answers = payload.get("answers")
+    if not attempt_id or not isinstance(attempt_id, str):
+        raise ValueError("attempt_id is required")
+    if not answers or not isinstance(answers, list):
+        raise ValueError("answers must be non-empty")
+    items = []
+    for a in answers:
+        if not isinstance(a, dict):
+            raise ValueError("answer items must be objects")
+        problem_id = a.get("problem_id")
+        if not isinstance(problem_id, int):
+            raise ValueError("problem_id must be an integer")
+        if "option_id" in a:
+            option_id = a.get("option_id")
+            if not isinstance(option_id, int):
+                raise ValueError("option_id must be an integer for mcq problems")
+            items.append((problem_id, option_id, None))
+        else:
+            value = a.get("value")
+            if value is None:
+                raise ValueError("value is required for input problems")
+            items.append((problem_id, None, value))
+    return items
+
+
+def make_body(n: int) -> bytes:
+    answers = [{"problem_id": i, "option_id": i * 4} if i % 2 else {"problem_id": i, "value": str(i * 3)}
+               for i in range(n)]
+    return json.dumps({"attempt_id": "bench-attempt", "answers": answers}).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seconds", type=float, default=0.5, help="approximate time per measurement")
+    args = parser.parse_args()
+
+    variants = {
+        "loop": lambda body: legacy_validate(json.loads(body)),
+        "pydantic": lambda body: SubmitPayload.model_validate(json.loads(body)),
+        "pydantic-json": SubmitPayload.model_validate_json,
+    }
+    print(f"{'answers':>8} " + " ".join(f"{name + ' us':>17}" for name in variants))
+    for n in args.sizes:
+        body = make_body(n)
+        row = []
+        for fn in variants.values():
+            timer = timeit.Timer(lambda: fn(body))
+            number, _ = timer.autorange()
+            number = max(1, int(number * args.seconds / 0.2))
+            best = min(timer.repeat(repeat=5, number=number)) / number
+            row.append(f"{best * 1e6:>17.1f}")
+        print(f"{n:>8} " + " ".join(row))
+
+
+if __name__ == "__main__":
+    main()
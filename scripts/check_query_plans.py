@@ -0,0 +1,67 @@
+"""
+Query plan regression check for the hot API endpoints.
+
+Runs the hot routes from src/routes.py against the database pointed at by
+DATABASE_URL (a local Postgres, never production), captures every statement
+they issue and checks EXPLAIN (FORMAT JSON) of each for sequential scans on
+large tables and cost growth against the stored baseline. Exits non-zero on
+any new issue.
+
+    alembic upgrade head
+    python scripts/check_query_plans.py --seed             # load synthetic volume first
+    python scripts/check_query_plans.py --update-baseline  # accept the current plans
+
+Run it after an Alembic index change to confirm the plans it was meant to fix.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from src.db import engine  # noqa: E402
+from src.query_plans import (  # noqa: E402
+    COST_TOLERANCE, LARGE_TABLE_ROWS, capture_hot_endpoints, check_statements, load_baseline, save_baseline,
+    seed_plan_check_data,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plan_baseline.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--seed", action="store_true", help="bulk-load synthetic rows before checking")
+    parser.add_argument("--update-baseline", action="store_true", help="write current plans as the new baseline")
+    parser.add_argument("--large-table-rows", type=int, default=LARGE_TABLE_ROWS)
+    parser.add_argument("--tolerance", type=float, default=COST_TOLERANCE)
+    args = parser.parse_args()
+
+    if engine is None:
+        sys.exit("DATABASE_URL is not configured")
+    if args.seed:
+        with engine.begin() as conn:
+            seed_plan_check_data(conn)
+
+    captured = capture_hot_endpoints(create_app().test_client(), engine)
+    baseline = {} if args.update_baseline else load_baseline(args.baseline)
+    with engine.connect() as conn:
+        report = check_statements(conn, captured, baseline, args.large_table_rows, args.tolerance)
+
+    print(f"checked {len(report.plans)} distinct statements from {len(captured)} executions")
+    for issue in report.known:
+        print(f"known: [{issue.kind}] {issue.label}: {issue.detail}")
+    if args.update_baseline:
+        save_baseline(args.baseline, report.plans)
+        print(f"baseline written to {args.baseline}")
+        return
+    for issue in report.issues:
+        print(issue)
+    if report.issues:
+        sys.exit(f"{len(report.issues)} query plan regression(s)")
+    print("no query plan regressions")
+
+
+if __name__ == "__main__":
+    main()
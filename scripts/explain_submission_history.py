@@ -0,0 +1,75 @@
+"""
+Show that deep pages of /api/submissions are index range scans.
+
+Inserts `--rows` synthetic submissions for a scratch user into the database
+pointed at by DATABASE_URL, walks to a page `--depth` rows deep, prints
+EXPLAIN (ANALYZE, BUFFERS) for that page's query and exits non-zero if the
+plan contains a sequential scan or an explicit sort. The scratch user and its
+rows are removed afterwards.
+
+    python scripts/explain_submission_history.py --rows 200000 --depth 150000
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, insert, select, text  # noqa: E402
+
+from src.db import SessionLocal  # noqa: E402
+from src.models import Lesson, Submission, User  # noqa: E402
+from src.services.submissions import build_history_query, encode_cursor  # noqa: E402
+
+BENCH_USERNAME = "explain-history"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--depth", type=int, default=150000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        lesson_id = db.scalar(select(Lesson.id).limit(1))
+        if lesson_id is None:
+            sys.exit("seed at least one lesson first (python scripts/seed.py)")
+        # explicit id: the seeded demo user is inserted with id=1, bypassing the sequence
+        user = User(id=(db.scalar(select(func.max(User.id))) or 0) + 1, username=BENCH_USERNAME)
+        db.add(user)
+        db.flush()
+        start = datetime(2024, 1, 1)
+        for offset in range(0, args.rows, 10000):
+            db.execute(insert(Submission), [
+                {"attempt_id": f"{BENCH_USERNAME}-{i}", "user_id": user.id, "lesson_id": lesson_id,
+                 "created_at": start + timedelta(minutes=i)}
+                for i in range(offset, min(offset + 10000, args.rows))
+            ])
+        db.commit()
+        db.execute(text("ANALYZE submissions"))
+
+        # cursor pointing `depth` rows into the newest-first history
+        anchor = start + timedelta(minutes=args.rows - args.depth)
+        anchor_id = db.scalar(select(Submission.id).where(
+            Submission.user_id == user.id, Submission.created_at == anchor))
+        stmt = build_history_query(user.id, limit=args.limit, cursor=encode_cursor(anchor, anchor_id))
+        compiled = stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+        plan = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}")).scalars().all()
+        print("\n".join(plan))
+
+        bad = [line for line in plan if "Seq Scan" in line or line.lstrip("-> ").startswith("Sort")]
+        if bad:
+            sys.exit("deep page is not an index range scan:\n" + "\n".join(bad))
+        print(f"\nOK: page at depth {args.depth} is served by an index range scan")
+    finally:
+        db.rollback()
+        db.execute(delete(User).where(User.username == BENCH_USERNAME))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Export submissions and user_problem_progress as columnar files.
+
+Streams each table in fixed-size chunks, so it is safe to run against the full
+tables. Writes Parquet when pyarrow is installed, gzip-compressed column
+batches otherwise.
+
+    python scripts/export_analytics.py --out-dir exports/ --chunk-size 50000
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import SessionLocal  # noqa: E402
+from src.services.export import (  # noqa: E402
+    DEFAULT_CHUNK_SIZE, EXPORT_TABLES, FORMAT_EXTENSIONS, default_format, export_table,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out-dir", default="exports")
+    parser.add_argument("--tables", nargs="+", choices=sorted(EXPORT_TABLES), default=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default=default_format())
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    db = SessionLocal()
+    try:
+        for table in args.tables:
+            path = os.path.join(args.out_dir, table + FORMAT_EXTENSIONS[args.format])
+            result = export_table(db, table, path, args.format, args.chunk_size)
+            print(f"{table}: {result.rows} rows in {result.seconds:.2f}s "
+                  f"({result.rows_per_second:.0f} rows/s) -> {path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Export lessons, problems and options to the shared catalog snapshot file.
+
+Workers started with CATALOG_SNAPSHOT_PATH pointing at the file mmap it and
+serve lesson details and grading from it (see src/services/catalog_snapshot.py).
+Run this after content changes: lessons edited after the export are served
+from the database until the next one. The file is replaced atomically with the
+version bumped, and running workers switch to it within
+CATALOG_SNAPSHOT_CHECK_INTERVAL seconds.
+
+    python scripts/export_catalog_snapshot.py --out /var/run/mathquest/catalog.snap
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import SessionLocal  # noqa: E402
+from src.services.catalog import load_compact_catalog  # noqa: E402
+from src.services.catalog_snapshot import CATALOG_SNAPSHOT_PATH, write_snapshot  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=CATALOG_SNAPSHOT_PATH, required=CATALOG_SNAPSHOT_PATH is None,
+                        help="snapshot file (defaults to CATALOG_SNAPSHOT_PATH)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        catalog = load_compact_catalog(db)
+    finally:
+        db.close()
+    version = write_snapshot(catalog, args.out)
+    print(f"Wrote catalog snapshot v{version} at content revision {catalog.content_revision} "
+          f"({len(catalog.lesson_ids)} lessons, {len(catalog)} problems, "
+          f"{os.path.getsize(args.out)} bytes) to {args.out} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
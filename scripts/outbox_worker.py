@@ -0,0 +1,55 @@
+"""
+Consume the transactional outbox and apply derived aggregates (stats counters).
+
+Runs until stopped, polling for new events when the outbox is empty. With
+--once it drains what is pending and exits, which suits a cron job or a
+scheduled serverless function. Several workers can run at once: events are
+claimed with FOR UPDATE SKIP LOCKED.
+
+    python scripts/outbox_worker.py --batch-size 200 --interval 1
+    python scripts/outbox_worker.py --once
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import SessionLocal  # noqa: E402
+from src.services import stats  # noqa: E402,F401  (registers the stats handler)
+from src.services.outbox import DEFAULT_BATCH_SIZE, DEFAULT_CONSUMER, drain, pending_count  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds to sleep when the outbox is empty")
+    parser.add_argument("--consumer", default=DEFAULT_CONSUMER, help="checkpoint name for this worker")
+    parser.add_argument("--once", action="store_true", help="drain pending events and exit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        while True:
+            started = time.perf_counter()
+            result = drain(db, args.consumer, args.batch_size)
+            if result.claimed:
+                print(f"Applied {result.processed} events ({result.failed} failed) up to id {result.last_event_id} "
+                      f"in {time.perf_counter() - started:.2f}s")
+            if args.once:
+                print(f"{pending_count(db)} events still pending")
+                db.commit()
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
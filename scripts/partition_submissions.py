@@ -0,0 +1,91 @@
+"""
+Partition submissions by month and archive old partitions.
+
+    python scripts/partition_submissions.py convert --batch-size 50000
+    python scripts/partition_submissions.py maintain --keep-months 12 [--drop]
+
+convert turns the table into a partitioned one online (see
+src/services/partitioning.py). Writes are blocked only while the changes
+logged since the last pass are applied and the tables are renamed.
+Afterwards the old table is left as submissions_legacy; drop it once the new
+table has been checked.
+
+maintain is meant for a daily cron job: it creates the upcoming monthly
+partitions, detaches (or drops) partitions older than --keep-months, purges
+expired idempotency keys and processed outbox events.
+"""
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import SessionLocal, engine  # noqa: E402
+from src.services.outbox import purge_processed  # noqa: E402
+from src.services.partitioning import (  # noqa: E402
+    DEFAULT_BATCH_SIZE, DEFAULT_MONTHS_AHEAD, convert_to_partitioned, detach_old_partitions, ensure_partitions,
+    is_partitioned,
+)
+from src.services.submit import IDEMPOTENCY_WINDOW_DAYS, purge_attempt_keys  # noqa: E402
+
+
+def convert(args):
+    with engine.connect() as conn:
+        result = convert_to_partitioned(
+            conn, batch_size=args.batch_size, months_ahead=args.months_ahead,
+            progress=lambda copied: print(f"  copied {copied} rows"),
+        )
+    if not result.partitions:
+        print("submissions is already partitioned.")
+        return
+    print(f"Converted submissions: {result.rows_copied} rows into {len(result.partitions)} partitions "
+          f"in {result.seconds:.1f}s (writes blocked for {result.lock_seconds:.2f}s).")
+
+
+def maintain(args):
+    with engine.connect() as conn:
+        if is_partitioned(conn):
+            created = ensure_partitions(conn, months_ahead=args.months_ahead)
+            detached = detach_old_partitions(conn, keep_months=args.keep_months, drop=args.drop)
+            print(f"Created partitions: {', '.join(created) or 'none'}")
+            print(f"{'Dropped' if args.drop else 'Detached'} partitions: {', '.join(detached) or 'none'}")
+        else:
+            print("submissions is not partitioned; skipping partition maintenance.")
+
+    db = SessionLocal()
+    try:
+        keys = purge_attempt_keys(db, args.idempotency_days)
+        events = purge_processed(db, timedelta(days=args.outbox_days))
+        db.commit()
+        print(f"Purged {keys} idempotency keys and {events} processed outbox events.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="convert submissions to a partitioned table")
+    convert_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    convert_parser.add_argument("--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD)
+    convert_parser.set_defaults(run=convert)
+
+    maintain_parser = commands.add_parser("maintain", help="rotate partitions and purge expired keys")
+    maintain_parser.add_argument("--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD)
+    maintain_parser.add_argument("--keep-months", type=int, default=12)
+    maintain_parser.add_argument("--drop", action="store_true", help="drop old partitions instead of detaching")
+    maintain_parser.add_argument("--idempotency-days", type=int, default=IDEMPOTENCY_WINDOW_DAYS)
+    maintain_parser.add_argument("--outbox-days", type=int, default=7, help="keep processed outbox events this long")
+    maintain_parser.set_defaults(run=maintain)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Recompute every user's current/best streak from submission history.
+
+Streaks are otherwise only updated when a user submits, so users who stopped
+practicing keep a stale current_streak. Run this periodically (e.g. daily
+after midnight UTC).
+
+    python scripts/recompute_streaks.py --chunk-size 1000
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import SessionLocal  # noqa: E402
+from src.services.streak import recompute_streaks  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = recompute_streaks(db, chunk_size=args.chunk_size)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"Recomputed streaks for {result.users} users in {result.seconds:.2f}s "
+          f"({result.users_per_second:.0f} users/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Rebuild problem_stats and lesson_stats from user_problem_progress.
+
+The counters are maintained incrementally on every submission; run this after
+restoring data, deleting users, or whenever the counters are suspected to have
+drifted.
+
+    python scripts/reconcile_stats.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import SessionLocal  # noqa: E402
+from src.services.stats import reconcile_stats  # noqa: E402
+
+
+def main():
+    db = SessionLocal()
+    try:
+        drifted = reconcile_stats(db)
+        db.commit()
+        print(f"Reconciled stats ({drifted} problem rows corrected).")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Stress concurrent submits for one user and check the totals afterwards.
+
+Runs `--workers` threads, each with its own database connection (as separate
+server processes would have). Every thread posts `--submits` all-correct
+submissions of one lesson for the demo user. The script then checks that the
+user's XP, users.version and the per-problem attempt counters grew by exactly
+the committed submits, and reports throughput and optimistic-lock retries.
+
+    python scripts/stress_submit_concurrency.py --workers 8 --submits 25
+    python scripts/stress_submit_concurrency.py --workers 8 --retries 0   # conflicts surface as 409
+"""
+import argparse
+import collections
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func, select  # noqa: E402
+from sqlalchemy.orm import scoped_session, sessionmaker  # noqa: E402
+
+from src import db as database  # noqa: E402
+from src import routes  # noqa: E402
+from src.admission import submit_admission  # noqa: E402
+from src.models import Lesson, Problem, ProblemOption, User, UserProblemProgress  # noqa: E402
+from src.services.submit import XP_PER_CORRECT  # noqa: E402
+
+
+def lesson_answers(db, lesson_id: int):
+    answers = []
+    for problem in db.scalars(select(Problem).where(Problem.lesson_id == lesson_id).order_by(Problem.id)):
+        if problem.type == "mcq":
+            option_id = db.scalar(select(ProblemOption.id).where(ProblemOption.problem_id == problem.id,
+                                                                 ProblemOption.is_correct))
+            answers.append({"problem_id": problem.id, "option_id": option_id})
+        else:
+            answers.append({"problem_id": problem.id, "value": problem.correct_answer_text})
+    return answers
+
+
+def counters(db, user_id: int, lesson_id: int):
+    user = db.get(User, user_id)
+    attempts = db.scalar(select(func.coalesce(func.sum(UserProblemProgress.attempts), 0)).join(Problem).where(
+        UserProblemProgress.user_id == user_id, Problem.lesson_id == lesson_id))
+    return user.total_xp, user.version, attempts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--submits", type=int, default=25, help="submits per worker")
+    parser.add_argument("--retries", type=int, default=routes.SUBMIT_CONFLICT_RETRIES)
+    parser.add_argument("--lesson-id", type=int, help="defaults to the first lesson with problems")
+    args = parser.parse_args()
+
+    engine = create_engine(database.DATABASE_URL, pool_size=args.workers, max_overflow=0)
+    database.SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False))
+    submit_admission.max_concurrent = submit_admission.max_queue = args.workers
+    submit_admission.user_burst = submit_admission.global_burst = args.workers * args.submits
+    submit_admission.reset()
+    routes.SUBMIT_CONFLICT_RETRIES = args.retries
+    from app import create_app
+    app = create_app()
+
+    user_updates = 0
+    lock = threading.Lock()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_user_updates(conn, cursor, statement, parameters, context, executemany):
+        nonlocal user_updates
+        if statement.startswith("UPDATE users"):
+            with lock:
+                user_updates += 1
+
+    with sessionmaker(bind=engine)() as db:
+        lesson_id = args.lesson_id or db.scalar(
+            select(Lesson.id).join(Problem).order_by(Lesson.order_index, Lesson.id).limit(1))
+        answers = lesson_answers(db, lesson_id)
+        before = counters(db, routes.DEMO_USER_ID, lesson_id)
+
+    statuses = collections.Counter()
+
+    def worker():
+        client = app.test_client()
+        for _ in range(args.submits):
+            resp = client.post(f"/api/lessons/{lesson_id}/submit",
+                               json={"attempt_id": str(uuid.uuid4()), "answers": answers})
+            with lock:
+                statuses[resp.status_code] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with sessionmaker(bind=engine)() as db:
+        after = counters(db, routes.DEMO_USER_ID, lesson_id)
+    committed = statuses[200]
+    expected = (before[0] + committed * len(answers) * XP_PER_CORRECT, before[1] + committed,
+                before[2] + committed * len(answers))
+    print(f"{args.workers} workers x {args.submits} submits on lesson {lesson_id} in {elapsed:.2f}s "
+          f"({committed / elapsed:.1f} committed submits/s)")
+    print(f"status codes: {dict(statuses)}; optimistic-lock conflicts: {user_updates - committed}")
+    ok = after == expected
+    print(f"xp {before[0]} -> {after[0]}, version {before[1]} -> {after[1]}, attempts {before[2]} -> {after[2]}: "
+          f"{'consistent' if ok else f'INCONSISTENT, expected {expected}'}")
+    engine.dispose()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+In-process admission control for expensive write endpoints.
+
+With a single pooled DB connection, a burst of submits would otherwise wait
+inside SQLAlchemy for up to pool_timeout and stall every other endpoint. The
+controller rejects early instead: token buckets cap the sustained rate per user
+and globally, and at most max_concurrent requests run at once with at most
+max_queue more waiting briefly for a slot. Rejections carry a Retry-After hint
+and are answered with 429. A request rejected by the queue gives its rate
+tokens back, since it never ran. Rates must be positive: a limit that can
+never refill is a misconfiguration and fails at startup.
+"""
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Hashable, Iterator
+from flask import jsonify
+
+# Per-user buckets kept in memory; least recently used ones are dropped first
+MAX_TRACKED_KEYS = 10000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"token bucket needs rate > 0 and burst >= 1, got rate={rate} burst={burst}")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def give_back(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class AdmissionController:
+    def __init__(self, user_rate: float, user_burst: float, global_rate: float, global_burst: float,
+                 max_concurrent: int, max_queue: int, queue_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "AdmissionController":
+        def setting(name: str, cast):
+            return cast(os.getenv(f"{prefix}_{name.upper()}", defaults[name]))
+
+        return cls(
+            user_rate=setting("user_rate", float),
+            user_burst=setting("user_burst", float),
+            global_rate=setting("global_rate", float),
+            global_burst=setting("global_burst", float),
+            max_concurrent=setting("max_concurrent", int),
+            max_queue=setting("max_queue", int),
+            queue_timeout=setting("queue_timeout", float),
+        )
+
+    def reset(self) -> None:
+        """Forget all bucket state and rebuild from the current settings."""
+        if self.user_rate <= 0 or self.user_burst < 1:
+            raise ValueError(f"user_rate must be > 0 and user_burst >= 1, got {self.user_rate}, {self.user_burst}")
+        if self.max_concurrent < 1 or self.max_queue < 0:
+            raise ValueError(f"max_concurrent must be >= 1 and max_queue >= 0, got "
+                             f"{self.max_concurrent}, {self.max_queue}")
+        with self._lock:
+            self._global = TokenBucket(self.global_rate, self.global_burst, self.clock)
+            self._users: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+            self._slots = threading.BoundedSemaphore(self.max_concurrent)
+            self._waiting = 0
+
+    def _user_bucket(self, key: Hashable) -> TokenBucket:
+        bucket = self._users.get(key)
+        if bucket is None:
+            bucket = self._users[key] = TokenBucket(self.user_rate, self.user_burst, self.clock)
+            if len(self._users) > MAX_TRACKED_KEYS:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(key)
+        return bucket
+
+    def _take_tokens(self, key: Hashable) -> None:
+        with self._lock:
+            user = self._user_bucket(key)
+            # only spend tokens when both buckets allow the request
+            wait = max(user.wait_time(), self._global.wait_time())
+            if wait > 0:
+                reason = "user rate limit" if user.wait_time() > 0 else "global rate limit"
+                raise AdmissionRejected(reason, wait)
+            user.take()
+            self._global.take()
+
+    def _give_back_tokens(self, key: Hashable) -> None:
+        with self._lock:
+            self._user_bucket(key).give_back()
+            self._global.give_back()
+
+    @contextmanager
+    def admit(self, key: Hashable) -> Iterator[None]:
+        """Run the block if admitted, otherwise raise AdmissionRejected without waiting long."""
+        self._take_tokens(key)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                queue_full = self._waiting >= self.max_queue
+                if not queue_full:
+                    self._waiting += 1
+            if queue_full:
+                self._give_back_tokens(key)
+                raise AdmissionRejected("too many queued requests", self.queue_timeout)
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                self._give_back_tokens(key)
+                raise AdmissionRejected("timed out waiting for a database slot", self.queue_timeout)
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+def admission_controlled(controller: AdmissionController, key: Callable[[], Hashable]):
+    """View decorator answering 429 with Retry-After when the controller rejects the request."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                with controller.admit(key()):
+                    return view(*args, **kwargs)
+            except AdmissionRejected as e:
+                response = jsonify({'error': 'TooManyRequests', 'message': e.reason})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+                return response
+
+        return wrapper
+
+    return decorator
+
+
+# Defaults size the slots to the engine pool in src/db.py (pool_size=1, max_overflow=0)
+submit_admission = AdmissionController.from_env(
+    "SUBMIT",
+    user_rate="2", user_burst="5",
+    global_rate="20", global_burst="40",
+    max_concurrent="1", max_queue="4", queue_timeout="2",
+)
@@ -0,0 +1,112 @@
+"""
+Response compression for the API.
+
+Responses are gzip- (or brotli-, when the optional `brotli` package is
+installed) encoded according to the request's Accept-Encoding once they reach
+COMPRESSION_MIN_SIZE bytes. Streamed, passthrough (static file) and already
+encoded responses are left alone.
+
+Views decorated with @cache_compressed serve catalog payloads that repeat
+across requests. Their compressed bytes are kept in an LRU keyed by encoding
+and a digest of the plain body, so each content version is compressed once.
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Flask, Response, make_response, request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+# Number of compressed catalog bodies kept in memory
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "256"))
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "application/javascript", "image/svg+xml"}
+
+_cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def supported_encodings() -> list[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(COMPRESSION_LEVEL, 11))
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0)
+
+
+def _compress_cached(data: bytes, encoding: str) -> bytes:
+    key = (encoding, hashlib.sha1(data).hexdigest())
+    with _cache_lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+            return body
+    body = compress(data, encoding)
+    with _cache_lock:
+        _cache[key] = body
+        while len(_cache) > COMPRESSION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return body
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def cache_compressed(view):
+    """Mark a view's responses as repeatable so their compressed bodies are cached."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        response.cache_compressed = True
+        return response
+
+    return wrapper
+
+
+def _is_compressible(response: Response) -> bool:
+    mimetype = response.mimetype or ""
+    return (
+        (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES)
+        and 200 <= response.status_code < 300
+        and response.status_code != 204
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and "Content-Encoding" not in response.headers
+    )
+
+
+def compress_response(response: Response) -> Response:
+    if not _is_compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    if getattr(response, "cache_compressed", False):
+        body = _compress_cached(data, encoding)
+    else:
+        body = compress(data, encoding)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    app.after_request(compress_response)
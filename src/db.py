@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session, DeclarativeBase
 from dotenv import load_dotenv
@@ -48,19 +50,9 @@ if DATABASE_URL:
         print("DEBUG: Engine created successfully with auto-detection")
         SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
         print("DEBUG: Database engine created successfully")
-        
-        # Test the connection immediately
-        try:
-            from sqlalchemy import text
-            with engine.connect() as conn:
-                result = conn.execute(text("SELECT 1"))
-                print("DEBUG: Database connection test successful")
-        except Exception as conn_e:
-            print(f"DEBUG: Database connection test failed: {conn_e}")
-            # Don't raise the exception, just log it and continue
-            print(f"DEBUG: Connection test failed but continuing: {conn_e}")
-            # The engine is still created, just the test failed
-            
+        # No connection test here: it would add a database round trip to every
+        # cold import. init_db() and pool_pre_ping check the connection when used.
+
     except Exception as e:
         print(f"DEBUG: Failed to create database engine: {e}")
         print(f"DEBUG: Exception type: {type(e)}")
@@ -79,6 +71,52 @@ else:
 print(f"DEBUG: Final engine state: {engine is not None}")
 print(f"DEBUG: Final SessionLocal state: {SessionLocal is not None}")
 
+# Optional read replica. GET endpoints read from it through read_session_factory();
+# without READ_DATABASE_URL reads share the primary engine and session.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+# Seconds a user's reads stay on the primary after they write
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+
+read_engine = engine
+ReadSessionLocal = SessionLocal
+if READ_DATABASE_URL and engine is not None:
+    try:
+        read_url = READ_DATABASE_URL
+        if read_url.startswith('postgres://'):
+            read_url = read_url.replace('postgres://', 'postgresql://', 1)
+        read_engine = create_engine(
+            read_url,
+            pool_pre_ping=True,
+            future=True,
+            pool_size=1,
+            max_overflow=0,
+            pool_recycle=300,
+            pool_timeout=30,
+            connect_args={
+                "application_name": "math-question-app-read"
+            }
+        )
+        ReadSessionLocal = scoped_session(sessionmaker(bind=read_engine, autoflush=False, autocommit=False, future=True))
+        print("DEBUG: Read replica engine created")
+    except Exception as e:
+        print(f"DEBUG: Failed to create read replica engine, reading from primary: {e}")
+        read_engine = engine
+        ReadSessionLocal = SessionLocal
+
+if engine is not None:
+    from .db_metrics import instrument
+    from . import slow_query
+    instrument(engine, "primary")
+    slow_query.install(engine, "primary")
+    if read_engine is not engine:
+        instrument(read_engine, "replica")
+        slow_query.install(read_engine, "replica")
+
+# user_id -> monotonic time until which reads go to the primary. Pins are per
+# process: another worker may still serve that user from the replica.
+_primary_pins: dict[int, float] = {}
+_pins_lock = threading.Lock()
+
 
 class Base(DeclarativeBase):
     pass
@@ -113,4 +151,28 @@ def init_db():
         print(f"Database connection failed: {e}")
         # Don't raise the exception in serverless environments
         if not os.getenv("VERCEL"):
-            raise 
\ No newline at end of file
+            raise 
+
+
+def pin_to_primary(user_id: int, window: float | None = None):
+    """Send user_id's reads to the primary for the next `window` seconds (read-your-writes)."""
+    until = time.monotonic() + (READ_YOUR_WRITES_WINDOW if window is None else window)
+    with _pins_lock:
+        _primary_pins[user_id] = until
+        if len(_primary_pins) > 10000:
+            now = time.monotonic()
+            for key in [k for k, v in _primary_pins.items() if v <= now]:
+                del _primary_pins[key]
+
+
+def is_pinned_to_primary(user_id: int) -> bool:
+    with _pins_lock:
+        until = _primary_pins.get(user_id)
+    return until is not None and until > time.monotonic()
+
+
+def read_session_factory(user_id: int):
+    """Session registry for a read-only request: the replica unless user_id recently wrote."""
+    if ReadSessionLocal is None or is_pinned_to_primary(user_id):
+        return SessionLocal
+    return ReadSessionLocal
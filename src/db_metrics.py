@@ -0,0 +1,80 @@
+"""
+Per-engine connection and statement counters.
+
+instrument(engine, name) hooks pool and cursor events on an engine and keeps
+its counters under engine_metrics[name]. snapshot() is served by the
+/api/debug/db endpoint, so primary and replica traffic can be compared.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_START_KEY = "db_metrics_start"
+
+
+class EngineMetrics:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.statements = 0
+            self.errors = 0
+            self.statement_seconds = 0.0
+
+    def _add(self, **counts) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "statements": self.statements,
+                "errors": self.errors,
+                "statement_ms": round(self.statement_seconds * 1000, 2),
+            }
+        data["pool"] = self.engine.pool.status()
+        data["url"] = self.engine.url.render_as_string(hide_password=True)
+        return data
+
+
+engine_metrics: dict[str, EngineMetrics] = {}
+
+
+def instrument(engine: Engine, name: str) -> EngineMetrics:
+    metrics = engine_metrics[name] = EngineMetrics(name, engine)
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_conn, record, proxy):
+        metrics._add(checkouts=1)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info[_START_KEY].pop()
+        metrics._add(statements=1, statement_seconds=time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get(_START_KEY):
+            conn.info[_START_KEY].pop()
+        metrics._add(errors=1)
+
+    return metrics
+
+
+def snapshot() -> dict[str, dict[str, Any]]:
+    return {name: metrics.snapshot() for name, metrics in engine_metrics.items()}
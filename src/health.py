@@ -0,0 +1,196 @@
+"""
+Readiness probe with cached database health.
+
+GET /api/health/ready reports whether the database answers and how fast, how
+full the connection pools are, and whether the schema is at this code's
+migration head. Load balancers call it every few seconds, so the database is
+probed at most once per HEALTH_CACHE_TTL in each process. A call that finds an
+older result returns it and starts a refresh in a background thread. Probes
+connect through their own NullPool engine, so they never wait for or hold the
+single pooled connection that requests use. Pool numbers are read from the
+pools on every call, without a query.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable
+
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+# A result older than this means refreshes are hanging: report unavailable
+HEALTH_MAX_AGE = float(os.getenv("HEALTH_MAX_AGE", "30"))
+# Connect/read timeout of a probe, in seconds
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+_probe_engine = None
+_probe_engine_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def code_migration_head() -> str | None:
+    """Head revision of alembic/versions, read once (None if it cannot be determined)."""
+    try:
+        from alembic.script import ScriptDirectory
+        return ScriptDirectory(ALEMBIC_DIR).get_current_head()
+    except Exception as e:
+        print(f"WARNING: migration head not found in {ALEMBIC_DIR}: {e}")
+        return None
+
+
+def _get_probe_engine():
+    global _probe_engine
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+    from .db import engine
+
+    if engine is None:
+        return None
+    with _probe_engine_lock:
+        if _probe_engine is None:
+            timeout = {"timeout": HEALTH_PROBE_TIMEOUT} if engine.dialect.driver == "pg8000" \
+                else {"connect_timeout": max(1, round(HEALTH_PROBE_TIMEOUT))}
+            _probe_engine = create_engine(
+                engine.url,
+                poolclass=NullPool,
+                future=True,
+                connect_args={"application_name": "math-question-app-health", **timeout},
+            )
+        return _probe_engine
+
+
+def probe_database() -> dict[str, Any]:
+    """Connect, time one round trip and read the applied migration. Never raises."""
+    from sqlalchemy import text
+
+    result: dict[str, Any] = {"checked_at": datetime.utcnow().isoformat(), "reachable": False,
+                              "connect_ms": None, "latency_ms": None, "migration": None, "error": None}
+    probe_engine = _get_probe_engine()
+    if probe_engine is None:
+        result["error"] = "database not configured"
+        return result
+    started = time.perf_counter()
+    try:
+        with probe_engine.connect() as conn:
+            connected = time.perf_counter()
+            conn.execute(text("SELECT 1"))
+            result["latency_ms"] = round((time.perf_counter() - connected) * 1000, 2)
+            result["connect_ms"] = round((connected - started) * 1000, 2)
+            result["reachable"] = True
+            if conn.scalar(text("SELECT to_regclass('alembic_version') IS NOT NULL")):
+                result["migration"] = conn.scalar(text("SELECT version_num FROM alembic_version"))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def pool_status(engine) -> dict[str, Any]:
+    from sqlalchemy.pool import QueuePool
+
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    checked_out = pool.checkedout()
+    # a negative max_overflow means no limit
+    capacity = pool.size() + pool._max_overflow if pool._max_overflow >= 0 else None
+    return {
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "saturation": round(checked_out / capacity, 2) if capacity else None,
+    }
+
+
+class HealthChecker:
+    """Caches a probe's result for ttl seconds and refreshes it in a background thread."""
+
+    def __init__(self, probe: Callable[[], dict[str, Any]], ttl: float, max_age: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.probe = probe
+        self.ttl = ttl
+        self.max_age = max_age
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._first_probe = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._result: dict[str, Any] | None = None
+            self._checked_at = 0.0
+            self._refreshing = False
+            self.refresh_thread: threading.Thread | None = None
+
+    def refresh(self) -> dict[str, Any]:
+        try:
+            result = self.probe()
+            with self._lock:
+                self._result, self._checked_at = result, self.clock()
+            return result
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self) -> tuple[dict[str, Any], float]:
+        """
+        The cached result and its age in seconds. Only the very first call
+        waits for a probe; later ones start at most one background refresh
+        once the result is older than ttl and return the old result meanwhile.
+        """
+        with self._lock:
+            result, age = self._result, self.clock() - self._checked_at
+            if result is not None and age >= self.ttl and not self._refreshing:
+                self._refreshing = True
+                self.refresh_thread = threading.Thread(target=self.refresh, name="health-probe", daemon=True)
+                self.refresh_thread.start()
+        if result is None:
+            with self._first_probe:
+                with self._lock:
+                    result, age = self._result, self.clock() - self._checked_at
+                if result is None:
+                    result, age = self.refresh(), 0.0
+        return result, age
+
+
+checker = HealthChecker(probe_database, HEALTH_CACHE_TTL, HEALTH_MAX_AGE)
+
+
+def readiness() -> tuple[dict[str, Any], int]:
+    """
+    Body and status code for /api/health/ready:
+    - unavailable (503): the last probe failed, or it is older than HEALTH_MAX_AGE
+    - degraded (200): the database answers but its migration is not this code's head
+    - ok (200) otherwise
+    """
+    from . import db as database
+
+    probe, age = checker.get()
+    code_head = code_migration_head()
+    current = None
+    if probe["migration"] is not None and code_head is not None:
+        current = probe["migration"] == code_head
+
+    pools = {}
+    if database.engine is not None:
+        pools["primary"] = pool_status(database.engine)
+        if database.read_engine is not database.engine:
+            pools["replica"] = pool_status(database.read_engine)
+
+    if not probe["reachable"] or age > checker.max_age:
+        status = "unavailable"
+    elif current is False:
+        status = "degraded"
+    else:
+        status = "ok"
+    body = {
+        "status": status,
+        "age_seconds": round(age, 2),
+        "database": {key: probe[key] for key in ("checked_at", "reachable", "connect_ms", "latency_ms", "error")},
+        "migrations": {"database": probe["migration"], "code": code_head, "current": current},
+        "pools": pools,
+    }
+    return body, 503 if status == "unavailable" else 200
@@ -0,0 +1,159 @@
+"""
+Helpers for migrations that run against large, live tables.
+
+- create_index_concurrently / drop_index_concurrently build or drop indexes
+  outside the migration transaction, so writes to the table are not blocked
+  while the index is built.
+- batched_backfill updates rows in short keyset-ordered batches, each
+  committed on its own. The last processed id is stored in
+  migration_checkpoints, so an interrupted backfill resumes where it stopped.
+
+Each helper records a timed step (duration, rows touched). Alembic's
+on_version_apply hook (see alembic/env.py) adds one step per revision.
+api/migrate.py returns the report and the alembic CLI prints it.
+"""
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+@dataclass
+class StepTiming:
+    name: str
+    seconds: float
+    rows: int | None = None
+
+
+_steps: list[StepTiming] = []
+_revision_started = time.perf_counter()
+
+
+def reset_report() -> None:
+    global _revision_started
+    _steps.clear()
+    _revision_started = time.perf_counter()
+
+
+def report() -> list[dict]:
+    return [asdict(step) for step in _steps]
+
+
+@contextmanager
+def timed_step(name: str) -> Iterator[StepTiming]:
+    """Time a block; set .rows on the yielded step to record rows touched."""
+    step = StepTiming(name, 0.0)
+    started = time.perf_counter()
+    try:
+        yield step
+    finally:
+        step.seconds = round(time.perf_counter() - started, 3)
+        _steps.append(step)
+
+
+def record_version_applied(ctx, step, heads, run_args) -> None:
+    """Alembic on_version_apply callback: one step per applied revision."""
+    global _revision_started
+    now = time.perf_counter()
+    direction = "upgrade" if step.is_upgrade else "downgrade"
+    _steps.append(StepTiming(f"{direction} {step.up_revision_id}", round(now - _revision_started, 3)))
+    _revision_started = now
+
+
+def _operations(operations):
+    if operations is None:
+        from alembic import op
+        return op
+    return operations
+
+
+@contextmanager
+def _autocommit(operations) -> Iterator[Connection]:
+    """Connection in autocommit mode for statements that refuse to run in a transaction."""
+    ops = _operations(operations)
+    with ops.get_context().autocommit_block():
+        conn = ops.get_bind()
+        # alembic reads the isolation level before switching to AUTOCOMMIT, and
+        # pg8000 opens a transaction for that query which the switch leaves open
+        conn.exec_driver_sql("COMMIT")
+        yield conn
+
+
+def create_index_concurrently(name: str, table: str, columns: Sequence[str], unique: bool = False,
+                              where: str | None = None, operations=None) -> None:
+    """CREATE INDEX CONCURRENTLY, dropping an invalid leftover from an interrupted build first."""
+    ops = _operations(operations)
+    with timed_step(f"create index {name}"), _autocommit(ops) as conn:
+        invalid = conn.scalar(text(
+            "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ), {"name": name})
+        if invalid:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        kwargs = {"postgresql_where": text(where)} if where else {}
+        ops.create_index(name, table, list(columns), unique=unique, postgresql_concurrently=True,
+                         if_not_exists=True, **kwargs)
+
+
+def drop_index_concurrently(name: str, table: str, operations=None) -> None:
+    ops = _operations(operations)
+    with timed_step(f"drop index {name}"), _autocommit(ops):
+        ops.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def batched_backfill(name: str, table: str, set_sql: str, where_sql: str = "true",
+                     batch_size: int = DEFAULT_BATCH_SIZE, key: str = "id", operations=None) -> int:
+    """
+    Run `UPDATE table SET set_sql WHERE where_sql` in batches of batch_size
+    rows ordered by `key`, committing after each batch. The updated table is
+    aliased `t`, so qualify columns in set_sql/where_sql as t.column. `name` identifies the
+    backfill in migration_checkpoints; a finished backfill is not run again.
+    Returns the rows updated by this call.
+    """
+    ops = _operations(operations)
+    total = 0
+    with timed_step(f"backfill {name}") as step, _autocommit(ops) as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS migration_checkpoints ("
+            "name VARCHAR(200) PRIMARY KEY, last_key BIGINT, rows_done BIGINT NOT NULL DEFAULT 0, "
+            "completed_at TIMESTAMP, updated_at TIMESTAMP NOT NULL DEFAULT now())"
+        ))
+        checkpoint = conn.execute(
+            text("SELECT last_key, completed_at FROM migration_checkpoints WHERE name = :name"), {"name": name}
+        ).first()
+        if checkpoint and checkpoint.completed_at:
+            step.rows = 0
+            return 0
+        last_key = checkpoint.last_key if checkpoint else None
+        batch = text(
+            f"WITH batch AS (SELECT {key} FROM {table} WHERE {key} > :last_key ORDER BY {key} LIMIT :limit), "
+            f"updated AS (UPDATE {table} t SET {set_sql} FROM batch WHERE t.{key} = batch.{key} AND ({where_sql}) "
+            f"RETURNING 1) "
+            f"SELECT (SELECT max({key}) FROM batch), (SELECT count(*) FROM updated)"
+        )
+        save = text(
+            "INSERT INTO migration_checkpoints (name, last_key, rows_done, updated_at) VALUES (:name, :last_key, :rows, now()) "
+            "ON CONFLICT (name) DO UPDATE SET last_key = excluded.last_key, "
+            "rows_done = migration_checkpoints.rows_done + excluded.rows_done, updated_at = now()"
+        )
+        while True:
+            batch_last, updated = conn.execute(
+                batch, {"last_key": last_key if last_key is not None else -(2 ** 63), "limit": batch_size}
+            ).one()
+            if batch_last is None:
+                break
+            # the batch update above has committed; record how far we got
+            conn.execute(save, {"name": name, "last_key": batch_last, "rows": updated})
+            last_key = batch_last
+            total += updated
+        conn.execute(text(
+            "INSERT INTO migration_checkpoints (name, last_key, completed_at) VALUES (:name, :last_key, now()) "
+            "ON CONFLICT (name) DO UPDATE SET completed_at = now(), updated_at = now()"
+        ), {"name": name, "last_key": last_key})
+        step.rows = total
+    return total
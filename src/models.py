@@ -1,9 +1,19 @@
 from datetime import datetime, date
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Date, ForeignKey, Text, Boolean, UniqueConstraint, Index, Float
+    Column, Integer, String, DateTime, Date, ForeignKey, Text, Boolean, UniqueConstraint, Index, Float, text, BigInteger, JSON,
+    Sequence, event, func, select, update, inspect
 )
-from sqlalchemy.orm import relationship, Mapped, mapped_column
+from sqlalchemy.orm import relationship, Mapped, mapped_column, validates, Session
 from .db import Base
+from .services.answers import answer_hash
+
+# Content revisions for delta sync (GET /api/lessons/changes). Every insert or
+# update of a lesson, problem or option takes the next value, and so does the
+# lesson containing a changed problem or option, see _bump_content_revisions.
+content_revision = Sequence("content_revision_seq", metadata=Base.metadata)
+# pg_advisory_xact_lock key serializing content writes, so revisions commit in order
+CONTENT_REVISION_LOCK = 480048
+_UTC_NOW = text("(now() at time zone 'utc')")
 
 
 class User(Base):
@@ -15,6 +25,10 @@ class User(Base):
     best_streak: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     last_activity_utc_date: Mapped[date | None] = mapped_column(Date, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Optimistic lock: every submission bumps it, see process_submission
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Lesson(Base):
@@ -23,6 +37,13 @@ class Lesson(Base):
     title: Mapped[str] = mapped_column(String(128), nullable=False)
     description: Mapped[str] = mapped_column(String(256), nullable=False)
     order_index: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+    revision: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=content_revision.next_value())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, server_default=_UTC_NOW)
+
+    __table_args__ = (
+        # drives GET /api/lessons/changes?since=<revision>
+        Index("ix_lessons_revision", "revision"),
+    )
 
 
 class Problem(Base):
@@ -33,6 +54,15 @@ class Problem(Base):
     prompt: Mapped[str] = mapped_column(Text, nullable=False)
     # For input problems
     correct_answer_text: Mapped[str | None] = mapped_column(String(64))
+    # sha256 of the canonical correct answer, kept in sync with correct_answer_text
+    correct_answer_hash: Mapped[str | None] = mapped_column(String(64))
+    revision: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=content_revision.next_value())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, server_default=_UTC_NOW)
+
+    @validates("correct_answer_text")
+    def _set_correct_answer_hash(self, key, value):
+        self.correct_answer_hash = answer_hash(value) if value is not None else None
+        return value
 
 
 class ProblemOption(Base):
@@ -41,6 +71,68 @@ class ProblemOption(Base):
     problem_id: Mapped[int] = mapped_column(ForeignKey("problems.id", ondelete="CASCADE"), index=True)
     text: Mapped[str] = mapped_column(String(128), nullable=False)
     is_correct: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    revision: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=content_revision.next_value())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, server_default=_UTC_NOW)
+
+
+class LessonTombstone(Base):
+    """A deleted lesson, reported to clients syncing from an older revision"""
+    __tablename__ = "lesson_tombstones"
+    lesson_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    revision: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True,
+                                          server_default=content_revision.next_value())
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+_CONTENT_MODELS = (Lesson, Problem, ProblemOption)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_content_revisions(session: Session, flush_context, instances) -> None:
+    """
+    Give changed content a new revision and touch the lessons containing it.
+
+    Inserts get their revision from the column default. Writes that bypass the
+    ORM unit of work (raw SQL, bulk update()/delete()) must bump revisions and
+    write tombstones themselves, or sync clients will not see them.
+    """
+    new = [o for o in session.new if isinstance(o, _CONTENT_MODELS)]
+    dirty = [o for o in session.dirty if isinstance(o, _CONTENT_MODELS) and session.is_modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, _CONTENT_MODELS)]
+    if not (new or dirty or deleted):
+        return
+    conn = session.connection()
+    # Held until commit: a revision taken by a later transaction can then never
+    # become visible before an earlier one, which a client could sync past
+    conn.execute(select(func.pg_advisory_xact_lock(CONTENT_REVISION_LOCK)))
+
+    now = datetime.utcnow()
+    for obj in dirty:
+        obj.revision = content_revision.next_value()
+        obj.updated_at = now
+    lesson_ids: set[int] = set()
+    problem_ids: set[int] = set()
+    for obj in new + dirty + deleted:
+        if isinstance(obj, Problem):
+            lesson_ids.add(obj.lesson_id)
+            lesson_ids.update(inspect(obj).attrs.lesson_id.history.deleted or ())
+        elif isinstance(obj, ProblemOption):
+            problem_ids.add(obj.problem_id)
+            problem_ids.update(inspect(obj).attrs.problem_id.history.deleted or ())
+    for obj in deleted:
+        if isinstance(obj, Lesson):
+            session.add(LessonTombstone(lesson_id=obj.id, deleted_at=now))
+    lesson_ids.discard(None)
+    problem_ids.discard(None)
+
+    touch = update(Lesson.__table__).values(revision=content_revision.next_value(), updated_at=now)
+    if lesson_ids:
+        conn.execute(touch.where(Lesson.__table__.c.id.in_(lesson_ids)))
+    if problem_ids:
+        problems = Problem.__table__
+        conn.execute(touch.where(Lesson.__table__.c.id.in_(
+            select(problems.c.lesson_id).where(problems.c.id.in_(problem_ids))
+        )))
 
 
 class Submission(Base):
@@ -57,6 +149,23 @@ class Submission(Base):
     best_streak_after: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     lesson_progress_after: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
 
+    __table_args__ = (
+        # Covers keyset pagination of a user's history by (created_at, id) desc
+        Index("ix_submissions_user_created", "user_id", "created_at", "id"),
+    )
+
+
+class SubmissionAttemptKey(Base):
+    """
+    Idempotency keys of recent submissions. Kept for IDEMPOTENCY_WINDOW_DAYS,
+    so the key index stays bounded even when submissions is partitioned and
+    has no global unique index on attempt_id.
+    """
+    __tablename__ = "submission_attempt_keys"
+    attempt_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
@@ -78,10 +187,82 @@ class UserProblemProgress(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     problem_id: Mapped[int] = mapped_column(ForeignKey("problems.id", ondelete="CASCADE"))
+    # Solved at least once
     is_correct: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    correct_attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    first_attempt_correct: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
     __table_args__ = (
         UniqueConstraint("user_id", "problem_id", name="uq_user_problem"),
         Index("ix_user_problem_user", "user_id"),
         Index("ix_user_problem_problem", "problem_id"),
-    ) 
\ No newline at end of file
+        # solved-problem counts for profile and lesson progress, answered from the index alone
+        Index("ix_user_problem_solved", "user_id", "problem_id", postgresql_where=text("is_correct")),
+    ) 
+
+
+class ProblemStats(Base):
+    """Precomputed answer counters per problem, across all users"""
+    __tablename__ = "problem_stats"
+    problem_id: Mapped[int] = mapped_column(ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True)
+    lesson_id: Mapped[int] = mapped_column(ForeignKey("lessons.id", ondelete="CASCADE"), index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    correct: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    first_try_correct: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class LessonStats(Base):
+    """Precomputed answer counters per lesson (sum over its problems)"""
+    __tablename__ = "lesson_stats"
+    lesson_id: Mapped[int] = mapped_column(ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    correct: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    first_try_correct: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class ReviewState(Base):
+    """Spaced-repetition schedule of one problem for one user"""
+    __tablename__ = "review_states"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    problem_id: Mapped[int] = mapped_column(ForeignKey("problems.id", ondelete="CASCADE"))
+    due_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    ease: Mapped[float] = mapped_column(Float, default=2.5, nullable=False)
+    interval_days: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    repetitions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    lapses: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "problem_id", name="uq_review_user_problem"),
+        Index("ix_review_states_user_due", "user_id", "due_at"),
+    )
+
+
+class OutboxEvent(Base):
+    """Event written in the transaction that caused it, consumed later by the outbox worker"""
+    __tablename__ = "outbox_events"
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # failed handler runs; the event is skipped once this reaches the retry limit
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        # the worker only ever scans pending events
+        Index("ix_outbox_events_pending", "id", postgresql_where=text("processed_at IS NULL")),
+    )
+
+
+class OutboxCheckpoint(Base):
+    """Progress of one outbox consumer"""
+    __tablename__ = "outbox_checkpoints"
+    consumer: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    events_processed: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    events_failed: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,260 @@
+"""
+Capture the SQL issued by the app and check its Postgres query plans.
+
+Used by scripts/check_query_plans.py and tests/test_query_plans.py: statements
+are recorded with an engine event while endpoints run, then each one is passed
+through EXPLAIN (FORMAT JSON) and the plan is checked for sequential scans on
+large tables and for cost growth against a stored baseline. Issues already
+recorded in the baseline for a statement are known and not reported again, so
+only regressions fail the check.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import re
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+
+# Tables with at least this many (estimated) rows count as large
+LARGE_TABLE_ROWS = 10000
+# Allowed total-cost growth against the baseline before it is flagged
+COST_TOLERANCE = 0.5
+# Cost increases smaller than this are planner noise on small tables
+COST_NOISE_FLOOR = 100.0
+
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+# Synthetic rows are tagged with this prefix so reseeding is idempotent
+SEED_PREFIX = "plan-check-"
+
+
+@dataclass
+class CapturedStatement:
+    label: str
+    statement: str
+    parameters: Any
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint(self.statement)
+
+
+@dataclass
+class PlanIssue:
+    kind: str  # seq_scan | missing_index | cost_growth
+    label: str
+    statement: str
+    detail: str
+    table: str | None = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.table}" if self.table else self.kind
+
+    def __str__(self) -> str:
+        return f"[{self.kind}] {self.label}: {self.detail}\n    {self.statement}"
+
+
+@dataclass
+class PlanReport:
+    plans: dict[str, dict[str, Any]] = field(default_factory=dict)
+    issues: list[PlanIssue] = field(default_factory=list)
+    known: list[PlanIssue] = field(default_factory=list)
+
+
+def fingerprint(statement: str) -> str:
+    normalized = re.sub(r"\s+", " ", statement).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+@contextmanager
+def capture_statements(engine: Engine, label: str, into: list[CapturedStatement]) -> Iterator[None]:
+    """Record every explainable statement executed on `engine` while active."""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().lower().startswith(_EXPLAINABLE):
+            return
+        into.append(CapturedStatement(label, statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(conn: Connection, statement: str, parameters: Any = None) -> dict[str, Any]:
+    """Return the top plan node of EXPLAIN (FORMAT JSON) for a driver-level statement."""
+    result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters or ())
+    raw = result.scalar()
+    doc = json.loads(raw) if isinstance(raw, str) else raw
+    return doc[0]["Plan"]
+
+
+def table_row_estimates(conn: Connection) -> dict[str, int]:
+    rows = conn.execute(text(
+        "SELECT c.relname, c.reltuples::bigint FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relkind IN ('r', 'p') AND n.nspname = current_schema()"
+    ))
+    return {name: max(int(tuples), 0) for name, tuples in rows}
+
+
+def iter_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from iter_nodes(child)
+
+
+def find_scan_issues(plan: dict[str, Any], table_rows: dict[str, int], label: str, statement: str,
+                     large_table_rows: int = LARGE_TABLE_ROWS) -> list[PlanIssue]:
+    """Flag sequential scans over large tables.
+
+    A filtered seq scan is reported as missing_index (an index on the filter
+    columns would let Postgres skip most of the table); an unfiltered one as a
+    plain seq_scan.
+    """
+    issues = []
+    for node in iter_nodes(plan):
+        if node.get("Node Type") != "Seq Scan":
+            continue
+        table = node.get("Relation Name")
+        rows = table_rows.get(table, 0)
+        if rows < large_table_rows:
+            continue
+        if "Filter" in node:
+            issues.append(PlanIssue("missing_index", label, statement,
+                                    f"seq scan on {table} (~{rows} rows) filtered by {node['Filter']}", table))
+        else:
+            issues.append(PlanIssue("seq_scan", label, statement, f"seq scan on {table} (~{rows} rows)", table))
+    return issues
+
+
+def find_cost_growth(fp: str, cost: float, baseline: dict[str, dict[str, Any]], label: str, statement: str,
+                     tolerance: float = COST_TOLERANCE) -> list[PlanIssue]:
+    previous = baseline.get(fp)
+    if not previous:
+        return []
+    limit = previous["total_cost"] * (1 + tolerance)
+    if cost > limit and cost - previous["total_cost"] >= COST_NOISE_FLOOR:
+        return [PlanIssue("cost_growth", label, statement,
+                          f"total cost {cost:.1f} vs baseline {previous['total_cost']:.1f}")]
+    return []
+
+
+def check_statements(conn: Connection, captured: list[CapturedStatement], baseline: dict[str, dict[str, Any]],
+                     large_table_rows: int = LARGE_TABLE_ROWS, tolerance: float = COST_TOLERANCE) -> PlanReport:
+    """EXPLAIN each distinct captured statement and collect plan issues.
+
+    report.plans has the shape of a baseline file, so it can be saved as the
+    new baseline once its issues are accepted.
+    """
+    table_rows = table_row_estimates(conn)
+    report = PlanReport()
+    for item in captured:
+        fp = item.fingerprint
+        if fp in report.plans:
+            continue
+        plan = explain(conn, item.statement, item.parameters)
+        cost = float(plan["Total Cost"])
+        scan_issues = find_scan_issues(plan, table_rows, item.label, item.statement, large_table_rows)
+        report.plans[fp] = {
+            "label": item.label,
+            "total_cost": cost,
+            "statement": item.statement,
+            "issues": sorted({issue.key for issue in scan_issues}),
+        }
+        accepted = set(baseline.get(fp, {}).get("issues", ()))
+        for issue in scan_issues:
+            (report.known if issue.key in accepted else report.issues).append(issue)
+        report.issues += find_cost_growth(fp, cost, baseline, item.label, item.statement, tolerance)
+    return report
+
+
+def _submit_payload(lesson: dict[str, Any]) -> dict[str, Any]:
+    answers = []
+    for problem in lesson["problems"]:
+        if problem["type"] == "mcq":
+            answers.append({"problem_id": problem["id"], "option_id": problem["options"][0]["id"]})
+        else:
+            answers.append({"problem_id": problem["id"], "value": "0"})
+    return {"attempt_id": f"{SEED_PREFIX}{uuid.uuid4()}", "answers": answers}
+
+
+def capture_hot_endpoints(client, engine: Engine) -> list[CapturedStatement]:
+    """Drive the hot API routes through a Flask test client and record their SQL."""
+    from .services.lessons import clear_catalog_cache
+
+    # start cold so the catalog queries behind /api/lessons/<id> are captured
+    clear_catalog_cache()
+    captured: list[CapturedStatement] = []
+    lessons = [item for item in client.get("/api/lessons").get_json() if item["total_problems"]]
+    if not lessons:
+        raise RuntimeError("no lessons with problems found; seed the database first")
+    lesson_id = lessons[0]["id"]
+
+    for label, path in (
+        ("GET /api/lessons", "/api/lessons"),
+        ("GET /api/lessons?format=ndjson", "/api/lessons?format=ndjson"),
+        ("GET /api/lessons/<id>", f"/api/lessons/{lesson_id}"),
+        ("GET /api/lessons/changes", "/api/lessons/changes?limit=20"),
+        ("GET /api/profile", "/api/profile"),
+        ("GET /api/submissions", "/api/submissions"),
+    ):
+        with capture_statements(engine, label, captured):
+            client.get(path).get_data()
+
+    lesson = client.get(f"/api/lessons/{lesson_id}").get_json()
+    with capture_statements(engine, "POST /api/lessons/<id>/submit", captured):
+        client.post(f"/api/lessons/{lesson_id}/submit", json=_submit_payload(lesson))
+    return captured
+
+
+def seed_plan_check_data(conn: Connection, lessons: int = 200, problems_per_lesson: int = 10, users: int = 200,
+                         progress_per_user: int = 100, submissions_per_user: int = 50) -> None:
+    """Bulk-load synthetic content and history so the planner sees production-like tables."""
+    if conn.scalar(text("SELECT 1 FROM users WHERE username LIKE :p LIMIT 1"), {"p": f"{SEED_PREFIX}%"}):
+        return
+    params = {"p": SEED_PREFIX, "like": f"{SEED_PREFIX}%", "lessons": lessons, "per": problems_per_lesson,
+              "users": users, "progress": progress_per_user, "subs": submissions_per_user}
+    for sql in (
+        "INSERT INTO users (id, username, total_xp, current_streak, best_streak, created_at) "
+        "VALUES (1, 'demo', 0, 0, 0, now()) ON CONFLICT DO NOTHING",
+        "INSERT INTO lessons (title, description, order_index) "
+        "SELECT :p || g, 'synthetic', 100000 + g FROM generate_series(1, :lessons) g",
+        "INSERT INTO problems (lesson_id, type, prompt, correct_answer_text) "
+        "SELECT l.id, 'input', 'synthetic', '1' FROM lessons l, generate_series(1, :per) "
+        "WHERE l.title LIKE :like",
+        "INSERT INTO users (id, username, total_xp, current_streak, best_streak, created_at) "
+        "SELECT (SELECT max(id) FROM users) + g, :p || g, 0, 0, 0, now() FROM generate_series(1, :users) g",
+        "INSERT INTO user_problem_progress (user_id, problem_id, is_correct, attempts, correct_attempts, "
+        "first_attempt_correct) "
+        "SELECT u.id, p.id, true, 1, 1, true FROM users u "
+        "CROSS JOIN LATERAL (SELECT id FROM problems ORDER BY random() LIMIT :progress) p "
+        "WHERE u.username LIKE :like",
+        "INSERT INTO submissions (attempt_id, user_id, lesson_id, created_at, correct_count, earned_xp, "
+        "total_xp_after, current_streak_after, best_streak_after, lesson_progress_after) "
+        "SELECT :p || u.id || '-' || g, u.id, (SELECT min(id) FROM lessons), "
+        "now() - make_interval(hours => g), 0, 0, 0, 0, 0, 0 FROM users u, generate_series(1, :subs) g "
+        "WHERE u.username LIKE :like",
+    ):
+        conn.execute(text(sql), params)
+    conn.execute(text("ANALYZE"))
+
+
+def load_baseline(path: str) -> dict[str, dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, plans: dict[str, dict[str, Any]]) -> None:
+    with open(path, "w") as f:
+        json.dump(plans, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,138 @@
+"""
+Request-scoped database sessions.
+
+Views decorated with @with_db get their session from get_db(). The first call
+creates it, and a connection is checked out only when the session first
+queries, so each request uses at most one connection. After a write view
+returns, the decorator commits before the response is sent and then runs any
+on_commit callbacks. Service exceptions are turned into the API's JSON error
+responses in one place. With retries=N, a view that loses an optimistic-lock
+race is rolled back and run again, up to N more times, after a short random
+backoff.
+
+The appcontext teardown closes the session and removes it from its
+scoped_session registry. It runs after a streamed response finishes, so
+streaming views can keep using get_db() while they stream.
+"""
+from __future__ import annotations
+import random
+import time
+from functools import lru_cache, wraps
+from typing import Callable
+from flask import Flask, g, jsonify
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from . import db as database
+from .singleflight import SingleFlightTimeout
+
+
+@lru_cache(maxsize=None)
+def error_responses() -> list[tuple[type, str, int]]:
+    """
+    exception type -> (error code, HTTP status); the first match wins. Built on
+    first use: the service exceptions live with the services, which are only
+    imported by the views that need them.
+    """
+    from .services.submit import ConcurrentSubmissionError, DuplicateAttemptError, InvalidProblemError, ValidationError
+
+    return [
+        (DuplicateAttemptError, 'DuplicateAttempt', 409),
+        (InvalidProblemError, 'InvalidProblem', 422),
+        (ValidationError, 'Validation', 400),
+        (ConcurrentSubmissionError, 'ConcurrentUpdate', 409),
+        (StaleDataError, 'ConcurrentUpdate', 409),
+    ]
+
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> tuple[type, ...]:
+    """Errors after which the whole view can safely run again in a new transaction."""
+    from .services.submit import ConcurrentSubmissionError
+
+    return ConcurrentSubmissionError, StaleDataError
+# upper bound of the first retry's random backoff, doubled on each retry
+RETRY_BACKOFF = 0.01
+
+
+def get_db(user_id: int | None = None) -> Session:
+    """
+    The current request's session. In read-only views it comes from the
+    replica unless user_id has just written (see src.db.read_session_factory).
+    """
+    session = g.get("db_session")
+    if session is None:
+        if g.get("db_read_only") and user_id is not None:
+            registry = database.read_session_factory(user_id)
+        else:
+            registry = database.SessionLocal
+        # only remove registry entries this request created
+        g.db_registry = registry if not registry.registry.has() else None
+        session = g.db_session = registry()
+    return session
+
+
+def on_commit(callback: Callable[[], None]) -> None:
+    """Run callback after the current request's transaction commits."""
+    g.setdefault("db_on_commit", []).append(callback)
+
+
+def error_response(e: Exception):
+    for exc_type, code, status in error_responses():
+        if isinstance(e, exc_type):
+            body = {'error': code, 'message': str(e)}
+            if getattr(e, 'errors', None):
+                body['details'] = e.errors
+            return jsonify(body), status
+    if isinstance(e, SingleFlightTimeout):
+        return jsonify({'error': 'DatabaseError', 'message': 'Timed out loading data'}), 503
+    if isinstance(e, OperationalError):
+        return jsonify({'error': 'DatabaseError', 'message': 'Database connection failed'}), 503
+    return jsonify({'error': 'InternalError', 'message': str(e)}), 500
+
+
+def with_db(read_only: bool = False, retries: int = 0):
+    """View decorator: request session, commit for write views, shared error responses."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if database.SessionLocal is None:
+                return jsonify({'error': 'DatabaseError', 'message': 'Database not configured'}), 503
+            g.db_read_only = read_only
+            for attempt in range(retries + 1):
+                try:
+                    rv = view(*args, **kwargs)
+                    session = g.get("db_session")
+                    if session is not None and not read_only:
+                        session.commit()
+                        for callback in g.pop("db_on_commit", ()):
+                            callback()
+                    return rv
+                except Exception as e:
+                    session = g.get("db_session")
+                    if session is not None:
+                        session.rollback()
+                    g.pop("db_on_commit", None)
+                    if attempt == retries or not isinstance(e, retryable_errors()):
+                        return error_response(e)
+                time.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** attempt))
+
+        return wrapper
+
+    return decorator
+
+
+def close_request_session(exc: BaseException | None = None) -> None:
+    session = g.pop("db_session", None)
+    if session is None:
+        return
+    registry = g.pop("db_registry", None)
+    if registry is not None:
+        registry.remove()  # closes the session: rollback of anything uncommitted, connection returned
+    else:
+        session.close()
+
+
+def init_request_sessions(app: Flask) -> None:
+    app.teardown_appcontext(close_request_session)
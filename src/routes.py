@@ -1,116 +1,150 @@
 from flask import request, jsonify
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError, OperationalError
-from .db import SessionLocal
-from .services.lessons import get_lessons_with_progress, get_lesson_detail
-from .services.submit import process_submission, DuplicateAttemptError, ValidationError, InvalidProblemError
+import os
+from .db import pin_to_primary
+from .db_metrics import snapshot as db_metrics_snapshot
+from . import slow_query
+from .request_session import get_db, on_commit, with_db
+from .streaming import stream_items
+from .admission import admission_controlled, submit_admission
+from .compression import cache_compressed
+
+# Services (and the pydantic schemas they use) are imported in the views that
+# need them, so a cold start only loads what its first request uses
 
 DEMO_USER_ID = 1
+# Times a submit is re-run after losing a race with another submit of the same user
+SUBMIT_CONFLICT_RETRIES = int(os.getenv("SUBMIT_CONFLICT_RETRIES", "3"))
+# Exposes /api/debug/* endpoints; keep off in production
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "").lower() in ("1", "true", "yes")
+STREAM_FORMATS = ("stream", "ndjson")
 
 def register_routes(app):
     """Register all API routes"""
     
     @app.route('/api/lessons', methods=['GET'])
+    @cache_compressed
+    @with_db(read_only=True)
     def list_lessons():
-        """List all lessons with progress for the demo user"""
-        if SessionLocal is None:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database not configured'}), 503
-            
-        try:
-            db: Session = SessionLocal()
-            try:
-                items = get_lessons_with_progress(db, DEMO_USER_ID)
-                return jsonify(items)
-            finally:
-                db.close()
-        except OperationalError as e:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database connection failed'}), 503
-        except Exception as e:
-            return jsonify({'error': 'InternalError', 'message': str(e)}), 500
+        """List all lessons with progress for the demo user
+
+        ?format=stream sends a streamed JSON array, ?format=ndjson one lesson per line.
+        """
+        from .services.lessons import get_lessons_with_progress, iter_lessons_with_progress
+        fmt = request.args.get('format', 'json')
+        if fmt != 'json' and fmt not in STREAM_FORMATS:
+            return jsonify({'error': 'Validation', 'message': f'unknown format: {fmt}'}), 400
+
+        db = get_db(DEMO_USER_ID)
+        if fmt in STREAM_FORMATS:
+            # the request session is closed once streaming finishes
+            return stream_items(iter_lessons_with_progress(db, DEMO_USER_ID), fmt)
+        return jsonify(get_lessons_with_progress(db, DEMO_USER_ID))
+
+    @app.route('/api/lessons/changes', methods=['GET'])
+    @cache_compressed
+    @with_db(read_only=True)
+    def lesson_changes():
+        """Lessons changed or deleted since a content revision (?since=0 for everything, ?limit=)"""
+        from .services.content_sync import get_content_changes, DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT
+        since = request.args.get('since', 0, type=int)
+        limit = request.args.get('limit', DEFAULT_CHANGES_LIMIT, type=int)
+        if since < 0:
+            return jsonify({'error': 'Validation', 'message': 'since must be a revision >= 0'}), 400
+        if limit < 1 or limit > MAX_CHANGES_LIMIT:
+            return jsonify({'error': 'Validation', 'message': f'limit must be between 1 and {MAX_CHANGES_LIMIT}'}), 400
+        return jsonify(get_content_changes(get_db(), since, limit))
 
     @app.route('/api/lessons/<int:lesson_id>', methods=['GET'])
+    @cache_compressed
+    @with_db(read_only=True)
     def get_lesson(lesson_id):
         """Get lesson details with problems (correct answers not included)"""
-        if SessionLocal is None:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database not configured'}), 503
-            
-        try:
-            db: Session = SessionLocal()
-            try:
-                data = get_lesson_detail(db, DEMO_USER_ID, lesson_id)
-                if not data:
-                    return jsonify({'error': 'NotFound', 'message': 'Lesson not found'}), 404
-                return jsonify(data)
-            finally:
-                db.close()
-        except OperationalError as e:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database connection failed'}), 503
-        except Exception as e:
-            return jsonify({'error': 'InternalError', 'message': str(e)}), 500
+        from .services.lessons import get_lesson_detail
+        data = get_lesson_detail(get_db(DEMO_USER_ID), DEMO_USER_ID, lesson_id)
+        if not data:
+            return jsonify({'error': 'NotFound', 'message': 'Lesson not found'}), 404
+        return jsonify(data)
 
     @app.route('/api/lessons/<int:lesson_id>/submit', methods=['POST'])
+    @admission_controlled(submit_admission, key=lambda: DEMO_USER_ID)
+    @with_db(retries=SUBMIT_CONFLICT_RETRIES)
     def submit_lesson(lesson_id):
         """Submit answers for a lesson (idempotent)"""
-        if SessionLocal is None:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database not configured'}), 503
-            
-        try:
-            db: Session = SessionLocal()
-            try:
-                payload = request.get_json(silent=True) or {}
-                try:
-                    result = process_submission(db, DEMO_USER_ID, lesson_id, payload)
-                    db.commit()
-                    return jsonify(result)
-                except DuplicateAttemptError as e:
-                    db.rollback()
-                    return jsonify({'error': 'DuplicateAttempt', 'message': str(e)}), 409
-                except InvalidProblemError as e:
-                    db.rollback()
-                    return jsonify({'error': 'InvalidProblem', 'message': str(e)}), 422
-                except ValidationError as e:
-                    db.rollback()
-                    return jsonify({'error': 'Validation', 'message': str(e)}), 400
-            except Exception:
-                db.rollback()
-                raise
-            finally:
-                db.close()
-        except OperationalError as e:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database connection failed'}), 503
-        except Exception as e:
-            return jsonify({'error': 'InternalError', 'message': str(e)}), 500
+        from .services.outbox import drain_after_commit
+        from .services.submit import process_submission
+        # validated straight from the JSON body, see src/schemas.py
+        result = process_submission(get_db(), DEMO_USER_ID, lesson_id, request.get_data())
+        on_commit(lambda: pin_to_primary(DEMO_USER_ID))
+        # fallback for deployments without a running outbox worker
+        on_commit(lambda: drain_after_commit(get_db()))
+        return jsonify(result)
+
+    @app.route('/api/submissions', methods=['GET'])
+    @with_db(read_only=True)
+    def submission_history():
+        """List the demo user's submissions, newest first (?lesson_id=, ?limit=, ?cursor=)"""
+        from .services.submissions import list_submissions, DEFAULT_PAGE_SIZE
+        lesson_id = request.args.get('lesson_id', type=int)
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        cursor = request.args.get('cursor')
+        return jsonify(list_submissions(get_db(), DEMO_USER_ID, lesson_id, limit, cursor))
+
+    @app.route('/api/stats/problems', methods=['GET'])
+    @with_db(read_only=True)
+    def problem_stats():
+        """Accuracy counters per problem, hardest first (?lesson_id= adds the lesson totals)"""
+        from .services.stats import get_problem_stats
+        lesson_id = request.args.get('lesson_id', type=int)
+        return jsonify(get_problem_stats(get_db(), lesson_id))
+
+    @app.route('/api/practice/next', methods=['GET'])
+    @with_db(read_only=True)
+    def next_practice():
+        """Next problems to practice for the demo user: due reviews first, then unseen problems (?n=10)"""
+        from .services.practice import get_next_practice, MAX_BATCH as PRACTICE_MAX_BATCH
+        n = request.args.get('n', 10, type=int)
+        if n < 1 or n > PRACTICE_MAX_BATCH:
+            return jsonify({'error': 'Validation', 'message': f'n must be between 1 and {PRACTICE_MAX_BATCH}'}), 400
+        return jsonify({'items': get_next_practice(get_db(), DEMO_USER_ID, n)})
 
     @app.route('/api/profile', methods=['GET'])
+    @with_db(read_only=True)
     def get_profile():
         """Get user profile and statistics"""
-        if SessionLocal is None:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database not configured'}), 503
-            
         from sqlalchemy import select, func
         from .models import User, Problem, UserProblemProgress
-        try:
-            db: Session = SessionLocal()
-            try:
-                user = db.get(User, DEMO_USER_ID)
-                if not user:
-                    return jsonify({'error': 'NotFound', 'message': 'User not found'}), 404
-                total_problems = db.scalar(select(func.count(Problem.id))) or 0
-                total_correct = db.scalar(select(func.count(UserProblemProgress.id)).where(
-                    UserProblemProgress.user_id == DEMO_USER_ID,
-                    UserProblemProgress.is_correct == True
-                )) or 0
-                progress = (total_correct / total_problems) if total_problems else 0.0
-                return jsonify({
-                    "user_id": user.id,
-                    "username": user.username,
-                    "total_xp": user.total_xp,
-                    "streak": {"current": user.current_streak, "best": user.best_streak},
-                    "progress": round(progress, 4)
-                })
-            finally:
-                db.close()
-        except OperationalError as e:
-            return jsonify({'error': 'DatabaseError', 'message': 'Database connection failed'}), 503
-        except Exception as e:
-            return jsonify({'error': 'InternalError', 'message': str(e)}), 500 
\ No newline at end of file
+        db = get_db(DEMO_USER_ID)
+        user = db.get(User, DEMO_USER_ID)
+        if not user:
+            return jsonify({'error': 'NotFound', 'message': 'User not found'}), 404
+        total_problems = db.scalar(select(func.count(Problem.id))) or 0
+        total_correct = db.scalar(select(func.count(UserProblemProgress.id)).where(
+            UserProblemProgress.user_id == DEMO_USER_ID,
+            UserProblemProgress.is_correct == True
+        )) or 0
+        progress = (total_correct / total_problems) if total_problems else 0.0
+        return jsonify({
+            "user_id": user.id,
+            "username": user.username,
+            "total_xp": user.total_xp,
+            "streak": {"current": user.current_streak, "best": user.best_streak},
+            "progress": round(progress, 4)
+        })
+
+    @app.route('/api/debug/db', methods=['GET'])
+    def debug_db():
+        """Per-engine connection and statement counters (only with DEBUG_ENDPOINTS=1)"""
+        if not DEBUG_ENDPOINTS:
+            return jsonify({'error': 'NotFound', 'message': 'Not found'}), 404
+        return jsonify(db_metrics_snapshot())
+
+    @app.route('/api/debug/slow-queries', methods=['GET'])
+    def debug_slow_queries():
+        """Recent statements over SLOW_QUERY_MS, newest first, with sampled EXPLAIN ANALYZE plans"""
+        if not DEBUG_ENDPOINTS:
+            return jsonify({'error': 'NotFound', 'message': 'Not found'}), 404
+        return jsonify({
+            'threshold_ms': slow_query.SLOW_QUERY_MS,
+            'explain_sample': slow_query.SLOW_QUERY_EXPLAIN_SAMPLE,
+            'queries': slow_query.recent_slow_queries(),
+        })
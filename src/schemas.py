@@ -0,0 +1,52 @@
+"""
+Request payload schemas.
+
+pydantic compiles each model's validator once at import. A submit payload is
+then checked in a single pass of pydantic-core, straight from the request
+body's JSON bytes, into typed answer objects. Errors keep their location,
+e.g. ("answers", 3, "mcq", "option_id").
+
+An answer is multiple choice if it has an option_id, and free input
+otherwise. The tag is picked from the item's keys, so only the matching
+model's validator runs on it.
+"""
+from __future__ import annotations
+from typing import Annotated, Any, Union
+from pydantic import BaseModel, ConfigDict, Discriminator, Field, StrictInt, StrictStr, Tag
+
+
+class McqAnswer(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    problem_id: StrictInt
+    option_id: StrictInt
+
+
+class InputAnswer(BaseModel):
+    # numeric answers are graded on their text, like "12"
+    model_config = ConfigDict(frozen=True, coerce_numbers_to_str=True)
+
+    problem_id: StrictInt
+    value: str
+
+
+def _answer_kind(item: Any) -> str | None:
+    if isinstance(item, dict):
+        return "mcq" if "option_id" in item else "input"
+    if isinstance(item, McqAnswer):
+        return "mcq"
+    if isinstance(item, InputAnswer):
+        return "input"
+    return None
+
+
+Answer = Annotated[
+    Union[Annotated[McqAnswer, Tag("mcq")], Annotated[InputAnswer, Tag("input")]],
+    Discriminator(_answer_kind, custom_error_type="answer_type",
+                  custom_error_message="answer items must be objects"),
+]
+
+
+class SubmitPayload(BaseModel):
+    attempt_id: Annotated[StrictStr, Field(min_length=1, max_length=64)]
+    answers: Annotated[list[Answer], Field(min_length=1)]
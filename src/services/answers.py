@@ -0,0 +1,67 @@
+from __future__ import annotations
+import ast
+import hashlib
+import operator
+import re
+from fractions import Fraction
+from functools import lru_cache
+
+# Longest answer we try to evaluate as arithmetic; anything longer is compared as text
+MAX_EXPRESSION_LENGTH = 64
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_SYMBOLS = str.maketrans({"×": "*", "·": "*", "÷": "/", "−": "-"})
+_LEADING_ZEROS = re.compile(r"(?<![\d.])0+(?=\d)")
+
+
+def _evaluate(node: ast.AST) -> Fraction:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        # repr keeps the literal as written, so 0.1 becomes exactly 1/10
+        return Fraction(repr(node.value))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand))
+    raise ValueError("not an arithmetic expression")
+
+
+def _as_number(text: str) -> Fraction | None:
+    if not text or len(text) > MAX_EXPRESSION_LENGTH:
+        return None
+    try:
+        return _evaluate(ast.parse(_LEADING_ZEROS.sub("", text), mode="eval"))
+    except (SyntaxError, ValueError, ZeroDivisionError, RecursionError):
+        return None
+
+
+def canonicalize_answer(value: object) -> str:
+    """
+    Canonical form of an answer, so equivalent answers compare equal.
+    - Integers, decimals, fractions and + - * / expressions reduce to an exact
+      rational: "6", "6.0", "06" and "12/2" all become "6"; "0.5" and "2/4" become "1/2"
+    - Anything else is lowercased with whitespace collapsed
+    """
+    text = " ".join(str(value).translate(_SYMBOLS).strip().lower().split())
+    number = _as_number(text)
+    if number is None:
+        return text
+    return str(number.numerator) if number.denominator == 1 else f"{number.numerator}/{number.denominator}"
+
+
+def answer_hash(value: object) -> str:
+    """sha256 of the canonical form; this is what gets stored and compared."""
+    return hashlib.sha256(canonicalize_answer(value).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def cached_answer_hash(value: str) -> str:
+    """answer_hash for correct answers loaded without a stored hash (e.g. rows bulk-inserted in SQL)."""
+    return answer_hash(value)
@@ -0,0 +1,214 @@
+"""
+Compact in-memory catalog of lessons, problems and options.
+
+Holding the catalog as ORM objects costs several hundred bytes per problem and
+per option. Here each field is a column: `array` for ids, offsets and flags, a
+bytearray for the packed answer hashes, and lists of strings for text, with
+option texts interned since they repeat across problems ("1", "2", "True").
+Rows are grouped CSR-style:
+
+- lessons are sorted by id, and lesson i owns problems
+  problem_start[i]:problem_start[i + 1]
+- within a lesson, problems are sorted by id, and problem j owns options
+  option_start[j]:option_start[j + 1], also sorted by id
+
+Every lookup is a bisect over a sorted id column, restricted to its parent's
+range. CatalogProblem is a small __slots__ view created on demand. It has the
+attributes process_submission reads from a Problem.
+"""
+from __future__ import annotations
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterable
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..models import Lesson, LessonTombstone, Problem, ProblemOption
+from .answers import cached_answer_hash
+
+PROBLEM_TYPES = ("mcq", "input")
+_TYPE_CODES = {name: code for code, name in enumerate(PROBLEM_TYPES)}
+HASH_BYTES = 32
+
+
+def _find(ids: array, value: int, lo: int, hi: int) -> int:
+    """Index of value in the sorted slice ids[lo:hi], or -1."""
+    i = bisect_left(ids, value, lo, hi)
+    return i if i < hi and ids[i] == value else -1
+
+
+class CatalogProblem:
+    __slots__ = ("catalog", "index", "id", "lesson_id", "type")
+
+    def __init__(self, catalog: "CompactCatalog", index: int, lesson_id: int):
+        self.catalog = catalog
+        self.index = index
+        self.id = catalog.problem_ids[index]
+        self.lesson_id = lesson_id
+        self.type = PROBLEM_TYPES[catalog.problem_types[index]]
+
+    @property
+    def prompt(self) -> str:
+        return self.catalog.prompts[self.index]
+
+    @property
+    def correct_answer_hash(self) -> str | None:
+        if self.type != "input":
+            return None
+        offset = self.index * HASH_BYTES
+        return self.catalog.answer_hashes[offset:offset + HASH_BYTES].hex()
+
+    def option_is_correct(self, option_id: int) -> bool | None:
+        """Whether option_id is a correct option of this problem; None if it is not one of its options."""
+        catalog = self.catalog
+        i = _find(catalog.option_ids, option_id, catalog.option_start[self.index], catalog.option_start[self.index + 1])
+        return None if i < 0 else bool(catalog.option_correct[i])
+
+    def options(self) -> list[dict[str, Any]]:
+        catalog = self.catalog
+        start, end = catalog.option_start[self.index], catalog.option_start[self.index + 1]
+        return [{"id": catalog.option_ids[i], "text": catalog.option_texts[i]} for i in range(start, end)]
+
+
+class CompactCatalog:
+    __slots__ = (
+        "lesson_ids", "lesson_titles", "lesson_descriptions", "problem_start",
+        "problem_ids", "problem_types", "prompts", "answer_hashes", "option_start",
+        "option_ids", "option_texts", "option_correct", "content_revision",
+    )
+
+    def __init__(self):
+        self.lesson_ids = array("q")
+        self.lesson_titles: list[str] = []
+        self.lesson_descriptions: list[str] = []
+        self.problem_start = array("q", [0])
+        self.problem_ids = array("q")
+        self.problem_types = bytearray()
+        self.prompts: list[str] = []
+        self.answer_hashes = bytearray()
+        self.option_start = array("q", [0])
+        self.option_ids = array("q")
+        self.option_texts: list[str] = []
+        self.option_correct = bytearray()
+        # content revision (src/models.py) the rows were read at; 0 if unknown
+        self.content_revision = 0
+
+    @classmethod
+    def build(cls, lessons: Iterable[tuple], problems: Iterable[tuple], options: Iterable[tuple]) -> "CompactCatalog":
+        """
+        Build from row tuples, each iterable sorted as stated:
+        - lessons (id, title, description) by id
+        - problems (id, lesson_id, type, correct_answer_hash, correct_answer_text, prompt) by (lesson_id, id)
+        - options (id, problem_id, text, is_correct) in problem order, then by id
+        Every problem must belong to one of the lessons and every option to one of the problems.
+        """
+        catalog = cls()
+        for lesson_id, title, description in lessons:
+            catalog.lesson_ids.append(lesson_id)
+            catalog.lesson_titles.append(title)
+            catalog.lesson_descriptions.append(description)
+
+        counts = array("q", bytes(8 * len(catalog.lesson_ids)))
+        lesson_index = -1
+        for problem_id, lesson_id, type_, answer_hash, answer_text, prompt in problems:
+            if lesson_index < 0 or catalog.lesson_ids[lesson_index] != lesson_id:
+                lesson_index = _find(catalog.lesson_ids, lesson_id, 0, len(catalog.lesson_ids))
+                if lesson_index < 0:
+                    raise ValueError(f"problem {problem_id} belongs to unknown lesson {lesson_id}")
+            counts[lesson_index] += 1
+            catalog.problem_ids.append(problem_id)
+            catalog.problem_types.append(_TYPE_CODES[type_])
+            catalog.prompts.append(prompt)
+            if type_ == "input":
+                answer_hash = answer_hash or cached_answer_hash(answer_text or "")
+                catalog.answer_hashes += bytes.fromhex(answer_hash)
+            else:
+                catalog.answer_hashes += bytes(HASH_BYTES)
+        for count in counts:
+            catalog.problem_start.append(catalog.problem_start[-1] + count)
+
+        problem_index = 0
+        n_problems = len(catalog.problem_ids)
+        for option_id, problem_id, text, is_correct in options:
+            while problem_index < n_problems and catalog.problem_ids[problem_index] != problem_id:
+                problem_index += 1
+                catalog.option_start.append(len(catalog.option_ids))
+            if problem_index == n_problems:
+                raise ValueError(f"option {option_id} belongs to unknown or out-of-order problem {problem_id}")
+            catalog.option_ids.append(option_id)
+            catalog.option_texts.append(sys.intern(text))
+            catalog.option_correct.append(1 if is_correct else 0)
+        while len(catalog.option_start) <= n_problems:
+            catalog.option_start.append(len(catalog.option_ids))
+        return catalog
+
+    def _lesson_index(self, lesson_id: int) -> int:
+        return _find(self.lesson_ids, lesson_id, 0, len(self.lesson_ids))
+
+    def lesson_problems(self, lesson_id: int) -> list[CatalogProblem]:
+        i = self._lesson_index(lesson_id)
+        if i < 0:
+            return []
+        return [CatalogProblem(self, j, lesson_id) for j in range(self.problem_start[i], self.problem_start[i + 1])]
+
+    def find_problem(self, lesson_id: int, problem_id: int) -> CatalogProblem | None:
+        i = self._lesson_index(lesson_id)
+        if i < 0:
+            return None
+        j = _find(self.problem_ids, problem_id, self.problem_start[i], self.problem_start[i + 1])
+        return None if j < 0 else CatalogProblem(self, j, lesson_id)
+
+    def lesson_detail(self, lesson_id: int) -> dict[str, Any] | None:
+        """Same shape as the cached lesson catalog in services/lessons.py."""
+        i = self._lesson_index(lesson_id)
+        if i < 0:
+            return None
+        problems = []
+        for p in self.lesson_problems(lesson_id):
+            item = {"id": p.id, "type": p.type, "prompt": p.prompt}
+            if p.type == "mcq":
+                item["options"] = p.options()
+            problems.append(item)
+        return {
+            "id": lesson_id,
+            "title": self.lesson_titles[i],
+            "description": self.lesson_descriptions[i],
+            "problems": problems,
+        }
+
+    def __len__(self) -> int:
+        return len(self.problem_ids)
+
+
+def current_content_revision(db: Session) -> int:
+    """Highest revision of any lesson or lesson tombstone; every content change raises it."""
+    return db.scalar(select(func.greatest(
+        select(func.coalesce(func.max(Lesson.revision), 0)).scalar_subquery(),
+        select(func.coalesce(func.max(LessonTombstone.revision), 0)).scalar_subquery(),
+    )))
+
+
+def load_compact_catalog(db: Session, chunk_size: int = 10000) -> CompactCatalog:
+    """
+    Load the whole catalog, streaming rows from server-side cursors. The
+    content revision is read first, so any change the rows might miss has a
+    higher revision than the catalog's.
+    """
+    content_revision = current_content_revision(db)
+    stream = {"stream_results": True, "yield_per": chunk_size}
+    lessons = db.execute(
+        select(Lesson.id, Lesson.title, Lesson.description).order_by(Lesson.id).execution_options(**stream)
+    )
+    problems = db.execute(
+        select(Problem.id, Problem.lesson_id, Problem.type, Problem.correct_answer_hash,
+               Problem.correct_answer_text, Problem.prompt)
+        .order_by(Problem.lesson_id, Problem.id).execution_options(**stream)
+    )
+    options = db.execute(
+        select(ProblemOption.id, ProblemOption.problem_id, ProblemOption.text, ProblemOption.is_correct)
+        .join(Problem, Problem.id == ProblemOption.problem_id)
+        .order_by(Problem.lesson_id, Problem.id, ProblemOption.id).execution_options(**stream)
+    )
+    catalog = CompactCatalog.build(lessons, problems, options)
+    catalog.content_revision = content_revision
+    return catalog
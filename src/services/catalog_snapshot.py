@@ -0,0 +1,238 @@
+"""
+Memory-mapped catalog snapshot shared by pre-forked workers.
+
+scripts/export_catalog_snapshot.py writes the CompactCatalog columns to one
+binary file. Workers mmap it read-only, so every process on the host shares
+the same page-cache copy of the catalog, and MappedCatalog serves lookups
+through memoryviews into the mapping without copying. Strings are decoded
+only when read.
+
+File layout (little-endian, sections 8-byte aligned):
+
+    header   magic, format version, section count, catalog version, content
+             revision of the exported rows
+    table    per section: name, typecode, offset, item count
+    sections the CompactCatalog columns. Each string column is stored as
+             "<name>@o" (count + 1 offsets into its pool) and "<name>@s" (the
+             UTF-8 pool). Option texts are deduplicated: "option_texts@r" maps
+             each option to its string.
+
+A new export gets the previous file's version + 1. It is written to a
+temporary file and renamed over the old one, so readers see either the whole
+old file or the whole new one. get_snapshot() notices the rename within
+CATALOG_SNAPSHOT_CHECK_INTERVAL seconds and maps the new file. Requests still
+holding the old mapping keep using it until they finish.
+
+With CATALOG_SNAPSHOT_PATH unset nothing changes. Lessons missing from the
+snapshot are still served from the database, and so are lessons changed or
+deleted after the export: snapshot_for_lesson() compares the snapshot's content
+revision with the lessons' (see src/models.py). The list of changed lessons is
+re-read every CATALOG_SNAPSHOT_CHECK_INTERVAL seconds, so an edit reaches
+lesson details and grading within that time. Re-export after editing content
+to serve those lessons from the snapshot again.
+"""
+from __future__ import annotations
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import Iterable
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models import Lesson, LessonTombstone
+from .catalog import CompactCatalog
+
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH") or None
+# How often a worker checks whether the snapshot file was replaced
+CATALOG_SNAPSHOT_CHECK_INTERVAL = float(os.getenv("CATALOG_SNAPSHOT_CHECK_INTERVAL", "5"))
+
+MAGIC = b"MQCATSNP"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sIIqq")
+_SECTION = struct.Struct("<24sc7xqq")
+_ARRAY_COLUMNS = (
+    ("lesson_ids", "q"), ("problem_start", "q"), ("problem_ids", "q"), ("problem_types", "B"),
+    ("answer_hashes", "B"), ("option_start", "q"), ("option_ids", "q"), ("option_correct", "B"),
+)
+_STRING_COLUMNS = ("lesson_titles", "lesson_descriptions", "prompts", "option_texts")
+
+
+class StringColumn:
+    """Read-only sequence of strings stored as offsets into a UTF-8 pool."""
+    __slots__ = ("offsets", "pool", "refs")
+
+    def __init__(self, offsets: memoryview, pool: memoryview, refs: memoryview | None = None):
+        self.offsets = offsets
+        self.pool = pool
+        self.refs = refs
+
+    def __len__(self) -> int:
+        return len(self.refs) if self.refs is not None else len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if self.refs is not None:
+            i = self.refs[i]
+        return str(self.pool[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def _pack_strings(values: Iterable[str], dedupe: bool = False) -> tuple[array, bytes, array | None]:
+    offsets, pool, refs, seen = array("q", [0]), bytearray(), array("q") if dedupe else None, {}
+    for value in values:
+        if dedupe:
+            index = seen.get(value)
+            if index is not None:
+                refs.append(index)
+                continue
+            index = seen[value] = len(offsets) - 1
+            refs.append(index)
+        pool += value.encode("utf-8")
+        offsets.append(len(pool))
+    return offsets, bytes(pool), refs
+
+
+def read_snapshot_version(path: str) -> int | None:
+    try:
+        with open(path, "rb") as f:
+            magic, fmt, _, version, _ = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return version if magic == MAGIC and fmt == FORMAT_VERSION else None
+
+
+def write_snapshot(catalog: CompactCatalog, path: str, version: int | None = None) -> int:
+    """Atomically replace the snapshot at path. Returns the version written."""
+    if version is None:
+        version = (read_snapshot_version(path) or 0) + 1
+    sections: list[tuple[str, str, bytes, int]] = []
+    for name, typecode in _ARRAY_COLUMNS:
+        column = getattr(catalog, name)
+        sections.append((name, typecode, bytes(column), len(column)))
+    for name in _STRING_COLUMNS:
+        offsets, pool, refs = _pack_strings(getattr(catalog, name), dedupe=name == "option_texts")
+        sections += [(f"{name}@o", "q", offsets.tobytes(), len(offsets)), (f"{name}@s", "B", pool, len(pool))]
+        if refs is not None:
+            sections.append((f"{name}@r", "q", refs.tobytes(), len(refs)))
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table, layout = [], []
+    for name, typecode, data, count in sections:
+        offset += -offset % 8
+        table.append(_SECTION.pack(name.encode(), typecode.encode(), offset, count))
+        layout.append((offset, data))
+        offset += len(data)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".catalog-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), version, catalog.content_revision))
+            f.write(b"".join(table))
+            for section_offset, data in layout:
+                f.write(bytes(section_offset - f.tell()))
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return version
+
+
+class MappedCatalog(CompactCatalog):
+    """CompactCatalog whose columns are views into a memory-mapped snapshot file."""
+    __slots__ = ("path", "version", "file_id", "_mmap")
+
+    @classmethod
+    def open(cls, path: str) -> "MappedCatalog":
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, fmt, n_sections, version, content_revision = _HEADER.unpack_from(view)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a catalog snapshot (format {FORMAT_VERSION})")
+        columns = {}
+        for i in range(n_sections):
+            name, typecode, offset, count = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            typecode = typecode.decode()
+            size = count * (8 if typecode == "q" else 1)
+            columns[name.rstrip(b"\0").decode()] = view[offset:offset + size].cast(typecode)
+
+        catalog = cls.__new__(cls)
+        for name, _ in _ARRAY_COLUMNS:
+            setattr(catalog, name, columns[name])
+        for name in _STRING_COLUMNS:
+            setattr(catalog, name, StringColumn(columns[f"{name}@o"], columns[f"{name}@s"], columns.get(f"{name}@r")))
+        catalog.path = path
+        catalog.version = version
+        catalog.content_revision = content_revision
+        catalog.file_id = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        catalog._mmap = mapped
+        return catalog
+
+
+_current: MappedCatalog | None = None
+_checked_at = 0.0
+_lock = threading.Lock()
+# (snapshot file_id, monotonic time read, ids of lessons changed since its export)
+_stale: tuple[tuple, float, frozenset[int]] | None = None
+
+
+def get_snapshot() -> MappedCatalog | None:
+    """The mapped snapshot at CATALOG_SNAPSHOT_PATH, remapped when the file is replaced."""
+    global _current, _checked_at
+    path = CATALOG_SNAPSHOT_PATH
+    if not path:
+        return None
+    current = _current
+    if current is not None and current.path == path and \
+            time.monotonic() - _checked_at < CATALOG_SNAPSHOT_CHECK_INTERVAL:
+        return current
+    with _lock:
+        if current is not None and current.path != path:
+            current = None
+        try:
+            st = os.stat(path)
+            if current is None or current.file_id != (st.st_dev, st.st_ino, st.st_mtime_ns):
+                current = MappedCatalog.open(path)
+        except (OSError, ValueError) as e:
+            # keep serving the last good mapping
+            print(f"WARNING: catalog snapshot {path} not loaded: {e}")
+        _current, _checked_at = current, time.monotonic()
+    return current
+
+
+def _stale_lessons(db: Session, snapshot: MappedCatalog) -> frozenset[int]:
+    """Lessons changed or deleted after the snapshot was exported, re-read every check interval."""
+    global _stale
+    stale = _stale
+    now = time.monotonic()
+    if stale is not None and stale[0] == snapshot.file_id and now - stale[1] < CATALOG_SNAPSHOT_CHECK_INTERVAL:
+        return stale[2]
+    revision = snapshot.content_revision
+    # range scans of the revision indexes: proportional to the changes since the export
+    ids = frozenset(db.scalars(
+        select(Lesson.id).where(Lesson.revision > revision)
+        .union(select(LessonTombstone.lesson_id).where(LessonTombstone.revision > revision))
+    ))
+    _stale = (snapshot.file_id, now, ids)
+    return ids
+
+
+def snapshot_for_lesson(db: Session, lesson_id: int) -> MappedCatalog | None:
+    """The mapped snapshot, unless lesson_id changed after it was exported."""
+    snapshot = get_snapshot()
+    if snapshot is None or lesson_id in _stale_lessons(db, snapshot):
+        return None
+    return snapshot
+
+
+def reset_snapshot() -> None:
+    global _current, _checked_at, _stale
+    with _lock:
+        _current, _checked_at, _stale = None, 0.0, None
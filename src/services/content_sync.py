@@ -0,0 +1,85 @@
+"""
+Delta sync of lesson content.
+
+Lessons, problems and options carry a revision from content_revision_seq (see
+src/models.py). Changing a problem or option also gives its lesson a new
+revision, and deleting a lesson leaves a tombstone with one, so everything a
+client needs is found by one range scan of ix_lessons_revision and one of the
+tombstones' revision index: the cost follows the number of changes, not the
+size of the catalog.
+
+A client keeps the `revision` of its last response and passes it as `since`.
+Changed lessons are sent whole, in the same shape as the lesson catalog, and
+deleted lessons as ids. When `has_more` is set, ask again with the new
+revision.
+"""
+from __future__ import annotations
+from typing import Any
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models import Lesson, LessonTombstone, Problem, ProblemOption
+from .lessons import serialize_problem
+
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 500
+
+
+def _lesson_contents(db: Session, lessons: list[Lesson]) -> dict[int, dict[str, Any]]:
+    """Catalog payloads for a batch of lessons, with three queries in total."""
+    lesson_ids = [lesson.id for lesson in lessons]
+    problems = db.execute(
+        select(Problem).where(Problem.lesson_id.in_(lesson_ids)).order_by(Problem.lesson_id, Problem.id)
+    ).scalars().all() if lesson_ids else []
+    options_by_problem: dict[int, list[ProblemOption]] = {}
+    mcq_ids = [p.id for p in problems if p.type == "mcq"]
+    if mcq_ids:
+        for o in db.execute(select(ProblemOption).where(ProblemOption.problem_id.in_(mcq_ids))
+                            .order_by(ProblemOption.id)).scalars():
+            options_by_problem.setdefault(o.problem_id, []).append(o)
+
+    contents = {
+        lesson.id: {
+            "id": lesson.id,
+            "title": lesson.title,
+            "description": lesson.description,
+            "order_index": lesson.order_index,
+            "revision": lesson.revision,
+            "updated_at": lesson.updated_at.isoformat(),
+            "problems": [],
+        }
+        for lesson in lessons
+    }
+    for p in problems:
+        contents[p.lesson_id]["problems"].append(serialize_problem(p, options_by_problem.get(p.id, [])))
+    return contents
+
+
+def get_content_changes(db: Session, since: int, limit: int = DEFAULT_CHANGES_LIMIT) -> dict[str, Any]:
+    """Lessons changed and deleted after revision `since`, oldest change first, at most `limit` of them."""
+    lessons = db.execute(
+        select(Lesson).where(Lesson.revision > since).order_by(Lesson.revision).limit(limit + 1)
+    ).scalars().all()
+    tombstones = db.execute(
+        select(LessonTombstone.lesson_id, LessonTombstone.revision)
+        .where(LessonTombstone.revision > since)
+        .order_by(LessonTombstone.revision)
+        .limit(limit + 1)
+    ).all()
+
+    # revisions come from one sequence, so they never tie
+    changes = sorted(
+        [(lesson.revision, lesson) for lesson in lessons]
+        + [(revision, lesson_id) for lesson_id, revision in tombstones],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    changed = [item for _, item in changes if isinstance(item, Lesson)]
+    contents = _lesson_contents(db, changed)
+    return {
+        "since": since,
+        "revision": changes[-1][0] if changes else since,
+        "has_more": has_more,
+        "lessons": [contents[lesson.id] for lesson in changed],
+        "deleted": [item for _, item in changes if not isinstance(item, Lesson)],
+    }
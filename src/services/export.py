@@ -0,0 +1,148 @@
+"""
+Chunked columnar export of the analytics tables.
+
+Rows are read through a server-side cursor chunk_size at a time, pivoted into
+column batches and appended to the output file before the next chunk is
+fetched, so memory is bounded by the chunk size rather than the table size.
+
+Parquet output needs pyarrow (`pip install pyarrow`); it is not a runtime
+dependency of the API. Without it, batches are written as gzip-compressed JSON
+lines, one {"column": [values...]} object per batch. The Parquet schema is
+built from the table's column types, not inferred from the data, so a column
+that is null throughout a batch still gets its declared type.
+"""
+from __future__ import annotations
+import gzip
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Iterator
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, Integer, String, Table, select
+from sqlalchemy.orm import Session
+from ..models import Submission, UserProblemProgress
+
+EXPORT_TABLES: dict[str, Table] = {
+    "submissions": Submission.__table__,
+    "user_problem_progress": UserProblemProgress.__table__,
+}
+DEFAULT_CHUNK_SIZE = 50000
+FORMAT_EXTENSIONS = {"parquet": ".parquet", "jsonl.gz": ".columns.jsonl.gz"}
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_format() -> str:
+    return "parquet" if has_pyarrow() else "jsonl.gz"
+
+
+def iter_column_batches(db: Session, table: Table, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict[str, list]]:
+    """Yield {column: values} batches of at most chunk_size rows, in primary key order."""
+    result = db.execute(
+        select(table).order_by(*table.primary_key.columns)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    names = list(result.keys())
+    for rows in result.partitions():
+        yield {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def arrow_schema(table: Table):
+    """pyarrow schema with each column's declared type and nullability."""
+    import pyarrow as pa
+
+    # most specific first: BigInteger is an Integer
+    types = [
+        (BigInteger, pa.int64()),
+        (Integer, pa.int32()),
+        (Float, pa.float64()),
+        (Boolean, pa.bool_()),
+        (DateTime, pa.timestamp("us")),
+        (Date, pa.date32()),
+        (String, pa.string()),
+    ]
+    fields = []
+    for column in table.columns:
+        arrow_type = next((t for sa_type, t in types if isinstance(column.type, sa_type)), None)
+        if arrow_type is None:
+            raise ValueError(f"no parquet type for {table.name}.{column.name} ({column.type!r})")
+        fields.append(pa.field(column.name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields)
+
+
+class _ParquetBatchWriter:
+    def __init__(self, path: str, table: Table):
+        import pyarrow.parquet as pq
+
+        self.schema = arrow_schema(table)
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, batch: dict[str, list]) -> None:
+        import pyarrow as pa
+
+        self._writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class _GzipColumnarWriter:
+    def __init__(self, path: str):
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, batch: dict[str, list]) -> None:
+        self._file.write(json.dumps(batch, default=_json_default, separators=(",", ":")))
+        self._file.write("\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat()
+
+
+@dataclass
+class ExportResult:
+    table: str
+    path: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def export_table(db: Session, table_name: str, path: str, fmt: str | None = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> ExportResult:
+    if table_name not in EXPORT_TABLES:
+        raise ValueError(f"unknown table: {table_name}")
+    fmt = fmt or default_format()
+    table = EXPORT_TABLES[table_name]
+    if fmt == "parquet":
+        if not has_pyarrow():
+            raise RuntimeError("parquet export needs pyarrow: pip install pyarrow")
+        writer = _ParquetBatchWriter(path, table)
+    elif fmt == "jsonl.gz":
+        writer = _GzipColumnarWriter(path)
+    else:
+        raise ValueError(f"unknown format: {fmt}")
+
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for batch in iter_column_batches(db, table, chunk_size):
+            writer.write(batch)
+            rows += len(next(iter(batch.values())))
+        if not rows:
+            # still produce a readable file with the column names
+            writer.write({column.name: [] for column in table.columns})
+    finally:
+        writer.close()
+    return ExportResult(table_name, path, rows, time.perf_counter() - started)
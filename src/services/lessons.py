@@ -1,7 +1,21 @@
+import os
+import threading
+import time
 from typing import Iterable
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import select, func, literal
 from ..models import Lesson, Problem, ProblemOption, UserProblemProgress, UserProgress
+from ..singleflight import SingleFlight
+from .catalog_snapshot import snapshot_for_lesson
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+# How long a request waits for another request's in-flight catalog load
+CATALOG_LOAD_TIMEOUT = float(os.getenv("CATALOG_LOAD_TIMEOUT", "10"))
+
+# lesson_id -> (lesson revision, expiry, catalog)
+_catalog_cache: dict[int, tuple[int, float, dict]] = {}
+_catalog_lock = threading.Lock()
+_catalog_loads = SingleFlight()
 
 
 def get_lessons_with_progress(db: Session, user_id: int):
@@ -14,35 +28,137 @@ def get_lessons_with_progress(db: Session, user_id: int):
             .join(Problem, Problem.id == UserProblemProgress.problem_id)
             .where(UserProblemProgress.user_id == user_id, Problem.lesson_id == lesson.id, UserProblemProgress.is_correct == True)
         ) or 0
-        progress = (correct / total_problems) if total_problems else 0.0
-        result.append({
-            "id": lesson.id,
-            "title": lesson.title,
-            "description": lesson.description,
-            "progress": round(progress, 4),
-            "total_problems": total_problems,
-            "correct": correct,
-        })
+        result.append(_lesson_summary(lesson.id, lesson.title, lesson.description, total_problems, correct))
     return result
 
 
-def get_lesson_detail(db: Session, user_id: int, lesson_id: int):
+def _lesson_summary(lesson_id: int, title: str, description: str, total_problems: int, correct: int):
+    progress = (correct / total_problems) if total_problems else 0.0
+    return {
+        "id": lesson_id,
+        "title": title,
+        "description": description,
+        "progress": round(progress, 4),
+        "total_problems": total_problems,
+        "correct": correct,
+    }
+
+
+def iter_lessons_with_progress(db: Session, user_id: int, chunk_size: int = 500) -> Iterable[dict]:
+    """Yield the same items as get_lessons_with_progress, one lesson at a time.
+
+    Counts are aggregated in a single query and rows are pulled from a
+    server-side cursor, so memory stays flat in the number of lessons.
+    """
+    totals = (
+        select(Problem.lesson_id, func.count(Problem.id).label("total"))
+        .group_by(Problem.lesson_id)
+        .subquery()
+    )
+    corrects = (
+        select(Problem.lesson_id, func.count(UserProblemProgress.id).label("correct"))
+        .join(Problem, Problem.id == UserProblemProgress.problem_id)
+        .where(UserProblemProgress.user_id == user_id, UserProblemProgress.is_correct == True)
+        .group_by(Problem.lesson_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            Lesson.id,
+            Lesson.title,
+            Lesson.description,
+            func.coalesce(totals.c.total, literal(0)),
+            func.coalesce(corrects.c.correct, literal(0)),
+        )
+        .outerjoin(totals, totals.c.lesson_id == Lesson.id)
+        .outerjoin(corrects, corrects.c.lesson_id == Lesson.id)
+        .order_by(Lesson.order_index)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    for row in db.execute(stmt):
+        yield _lesson_summary(*row)
+
+
+def serialize_problem(p: Problem, options: Iterable[ProblemOption]):
+    item = {
+        "id": p.id,
+        "type": p.type,
+        "prompt": p.prompt,
+    }
+    if p.type == "mcq":
+        item["options"] = [{"id": o.id, "text": o.text} for o in options]  # do not leak is_correct
+    return item
+
+
+def _load_lesson_catalog(db: Session, lesson_id: int):
+    """User-independent part of a lesson: metadata and problems without answers."""
     lesson = db.get(Lesson, lesson_id)
     if not lesson:
         return None
     problems = db.execute(select(Problem).where(Problem.lesson_id == lesson_id).order_by(Problem.id)).scalars().all()
-    problem_dicts = []
-    for p in problems:
-        item = {
-            "id": p.id,
-            "type": p.type,
-            "prompt": p.prompt,
-        }
-        if p.type == "mcq":
-            options = db.execute(select(ProblemOption).where(ProblemOption.problem_id == p.id).order_by(ProblemOption.id)).scalars().all()
-            item["options"] = [{"id": o.id, "text": o.text} for o in options]  # do not leak is_correct
-        problem_dicts.append(item)
-    total_problems = len(problems)
+    options_by_problem: dict[int, list[ProblemOption]] = {}
+    mcq_ids = [p.id for p in problems if p.type == "mcq"]
+    if mcq_ids:
+        options = db.execute(select(ProblemOption).where(ProblemOption.problem_id.in_(mcq_ids)).order_by(ProblemOption.id)).scalars()
+        for o in options:
+            options_by_problem.setdefault(o.problem_id, []).append(o)
+    return {
+        "id": lesson.id,
+        "title": lesson.title,
+        "description": lesson.description,
+        "problems": [serialize_problem(p, options_by_problem.get(p.id, [])) for p in problems],
+    }
+
+
+def clear_catalog_cache():
+    with _catalog_lock:
+        _catalog_cache.clear()
+
+
+def _lesson_revision(db: Session, lesson_id: int) -> int | None:
+    return db.scalar(select(Lesson.revision).where(Lesson.id == lesson_id))
+
+
+def get_lesson_catalog(db: Session, lesson_id: int):
+    """
+    Cached lesson catalog. Entries are keyed by the lesson's content revision,
+    which every change to the lesson, its problems or options bumps, so an
+    edit is served on the next request; CATALOG_CACHE_TTL only bounds how
+    long an unchanged entry is kept. On a miss, concurrent requests for the
+    same lesson and revision share a single load (the first request's session
+    runs the queries), so a cold start under traffic issues one set of queries
+    per lesson. Lessons in the shared catalog snapshot (CATALOG_SNAPSHOT_PATH)
+    and unchanged since its export are served from it.
+    """
+    snapshot = snapshot_for_lesson(db, lesson_id)
+    if snapshot is not None:
+        catalog = snapshot.lesson_detail(lesson_id)
+        if catalog is not None:
+            return catalog
+    revision = _lesson_revision(db, lesson_id)
+    if revision is None:
+        return None
+    now = time.monotonic()
+    with _catalog_lock:
+        cached = _catalog_cache.get(lesson_id)
+    if cached and cached[0] == revision and cached[1] > now:
+        return cached[2]
+
+    def load():
+        catalog = _load_lesson_catalog(db, lesson_id)
+        if catalog is not None:
+            with _catalog_lock:
+                _catalog_cache[lesson_id] = (revision, time.monotonic() + CATALOG_CACHE_TTL, catalog)
+        return catalog
+
+    return _catalog_loads.do((lesson_id, revision), load, timeout=CATALOG_LOAD_TIMEOUT)
+
+
+def get_lesson_detail(db: Session, user_id: int, lesson_id: int):
+    catalog = get_lesson_catalog(db, lesson_id)
+    if not catalog:
+        return None
+    total_problems = len(catalog["problems"])
     correct = db.scalar(
         select(func.count(UserProblemProgress.id))
         .join(Problem, Problem.id == UserProblemProgress.problem_id)
@@ -50,9 +166,6 @@ def get_lesson_detail(db: Session, user_id: int, lesson_id: int):
     ) or 0
     progress = (correct / total_problems) if total_problems else 0.0
     return {
-        "id": lesson.id,
-        "title": lesson.title,
-        "description": lesson.description,
-        "problems": problem_dicts,
+        **catalog,
         "progress": round(progress, 4),
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,166 @@
+"""
+Transactional outbox.
+
+Work derived from a submission (stats counters today, more aggregates later)
+is not done inside the submit transaction. process_submission writes an
+OutboxEvent in that same transaction, so the event exists exactly when the
+submission does, and the worker (scripts/outbox_worker.py) applies it later.
+
+The worker claims pending events in id order with FOR UPDATE SKIP LOCKED, so
+several workers can run side by side. It runs each event's handler in a
+savepoint and marks the event processed in the same transaction as the
+handler's writes, so an event is applied exactly once. The consumer's
+checkpoint row is updated and the batch committed together. An event whose
+handler raises is retried on later batches until MAX_ATTEMPTS, then it stays
+pending with its last error for inspection.
+
+Serverless deployments (Vercel) have no always-on process to run the worker.
+They can set OUTBOX_INLINE_BATCH so that the submit route also applies one
+small batch of events after its transaction commits (drain_after_commit).
+The response waits for that batch, so it is off by default and capped at
+MAX_INLINE_BATCH.
+"""
+from __future__ import annotations
+import os
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..models import OutboxCheckpoint, OutboxEvent
+
+DEFAULT_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+DEFAULT_CONSUMER = "default"
+# Events applied by a request after it commits; 0 leaves everything to the worker
+MAX_INLINE_BATCH = 5
+INLINE_BATCH_SIZE = min(MAX_INLINE_BATCH, int(os.getenv("OUTBOX_INLINE_BATCH", "0")))
+INLINE_CONSUMER = "inline"
+
+Handler = Callable[[Session, dict[str, Any]], None]
+HANDLERS: dict[str, Handler] = {}
+
+
+def handles(topic: str):
+    """Register the decorated function as the handler for `topic`."""
+
+    def decorator(fn: Handler) -> Handler:
+        HANDLERS[topic] = fn
+        return fn
+
+    return decorator
+
+
+def enqueue(db: Session, topic: str, payload: dict[str, Any]) -> OutboxEvent:
+    """Add an event to the caller's transaction; it is visible to the worker once that commits."""
+    event = OutboxEvent(topic=topic, payload=payload, attempts=0)
+    db.add(event)
+    return event
+
+
+@dataclass
+class BatchResult:
+    processed: int = 0
+    failed: int = 0
+    last_event_id: int | None = None
+
+    @property
+    def claimed(self) -> int:
+        return self.processed + self.failed
+
+
+def process_batch(db: Session, consumer: str = DEFAULT_CONSUMER, batch_size: int = DEFAULT_BATCH_SIZE,
+                  handlers: dict[str, Handler] | None = None) -> BatchResult:
+    """Claim up to batch_size pending events, apply them and commit."""
+    handlers = HANDLERS if handlers is None else handlers
+    result = BatchResult()
+    if not handlers:
+        return result
+    events = db.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.processed_at.is_(None), OutboxEvent.attempts < MAX_ATTEMPTS,
+               OutboxEvent.topic.in_(handlers))
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not events:
+        db.rollback()
+        return result
+
+    now = datetime.utcnow()
+    for event in events:
+        try:
+            with db.begin_nested():
+                handlers[event.topic](db, event.payload)
+        except Exception:
+            event.attempts += 1
+            event.last_error = traceback.format_exc(limit=5)
+            result.failed += 1
+            continue
+        event.processed_at = now
+        result.processed += 1
+    result.last_event_id = events[-1].id
+
+    stmt = insert(OutboxCheckpoint).values(
+        consumer=consumer, last_event_id=result.last_event_id, events_processed=result.processed,
+        events_failed=result.failed, updated_at=now,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[OutboxCheckpoint.consumer],
+        set_={
+            "last_event_id": func.greatest(OutboxCheckpoint.last_event_id, stmt.excluded.last_event_id),
+            "events_processed": OutboxCheckpoint.events_processed + stmt.excluded.events_processed,
+            "events_failed": OutboxCheckpoint.events_failed + stmt.excluded.events_failed,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+    db.commit()
+    return result
+
+
+def drain(db: Session, consumer: str = DEFAULT_CONSUMER, batch_size: int = DEFAULT_BATCH_SIZE,
+          max_batches: int | None = None) -> BatchResult:
+    """Process batches until no claimable events are left (or max_batches)."""
+    total = BatchResult()
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        result = process_batch(db, consumer, batch_size)
+        if not result.claimed:
+            break
+        batches += 1
+        total.processed += result.processed
+        total.failed += result.failed
+        total.last_event_id = result.last_event_id
+        if result.processed == 0:
+            break  # only failing events left; retry on the next run
+    return total
+
+
+def drain_after_commit(db: Session) -> BatchResult:
+    """
+    Apply one batch of at most INLINE_BATCH_SIZE events with the request's
+    session. Never raises: events that could not be applied stay pending for
+    the next request or the worker.
+    """
+    if INLINE_BATCH_SIZE <= 0:
+        return BatchResult()
+    try:
+        return process_batch(db, INLINE_CONSUMER, INLINE_BATCH_SIZE)
+    except Exception as e:
+        db.rollback()
+        print(f"WARNING: inline outbox batch failed: {type(e).__name__}: {e}")
+        return BatchResult()
+
+
+def pending_count(db: Session) -> int:
+    return db.scalar(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.processed_at.is_(None))) or 0
+
+
+def purge_processed(db: Session, older_than: timedelta) -> int:
+    """Delete processed events older than `older_than`. Does not commit."""
+    cutoff = datetime.utcnow() - older_than
+    result = db.execute(delete(OutboxEvent).where(OutboxEvent.processed_at < cutoff))
+    return result.rowcount
@@ -0,0 +1,309 @@
+"""
+Monthly range partitioning of submissions on created_at, with archival.
+
+Partitioning is opt-in (scripts/partition_submissions.py). The conversion is
+online:
+1. Build a partitioned shadow table with monthly partitions covering the
+   existing rows, plus months_ahead future months, and a DEFAULT partition
+   for rows outside them.
+2. Install a trigger on the old table that logs the id of every row
+   inserted, updated or deleted from then on. Creating it waits for
+   transactions already writing to the table, so no change is missed.
+3. Copy rows in keyset batches, each committed on its own, while the app
+   keeps writing to the old table.
+4. Apply the logged changes to the shadow: drop the shadow's rows with those
+   ids and copy the current rows with those ids again. This also catches rows
+   whose transaction committed after a batch had passed their id. It runs
+   once while writes continue, then with the old table locked against writes
+   for the few changes logged since, so the lock is held for a time that
+   depends on the write rate, not on the table size. Then the names are
+   swapped, the id sequence moves to the new table and the trigger and log
+   are dropped. The old table is kept as <table>_legacy until it is dropped
+   by hand.
+
+A partitioned table cannot carry a unique index on attempt_id alone, so
+idempotency uses submission_attempt_keys with a bounded window (see
+src/services/submit.py). The maintenance job creates upcoming partitions,
+detaches partitions older than the retention period so they can be archived
+or dropped, and purges expired idempotency keys. If it stops running, inserts
+past the last monthly partition land in the DEFAULT partition instead of
+failing, and the next run moves them into their month's partition.
+
+Detached months are gone from the live table: the submission history no
+longer lists them, and recompute_streaks (src/services/streak.py) only sees
+the retained months, so it never lowers a stored best streak.
+
+Functions take the table name so they can run against scratch copies. They
+commit on the given connection as they go.
+"""
+from __future__ import annotations
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DEFAULT_BATCH_SIZE = 50000
+DEFAULT_MONTHS_AHEAD = 3
+_PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection, table: str = "submissions") -> bool:
+    return bool(conn.scalar(text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}))
+
+
+def list_partitions(conn: Connection, table: str = "submissions") -> list[tuple[str, date]]:
+    """(name, month) of each monthly partition attached to table, oldest first."""
+    names = conn.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:t)"
+    ), {"t": table}).all()
+    partitions = []
+    for name in names:
+        match = _PARTITION_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_partition(conn: Connection, parent: str, table: str, month: date) -> str:
+    name = partition_name(table, month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return name
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _add_month_partition(conn: Connection, table: str, month: date) -> str:
+    """Create a month's partition, moving its rows out of the DEFAULT partition first."""
+    default = default_partition_name(table)
+    bounds = {"lo": month, "hi": add_months(month, 1)}
+    in_range = "created_at >= :lo AND created_at < :hi"
+    if not conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), bounds):
+        return create_partition(conn, table, table, month)
+    # a new partition may not overlap rows of the default partition, so split
+    # them out while it is detached; inserts wait for the commit
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    name = create_partition(conn, table, table, month)
+    conn.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}"), bounds)
+    conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return name
+
+
+def ensure_partitions(conn: Connection, table: str = "submissions", months_ahead: int = DEFAULT_MONTHS_AHEAD,
+                      today: date | None = None) -> list[str]:
+    """
+    Create the partitions for the current month and the next months_ahead
+    months, the DEFAULT partition if it is missing, and a partition for every
+    month that has rows in the DEFAULT partition.
+    """
+    existing = {name for name, _ in list_partitions(conn, table)}
+    default = default_partition_name(table)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    current = month_start(today or datetime.utcnow())
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    months.update(month_start(month) for month in conn.scalars(text(
+        f"SELECT DISTINCT date_trunc('month', created_at) FROM {default}"
+    )))
+    created = []
+    for month in sorted(months):
+        if partition_name(table, month) not in existing:
+            created.append(_add_month_partition(conn, table, month))
+    conn.commit()
+    return created
+
+
+def detach_old_partitions(conn: Connection, table: str = "submissions", keep_months: int = 12,
+                          today: date | None = None, drop: bool = False) -> list[str]:
+    """
+    Detach partitions whose month ended more than keep_months ago. A detached
+    partition is an ordinary table that can be dumped to cold storage; with
+    drop=True it is dropped right away.
+    """
+    cutoff = add_months(month_start(today or datetime.utcnow()), -keep_months)
+    detached = []
+    for name, month in list_partitions(conn, table):
+        if month >= cutoff:
+            break
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {name}"))
+        conn.commit()
+        detached.append(name)
+    return detached
+
+
+@dataclass
+class ConversionResult:
+    rows_copied: int = 0
+    partitions: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+    lock_seconds: float = 0.0
+
+
+def _create_shadow(conn: Connection, table: str, shadow: str, months_ahead: int, today: date) -> list[str]:
+    for sql in (
+        f"CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)",
+        f"ALTER TABLE {shadow} ALTER COLUMN created_at SET NOT NULL",
+        f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow}_pkey PRIMARY KEY (id, created_at)",
+        f"CREATE INDEX {shadow}_user_created ON {shadow} (user_id, created_at, id)",
+        f"CREATE INDEX {shadow}_attempt_id ON {shadow} (attempt_id)",
+        f"ALTER TABLE {shadow} ADD CONSTRAINT {table}_user_id_fkey FOREIGN KEY (user_id) "
+        f"REFERENCES users (id) ON DELETE CASCADE",
+        f"ALTER TABLE {shadow} ADD CONSTRAINT {table}_lesson_id_fkey FOREIGN KEY (lesson_id) "
+        f"REFERENCES lessons (id) ON DELETE CASCADE",
+        f"CREATE TABLE {default_partition_name(table)} PARTITION OF {shadow} DEFAULT",
+    ):
+        conn.execute(text(sql))
+    oldest = conn.scalar(text(f"SELECT min(created_at) FROM {table}"))
+    month = month_start(oldest or today)
+    last = add_months(month_start(today), months_ahead)
+    partitions = []
+    while month <= last:
+        partitions.append(create_partition(conn, shadow, table, month))
+        month = add_months(month, 1)
+    conn.commit()
+    return partitions
+
+
+def _copy_batch(conn: Connection, table: str, shadow: str, after_id: int, limit: int) -> tuple[int | None, int]:
+    last_id, copied = conn.execute(text(
+        f"WITH moved AS (INSERT INTO {shadow} SELECT * FROM {table} WHERE id > :after ORDER BY id LIMIT :limit "
+        f"RETURNING id) SELECT max(id), count(*) FROM moved"
+    ), {"after": after_id, "limit": limit}).one()
+    return last_id, copied
+
+
+def _change_log_name(table: str) -> str:
+    return f"{table}_changes"
+
+
+def _install_change_log(conn: Connection, table: str) -> None:
+    """Log the ids of rows of table written from now on (see module docstring)."""
+    log = _change_log_name(table)
+    conn.execute(text(f"CREATE TABLE {log} (id BIGINT NOT NULL)"))
+    conn.execute(text(
+        f"CREATE FUNCTION {log}_log() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        f"IF TG_OP <> 'INSERT' THEN INSERT INTO {log} (id) VALUES (OLD.id); END IF; "
+        f"IF TG_OP <> 'DELETE' THEN INSERT INTO {log} (id) VALUES (NEW.id); END IF; "
+        f"RETURN NULL; END $$"
+    ))
+    # takes a lock that waits for in-flight writers, so every later write is logged
+    conn.execute(text(
+        f"CREATE TRIGGER {log}_log AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {log}_log()"
+    ))
+    conn.commit()
+
+
+def _drop_change_log(conn: Connection, table: str) -> None:
+    log = _change_log_name(table)
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {log}_log ON {table}"))
+    conn.execute(text(f"DROP FUNCTION IF EXISTS {log}_log()"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {log}"))
+
+
+def _apply_changes(conn: Connection, table: str, shadow: str) -> int:
+    """
+    Replay the logged ids onto shadow: remove its rows with those ids and copy
+    the rows table has now. Only log entries visible to the DELETE are
+    consumed; ones committed later stay for the next pass. Returns the number
+    of rows copied. Does not commit.
+    """
+    log = _change_log_name(table)
+    conn.execute(text("CREATE TEMP TABLE partition_delta (id BIGINT PRIMARY KEY) ON COMMIT DROP"))
+    conn.execute(text(
+        f"WITH consumed AS (DELETE FROM {log} RETURNING id) "
+        f"INSERT INTO partition_delta SELECT DISTINCT id FROM consumed"
+    ))
+    conn.execute(text(f"DELETE FROM {shadow} s USING partition_delta d WHERE s.id = d.id"))
+    return conn.scalar(text(
+        f"WITH moved AS (INSERT INTO {shadow} SELECT t.* FROM {table} t JOIN partition_delta d ON d.id = t.id "
+        f"RETURNING 1) SELECT count(*) FROM moved"
+    ))
+
+
+def _copy_and_lock(conn: Connection, table: str, shadow: str, batch_size: int, result: ConversionResult,
+                   progress) -> float:
+    """
+    Copy table into shadow, apply the logged changes and return with table
+    locked against writes and shadow up to date. Returns when the lock was taken.
+    """
+    last_id = -1
+    while True:
+        batch_last, copied = _copy_batch(conn, table, shadow, last_id, batch_size)
+        conn.commit()
+        if batch_last is None:
+            break
+        last_id = batch_last
+        result.rows_copied += copied
+        if progress:
+            progress(result.rows_copied)
+
+    # changes made during the copy are applied here, so the locked pass below stays short
+    result.rows_copied += _apply_changes(conn, table, shadow)
+    conn.commit()
+
+    locked = time.perf_counter()
+    # writes wait from here until the caller commits the swap; reads continue
+    conn.execute(text(f"LOCK TABLE {table} IN EXCLUSIVE MODE"))
+    result.rows_copied += _apply_changes(conn, table, shadow)
+    _drop_change_log(conn, table)
+    return locked
+
+
+def convert_to_partitioned(conn: Connection, table: str = "submissions", batch_size: int = DEFAULT_BATCH_SIZE,
+                           months_ahead: int = DEFAULT_MONTHS_AHEAD, today: date | None = None,
+                           progress=None) -> ConversionResult:
+    """Convert `table` to a partitioned table online (see module docstring)."""
+    started = time.perf_counter()
+    result = ConversionResult()
+    if is_partitioned(conn, table):
+        return result
+    today = today or datetime.utcnow().date()
+    shadow = f"{table}_partitioned"
+    result.partitions = _create_shadow(conn, table, shadow, months_ahead, today)
+    _install_change_log(conn, table)
+    try:
+        locked = _copy_and_lock(conn, table, shadow, batch_size, result, progress)
+    except Exception:
+        # without the swap the trigger would keep logging every write
+        conn.rollback()
+        _drop_change_log(conn, table)
+        conn.commit()
+        raise
+    sequence = conn.scalar(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table})
+    legacy = f"{table}_legacy"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    for index in conn.scalars(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": legacy}).all():
+        conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:56]}_legacy"'))
+    conn.execute(text(f"ALTER TABLE {shadow} RENAME TO {table}"))
+    conn.execute(text(f"ALTER INDEX {shadow}_pkey RENAME TO {table}_pkey"))
+    conn.execute(text(f"ALTER INDEX {shadow}_user_created RENAME TO ix_{table}_user_created"))
+    conn.execute(text(f"ALTER INDEX {shadow}_attempt_id RENAME TO ix_{table}_attempt_id"))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.commit()
+    result.lock_seconds = round(time.perf_counter() - locked, 3)
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
@@ -0,0 +1,215 @@
+"""
+Spaced-repetition practice queue.
+
+Review state (due time, ease, interval) lives in review_states and is updated
+by process_submission in the submit transaction, using a simplified SM-2
+schedule. Picking the next problems is served from a per-user min-heap on
+due_at, built from the table on first use and kept current by pushing the
+new due times once the submit transaction commits. Heaps are kept in LRU
+order: ones idle for longer than QUEUE_TTL_SECONDS (which would be rebuilt
+on their next use anyway) are dropped, and at most PRACTICE_QUEUE_MAX_USERS
+are kept per process.
+"""
+from __future__ import annotations
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from ..models import Lesson, Problem, ProblemOption, ReviewState
+from .lessons import serialize_problem
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Intervals grow geometrically; without a cap a long run of correct answers overflows datetime
+MAX_INTERVAL_DAYS = 36500.0
+# A missed problem comes back this soon
+RELEARN_DELAY = timedelta(minutes=1)
+# Heaps are rebuilt from the table after this many seconds, to pick up
+# submissions handled by other worker processes
+QUEUE_TTL_SECONDS = int(os.getenv("PRACTICE_QUEUE_TTL", "300"))
+# Heaps kept in memory; the least recently used are dropped beyond this
+PRACTICE_QUEUE_MAX_USERS = int(os.getenv("PRACTICE_QUEUE_MAX_USERS", "10000"))
+MAX_BATCH = 50
+
+_PENDING_KEY = "practice_queue_pending"
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def schedule_review(state: ReviewState, is_correct: bool, now: datetime) -> None:
+    """
+    Simplified SM-2 update:
+    - correct: interval goes 1 day, 6 days, then interval * ease (at most MAX_INTERVAL_DAYS)
+    - wrong: repetitions reset, ease drops by 0.2 (min 1.3), due again after RELEARN_DELAY
+    """
+    if is_correct:
+        state.repetitions += 1
+        if state.repetitions == 1:
+            state.interval_days = 1.0
+        elif state.repetitions == 2:
+            state.interval_days = 6.0
+        else:
+            state.interval_days = min(MAX_INTERVAL_DAYS, round(state.interval_days * state.ease, 2))
+        state.due_at = now + timedelta(days=state.interval_days)
+    else:
+        state.repetitions = 0
+        state.lapses += 1
+        state.interval_days = 0.0
+        state.ease = max(MIN_EASE, state.ease - 0.2)
+        state.due_at = now + RELEARN_DELAY
+    state.updated_at = now
+
+
+def schedule_reviews(db: Session, user_id: int, graded: Iterable[tuple[int, bool]]) -> None:
+    """Update review state for (problem_id, is_correct) results in the caller's transaction."""
+    graded = list(graded)
+    if not graded:
+        return
+    now = _utcnow()
+    states = {
+        s.problem_id: s
+        for s in db.execute(select(ReviewState).where(
+            ReviewState.user_id == user_id,
+            ReviewState.problem_id.in_({problem_id for problem_id, _ in graded})
+        )).scalars()
+    }
+    for problem_id, is_correct in graded:
+        state = states.get(problem_id)
+        if state is None:
+            state = ReviewState(user_id=user_id, problem_id=problem_id, ease=DEFAULT_EASE,
+                                interval_days=0.0, repetitions=0, lapses=0)
+            states[problem_id] = state
+            db.add(state)
+        schedule_review(state, is_correct, now)
+    # applied to the in-memory heap only if the transaction commits
+    db.info.setdefault(_PENDING_KEY, []).extend((user_id, s.problem_id, s.due_at) for s in states.values())
+
+
+class UserQueue:
+    """Min-heap of (due_at, problem_id) with lazy invalidation of superseded entries."""
+
+    def __init__(self, states: Iterable[tuple[int, datetime]]):
+        self.due = dict(states)
+        self.heap = [(due_at, problem_id) for problem_id, due_at in self.due.items()]
+        heapq.heapify(self.heap)
+        self.loaded_at = self.used_at = time.monotonic()
+
+    def push(self, problem_id: int, due_at: datetime) -> None:
+        self.due[problem_id] = due_at
+        heapq.heappush(self.heap, (due_at, problem_id))
+
+    def due_before(self, now: datetime, n: int) -> list[int]:
+        """Up to n problem ids due at or before now, earliest first. O(n log size)."""
+        taken: list[tuple[datetime, int]] = []
+        while self.heap and len(taken) < n:
+            due_at, problem_id = self.heap[0]
+            if self.due.get(problem_id) != due_at:
+                heapq.heappop(self.heap)  # superseded by a later push
+                continue
+            if due_at > now:
+                break
+            taken.append(heapq.heappop(self.heap))
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [problem_id for _, problem_id in taken]
+
+
+# least recently used first
+_queues: OrderedDict[int, UserQueue] = OrderedDict()
+_queues_lock = threading.Lock()
+
+
+def _evict_queues(now: float) -> None:
+    """Drop heaps idle for QUEUE_TTL_SECONDS or beyond PRACTICE_QUEUE_MAX_USERS. Caller holds the lock."""
+    while _queues:
+        oldest = next(iter(_queues.values()))
+        if len(_queues) <= PRACTICE_QUEUE_MAX_USERS and now - oldest.used_at < QUEUE_TTL_SECONDS:
+            break
+        _queues.popitem(last=False)
+
+
+def _get_queue(db: Session, user_id: int) -> UserQueue:
+    with _queues_lock:
+        now = time.monotonic()
+        queue = _queues.get(user_id)
+        if queue is not None and now - queue.loaded_at < QUEUE_TTL_SECONDS:
+            queue.used_at = now
+            _queues.move_to_end(user_id)
+            return queue
+    rows = db.execute(
+        select(ReviewState.problem_id, ReviewState.due_at).where(ReviewState.user_id == user_id)
+    ).all()
+    queue = UserQueue((problem_id, due_at) for problem_id, due_at in rows)
+    with _queues_lock:
+        _queues[user_id] = queue
+        _queues.move_to_end(user_id)
+        _evict_queues(queue.used_at)
+    return queue
+
+
+def reset_queues() -> None:
+    with _queues_lock:
+        _queues.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    with _queues_lock:
+        for user_id, problem_id, due_at in pending:
+            queue = _queues.get(user_id)
+            if queue is not None:
+                queue.push(problem_id, due_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def get_next_practice(db: Session, user_id: int, n: int = 10) -> list[dict[str, Any]]:
+    """
+    The next n problems to practice: due reviews first (earliest due first),
+    then problems the user has never attempted, in lesson order.
+    """
+    now = _utcnow()
+    queue = _get_queue(db, user_id)
+    due_ids = queue.due_before(now, n)
+
+    problems = {p.id: p for p in db.execute(select(Problem).where(Problem.id.in_(due_ids))).scalars()} \
+        if due_ids else {}
+    ordered = [problems[pid] for pid in due_ids if pid in problems]
+    if len(ordered) < n:
+        seen = select(ReviewState.problem_id).where(ReviewState.user_id == user_id)
+        ordered += db.execute(
+            select(Problem).join(Lesson, Lesson.id == Problem.lesson_id)
+            .where(Problem.id.not_in(seen))
+            .order_by(Lesson.order_index, Problem.id)
+            .limit(n - len(ordered))
+        ).scalars().all()
+
+    mcq_ids = [p.id for p in ordered if p.type == "mcq"]
+    options_by_problem: dict[int, list[ProblemOption]] = {}
+    if mcq_ids:
+        for o in db.execute(select(ProblemOption).where(ProblemOption.problem_id.in_(mcq_ids))
+                            .order_by(ProblemOption.id)).scalars():
+            options_by_problem.setdefault(o.problem_id, []).append(o)
+
+    items = []
+    for p in ordered:
+        item = serialize_problem(p, options_by_problem.get(p.id, []))
+        item["lesson_id"] = p.lesson_id
+        due_at = queue.due.get(p.id)
+        item["due_at"] = due_at.isoformat() if due_at else None
+        item["new"] = due_at is None
+        items.append(item)
+    return items
@@ -0,0 +1,152 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any
+from sqlalchemy.orm import Session
+from datetime import datetime
+from sqlalchemy import delete, func, select, case, text, update
+from sqlalchemy.dialects.postgresql import insert
+from ..models import LessonStats, OutboxEvent, Problem, ProblemStats, UserProblemProgress
+from .outbox import handles
+
+# Outbox topic carrying one graded submission's counter deltas
+SUBMISSION_GRADED = "submission.graded"
+
+COUNTERS = ("attempts", "correct", "first_try_correct")
+RECONCILE_INSERT_CHUNK = 1000
+
+
+@dataclass
+class StatDeltas:
+    """Counter increments collected while grading one submission"""
+    by_problem: dict[int, list[int]] = field(default_factory=dict)
+
+    def record(self, problem_id: int, is_correct: bool, first_attempt: bool) -> None:
+        counts = self.by_problem.setdefault(problem_id, [0, 0, 0])
+        counts[0] += 1
+        if is_correct:
+            counts[1] += 1
+            if first_attempt:
+                counts[2] += 1
+
+    def totals(self) -> list[int]:
+        return [sum(column) for column in zip(*self.by_problem.values())] or [0, 0, 0]
+
+    def to_payload(self) -> list[list[int]]:
+        return [[problem_id, *counts] for problem_id, counts in self.by_problem.items()]
+
+    @classmethod
+    def from_payload(cls, rows: list[list[int]]) -> "StatDeltas":
+        return cls({row[0]: list(row[1:]) for row in rows})
+
+
+def _upsert_increment(model, key: str, rows: list[dict[str, Any]]):
+    stmt = insert(model).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={name: getattr(model, name) + stmt.excluded[name] for name in COUNTERS},
+    )
+
+
+def apply_stat_deltas(db: Session, lesson_id: int, deltas: StatDeltas) -> None:
+    """Add one submission's counters with one upsert per table."""
+    if not deltas.by_problem:
+        return
+    db.execute(_upsert_increment(ProblemStats, "problem_id", [
+        {"problem_id": problem_id, "lesson_id": lesson_id, **dict(zip(COUNTERS, counts))}
+        for problem_id, counts in deltas.by_problem.items()
+    ]))
+    db.execute(_upsert_increment(LessonStats, "lesson_id", [
+        {"lesson_id": lesson_id, **dict(zip(COUNTERS, deltas.totals()))}
+    ]))
+
+
+@handles(SUBMISSION_GRADED)
+def apply_submission_graded(db: Session, payload: dict[str, Any]) -> None:
+    apply_stat_deltas(db, payload["lesson_id"], StatDeltas.from_payload(payload["problems"]))
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+def _stats_dict(row) -> dict[str, Any]:
+    return {
+        "attempts": row.attempts,
+        "correct": row.correct,
+        "first_try_correct": row.first_try_correct,
+        "accuracy": _rate(row.correct, row.attempts),
+        "first_try_accuracy": _rate(row.first_try_correct, row.attempts),
+    }
+
+
+def get_problem_stats(db: Session, lesson_id: int | None = None) -> dict[str, Any]:
+    """Problem counters, hardest (lowest accuracy) first, read from the precomputed tables only."""
+    accuracy = case((ProblemStats.attempts > 0, ProblemStats.correct * 1.0 / ProblemStats.attempts), else_=1.0)
+    stmt = select(ProblemStats).order_by(accuracy, ProblemStats.problem_id)
+    if lesson_id is not None:
+        stmt = stmt.where(ProblemStats.lesson_id == lesson_id)
+    problems = [
+        {"problem_id": row.problem_id, "lesson_id": row.lesson_id, **_stats_dict(row)}
+        for row in db.execute(stmt).scalars()
+    ]
+    result: dict[str, Any] = {"problems": problems}
+    if lesson_id is not None:
+        lesson = db.get(LessonStats, lesson_id)
+        result["lesson"] = {"lesson_id": lesson_id, **_stats_dict(lesson)} if lesson else None
+    return result
+
+
+def reconcile_stats(db: Session) -> int:
+    """
+    Rebuild problem_stats and lesson_stats from user_problem_progress, which
+    holds the per-user attempt counters the increments are derived from.
+    Returns the number of problem rows that had drifted. Does not commit.
+
+    Pending submission.graded outbox events are already reflected in
+    user_problem_progress, so they are marked processed here. The outbox is
+    locked against inserts until the caller commits, so no submission can land
+    between reading the progress rows and marking its event. EXCLUSIVE mode
+    also conflicts with the row locks of a worker's claim (FOR UPDATE), so an
+    in-flight batch commits first instead of deadlocking with this update.
+    """
+    db.execute(text("LOCK TABLE outbox_events IN EXCLUSIVE MODE"))
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.topic == SUBMISSION_GRADED, OutboxEvent.processed_at.is_(None))
+        .values(processed_at=datetime.utcnow())
+    )
+    fresh = {
+        row.problem_id: (row.lesson_id, row.attempts, row.correct, row.first_try_correct)
+        for row in db.execute(
+            select(
+                UserProblemProgress.problem_id,
+                Problem.lesson_id,
+                func.sum(UserProblemProgress.attempts).label("attempts"),
+                func.sum(UserProblemProgress.correct_attempts).label("correct"),
+                func.count().filter(UserProblemProgress.first_attempt_correct == True).label("first_try_correct"),
+            )
+            .join(Problem, Problem.id == UserProblemProgress.problem_id)
+            .group_by(UserProblemProgress.problem_id, Problem.lesson_id)
+        )
+    }
+    current = {
+        row.problem_id: (row.lesson_id, row.attempts, row.correct, row.first_try_correct)
+        for row in db.execute(select(ProblemStats)).scalars()
+    }
+    drifted = sum(1 for key in fresh.keys() | current.keys() if fresh.get(key) != current.get(key))
+
+    db.execute(delete(ProblemStats))
+    db.execute(delete(LessonStats))
+    rows = [
+        {"problem_id": problem_id, "lesson_id": values[0], **dict(zip(COUNTERS, values[1:]))}
+        for problem_id, values in fresh.items()
+    ]
+    for start in range(0, len(rows), RECONCILE_INSERT_CHUNK):
+        db.execute(insert(ProblemStats).values(rows[start:start + RECONCILE_INSERT_CHUNK]))
+    if rows:
+        db.execute(insert(LessonStats).from_select(
+            ["lesson_id", *COUNTERS],
+            select(ProblemStats.lesson_id, *(func.sum(getattr(ProblemStats, name)) for name in COUNTERS))
+            .group_by(ProblemStats.lesson_id),
+        ))
+    return drifted
@@ -1,5 +1,13 @@
 from __future__ import annotations
+import operator
+import time
+from dataclasses import dataclass
 from datetime import date, timezone, datetime
+from itertools import groupby
+from typing import Sequence
+from sqlalchemy import Date, bindparam, cast, func, select, update
+from sqlalchemy.orm import Session
+from ..models import Submission, User
 
 
 def utc_today() -> date:
@@ -23,4 +31,98 @@ def calculate_new_streak(last_activity: date | None, current_streak: int) -> tup
     if diff == 1:
         return current_streak + 1, True, 1
     # missed at least one day
-    return 1, True, diff 
\ No newline at end of file
+    return 1, True, diff 
+
+
+def streaks_from_days(days: Sequence[int], today: int) -> tuple[int, int]:
+    """
+    Returns (current_streak, best_streak) for sorted, distinct activity days
+    (date ordinals), matching what calculate_new_streak would have produced.
+    - Runs are broken wherever consecutive days differ by more than 1
+    - The current streak is the last run, or 0 if it ended before yesterday
+    """
+    if not days:
+        return 0, 0
+    # indices where a new run starts: 0 plus every position after a gap
+    starts = [0] + [i for i, gap in enumerate(map(operator.sub, days[1:], days[:-1]), 1) if gap != 1]
+    ends = starts[1:] + [len(days)]
+    best = max(map(operator.sub, ends, starts))
+    current = ends[-1] - starts[-1] if today - days[-1] <= 1 else 0
+    return current, best
+
+
+@dataclass
+class RecomputeResult:
+    users: int
+    seconds: float
+
+    @property
+    def users_per_second(self) -> float:
+        return self.users / self.seconds if self.seconds else float(self.users)
+
+
+# Core executemany UPDATE; it bumps users.version so a submit that read a user
+# before the rewrite fails its optimistic-lock check and is retried. The
+# chunk's users are locked before their submissions are read, so a submit
+# cannot commit between that read and this write. Best
+# streak and last activity never go down: submissions in detached partitions
+# (src/services/partitioning.py) are no longer visible here.
+_users = User.__table__
+_streak_update = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(current_streak=bindparam("current_streak"),
+            best_streak=func.greatest(_users.c.best_streak, bindparam("best_streak")),
+            last_activity_utc_date=func.greatest(_users.c.last_activity_utc_date, bindparam("last_activity_utc_date")),
+            version=_users.c.version + 1)
+)
+
+
+def recompute_streaks(db: Session, chunk_size: int = 1000, today: date | None = None) -> RecomputeResult:
+    """
+    Rebuild current/best streak and last activity for every user from
+    submissions.created_at, chunk_size users at a time. Each chunk reads the
+    distinct activity days of its users in one query and writes the results
+    with a single bulk UPDATE, then commits. The chunk's user rows are locked
+    (FOR UPDATE) first: a submit that is committing is waited for and counted,
+    and one that commits later sees the new version and is retried.
+
+    Only retained submissions are read. A stored best streak or last activity
+    date that is higher than what they give is kept, and a current streak
+    that began before the oldest retained month is cut to the retained part.
+    """
+    today_ordinal = (today or utc_today()).toordinal()
+    started = time.perf_counter()
+    processed = 0
+    last_id = 0
+    while True:
+        user_ids = db.scalars(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size).with_for_update()
+        ).all()
+        if not user_ids:
+            break
+        day = cast(Submission.created_at, Date)
+        rows = db.execute(
+            select(Submission.user_id, day).distinct()
+            .where(Submission.user_id.in_(user_ids))
+            .order_by(Submission.user_id, day)
+        ).all()
+        days_by_user = {
+            user_id: [d.toordinal() for _, d in group]
+            for user_id, group in groupby(rows, key=operator.itemgetter(0))
+        }
+        updates = []
+        for user_id in user_ids:
+            days = days_by_user.get(user_id, [])
+            current, best = streaks_from_days(days, today_ordinal)
+            updates.append({
+                "user_id": user_id,
+                "current_streak": current,
+                "best_streak": best,
+                "last_activity_utc_date": date.fromordinal(days[-1]) if days else None,
+            })
+        db.execute(_streak_update, updates)
+        db.commit()
+        processed += len(user_ids)
+        last_id = user_ids[-1]
+    return RecomputeResult(users=processed, seconds=time.perf_counter() - started)
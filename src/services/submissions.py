@@ -0,0 +1,66 @@
+from __future__ import annotations
+import base64
+from datetime import datetime
+from typing import Any
+from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from ..models import Submission
+from .submit import ValidationError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, submission_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{submission_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, submission_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(submission_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError("invalid cursor")
+
+
+def _submission_dict(s: Submission) -> dict[str, Any]:
+    return {
+        "id": s.id,
+        "attempt_id": s.attempt_id,
+        "lesson_id": s.lesson_id,
+        "created_at": s.created_at.isoformat(),
+        "correct_count": s.correct_count,
+        "earned_xp": s.earned_xp,
+        "total_xp_after": s.total_xp_after,
+        "streak": {"current": s.current_streak_after, "best": s.best_streak_after},
+        "lesson_progress_after": round(s.lesson_progress_after, 4),
+    }
+
+
+def build_history_query(user_id: int, lesson_id: int | None = None, limit: int = DEFAULT_PAGE_SIZE,
+                        cursor: str | None = None):
+    """Newest-first page of a user's submissions.
+
+    Keyset pagination on (created_at, id): each page is an index range scan of
+    ix_submissions_user_created starting after the cursor, so deep pages cost
+    the same as the first one.
+    """
+    stmt = select(Submission).where(Submission.user_id == user_id)
+    if lesson_id is not None:
+        stmt = stmt.where(Submission.lesson_id == lesson_id)
+    if cursor:
+        created_at, submission_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Submission.created_at, Submission.id) < tuple_(created_at, submission_id))
+    return stmt.order_by(Submission.created_at.desc(), Submission.id.desc()).limit(limit + 1)
+
+
+def list_submissions(db: Session, user_id: int, lesson_id: int | None = None, limit: int = DEFAULT_PAGE_SIZE,
+                     cursor: str | None = None) -> dict[str, Any]:
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValidationError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    rows = db.execute(build_history_query(user_id, lesson_id, limit, cursor)).scalars().all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+    return {"items": [_submission_dict(s) for s in page], "next_cursor": next_cursor}
@@ -1,13 +1,27 @@
 from __future__ import annotations
 import os
-from dataclasses import dataclass
 from typing import Any
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from ..models import Lesson, Problem, ProblemOption, Submission, User, UserProblemProgress
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from pydantic import ValidationError as PayloadError
+from ..models import Lesson, Problem, ProblemOption, Submission, SubmissionAttemptKey, User, UserProblemProgress
+from ..schemas import InputAnswer, McqAnswer, SubmitPayload
 from .streak import calculate_new_streak, utc_today
+from .answers import answer_hash, cached_answer_hash
+from .stats import SUBMISSION_GRADED, StatDeltas
+from .outbox import enqueue
+from .practice import schedule_reviews
+from .catalog import CatalogProblem
+from .catalog_snapshot import snapshot_for_lesson
 
 XP_PER_CORRECT = int(os.getenv("XP_PER_CORRECT", "10"))
+# attempt_ids are guaranteed unique within this many days
+IDEMPOTENCY_WINDOW_DAYS = int(os.getenv("IDEMPOTENCY_WINDOW_DAYS", "30"))
 
 
 class DuplicateAttemptError(Exception):
@@ -15,35 +29,62 @@ class DuplicateAttemptError(Exception):
 
 
 class ValidationError(Exception):
-    pass
+    def __init__(self, message: str, errors: list[dict[str, Any]] | None = None):
+        super().__init__(message)
+        # per-field details: [{"loc": [...], "msg": ..., "type": ...}]
+        self.errors = errors or []
 
 
 class InvalidProblemError(Exception):
     pass
 
 
-@dataclass
-class AnswerItem:
-    problem_id: int
-    option_id: int | None = None
-    value: str | None = None
-
-
-def _normalize_value(value: str) -> str:
-    return str(value).strip().lower()
-
-
-def process_submission(db: Session, user_id: int, lesson_id: int, payload: dict[str, Any]) -> dict[str, Any]:
-    attempt_id = payload.get("attempt_id")
-    answers = payload.get("answers")
-    if not attempt_id or not isinstance(attempt_id, str):
-        raise ValidationError("attempt_id is required")
-    if not answers or not isinstance(answers, list):
-        raise ValidationError("answers must be non-empty")
-
-    # Idempotency check
-    existing = db.execute(select(Submission).where(Submission.attempt_id == attempt_id)).scalar_one_or_none()
-    if existing:
+class ConcurrentSubmissionError(Exception):
+    """Another submission of the same user committed first; the whole submit can be retried."""
+
+
+def parse_submit_payload(data: bytes | str | dict[str, Any]) -> SubmitPayload:
+    """Validate a raw JSON body or an already decoded payload into typed answers."""
+    try:
+        if isinstance(data, (bytes, str)):
+            return SubmitPayload.model_validate_json(data)
+        return SubmitPayload.model_validate(data)
+    except PayloadError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        first = errors[0]
+        location = ".".join(str(part) for part in first["loc"])
+        raise ValidationError(f"{location}: {first['msg']}" if location else first["msg"], errors) from e
+
+
+def claim_attempt(db: Session, user_id: int, attempt_id: str) -> bool:
+    """
+    Reserve attempt_id in the caller's transaction. Returns False if it was
+    already used within the idempotency window. A concurrent claim of the same
+    id waits for the other transaction and then fails.
+    """
+    claimed = db.execute(
+        insert(SubmissionAttemptKey)
+        .values(attempt_id=attempt_id, user_id=user_id, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[SubmissionAttemptKey.attempt_id])
+        .returning(SubmissionAttemptKey.attempt_id)
+    ).first()
+    return claimed is not None
+
+
+def purge_attempt_keys(db: Session, window_days: int = IDEMPOTENCY_WINDOW_DAYS) -> int:
+    """Delete idempotency keys older than the window. Does not commit."""
+    cutoff = datetime.utcnow() - timedelta(days=window_days)
+    return db.execute(delete(SubmissionAttemptKey).where(SubmissionAttemptKey.created_at < cutoff)).rowcount
+
+
+def process_submission(db: Session, user_id: int, lesson_id: int,
+                       payload: SubmitPayload | bytes | str | dict[str, Any]) -> dict[str, Any]:
+    if not isinstance(payload, SubmitPayload):
+        payload = parse_submit_payload(payload)
+    attempt_id = payload.attempt_id
+
+    # Idempotency check: reserve the key now, released again if the submission fails
+    if not claim_attempt(db, user_id, attempt_id):
         raise DuplicateAttemptError("This attempt_id was already processed")
 
     lesson = db.get(Lesson, lesson_id)
@@ -55,56 +96,71 @@ def process_submission(db: Session, user_id: int, lesson_id: int, payload: dict[
     if not user:
         raise ValidationError("User not found")
 
-    # Build problem map for validation
-    problems = db.execute(select(Problem).where(Problem.lesson_id == lesson_id)).scalars().all()
+    # Build problem map for validation, from the shared catalog snapshot when it has the lesson
+    # and the lesson has not changed since the export
+    snapshot = snapshot_for_lesson(db, lesson_id)
+    problems = snapshot.lesson_problems(lesson_id) if snapshot is not None else []
+    if not problems:
+        problems = db.execute(select(Problem).where(Problem.lesson_id == lesson_id)).scalars().all()
     problem_by_id = {p.id: p for p in problems}
     if not problems:
         raise ValidationError("Lesson has no problems")
 
+    # Per-user progress for every problem in the lesson, loaded once
+    progress_by_problem = {
+        upp.problem_id: upp
+        for upp in db.execute(select(UserProblemProgress).where(
+            UserProblemProgress.user_id == user_id,
+            UserProblemProgress.problem_id.in_(problem_by_id)
+        )).scalars()
+    }
+
     correct_count = 0
+    deltas = StatDeltas()
+    graded: list[tuple[int, bool]] = []
 
-    for idx, a in enumerate(answers):
-        if not isinstance(a, dict):
-            raise ValidationError("answer items must be objects")
-        problem_id = a.get("problem_id")
-        if not isinstance(problem_id, int):
-            raise ValidationError("problem_id must be an integer")
+    for a in payload.answers:
+        problem_id = a.problem_id
         problem = problem_by_id.get(problem_id)
         if not problem:
             raise InvalidProblemError(f"Problem {problem_id} not found")
 
         if problem.type == "mcq":
-            option_id = a.get("option_id")
-            if not isinstance(option_id, int):
+            if not isinstance(a, McqAnswer):
                 raise ValidationError("option_id must be an integer for mcq problems")
-            option = db.execute(select(ProblemOption).where(
-                ProblemOption.id == option_id,
-                ProblemOption.problem_id == problem_id
-            )).scalar_one_or_none()
-            if not option:
+            option_id = a.option_id
+            if isinstance(problem, CatalogProblem):
+                is_correct = problem.option_is_correct(option_id)
+            else:
+                is_correct = db.execute(select(ProblemOption.is_correct).where(
+                    ProblemOption.id == option_id,
+                    ProblemOption.problem_id == problem_id
+                )).scalar_one_or_none()
+            if is_correct is None:
                 raise ValidationError(f"option_id {option_id} invalid for problem {problem_id}")
-            is_correct = option.is_correct
         elif problem.type == "input":
-            value = a.get("value")
-            if value is None:
+            if not isinstance(a, InputAnswer):
                 raise ValidationError("value is required for input problems")
-            is_correct = _normalize_value(str(value)) == _normalize_value(problem.correct_answer_text or "")
+            expected = problem.correct_answer_hash or cached_answer_hash(problem.correct_answer_text or "")
+            is_correct = answer_hash(a.value) == expected
         else:
             raise ValidationError(f"unknown problem type: {problem.type}")
 
+        # Upsert user_problem_progress for every attempt; is_correct stays "ever solved"
+        upp = progress_by_problem.get(problem_id)
+        first_attempt = upp is None
+        if first_attempt:
+            upp = UserProblemProgress(user_id=user_id, problem_id=problem_id, is_correct=False,
+                                      attempts=0, correct_attempts=0, first_attempt_correct=is_correct)
+            progress_by_problem[problem_id] = upp
+            db.add(upp)
+        upp.attempts += 1
         if is_correct:
             correct_count += 1
-            # Upsert user_problem_progress to mark as correct
-            upp = db.execute(select(UserProblemProgress).where(
-                UserProblemProgress.user_id == user_id,
-                UserProblemProgress.problem_id == problem_id
-            )).scalar_one_or_none()
-            if upp:
-                if not upp.is_correct:
-                    upp.is_correct = True
-                    db.add(upp)
-            else:
-                db.add(UserProblemProgress(user_id=user_id, problem_id=problem_id, is_correct=True))
+            upp.correct_attempts += 1
+            upp.is_correct = True
+        deltas.record(problem_id, is_correct, first_attempt)
+        graded.append((problem_id, is_correct))
 
     # Compute XP
     earned_xp = correct_count * XP_PER_CORRECT
@@ -118,16 +174,14 @@ def process_submission(db: Session, user_id: int, lesson_id: int, payload: dict[
 
     # Update XP
     user.total_xp = user.total_xp + earned_xp
+    # Always bump users.version, even with no XP earned: the versioned UPDATE
+    # fails if another submit of this user committed since we read the row, so
+    # progress counters read above cannot be overwritten with stale values
+    flag_modified(user, "total_xp")
 
     # Lesson progress after submission
     total_problems = len(problems)
-    total_correct_in_lesson = db.scalar(
-        select(func.count(UserProblemProgress.id)).where(
-            UserProblemProgress.user_id == user_id,
-            UserProblemProgress.problem_id.in_([p.id for p in problems]),
-            UserProblemProgress.is_correct == True
-        )
-    ) or 0
+    total_correct_in_lesson = sum(1 for upp in progress_by_problem.values() if upp.is_correct)
     lesson_progress = (total_correct_in_lesson / total_problems) if total_problems else 0.0
 
     # Record submission (idempotency key uniqueness ensures no double processing)
@@ -144,6 +198,31 @@ def process_submission(db: Session, user_id: int, lesson_id: int, payload: dict[
     )
     db.add(user)
     db.add(submission)
+    # stats counters are applied by the outbox worker, outside this transaction
+    enqueue(db, SUBMISSION_GRADED, {
+        "attempt_id": attempt_id,
+        "user_id": user_id,
+        "lesson_id": lesson_id,
+        "problems": deltas.to_payload(),
+    })
+    schedule_reviews(db, user_id, graded)
+    try:
+        db.flush()
+    except StaleDataError as e:
+        raise ConcurrentSubmissionError("User was updated by a concurrent submission") from e
+    except (IntegrityError, ProgrammingError) as e:
+        # (pg8000 reports foreign key violations as ProgrammingError)
+        # an unpartitioned submissions table still has a unique attempt_id
+        # index, which also catches reuse of keys older than the window
+        if "attempt_id" in str(e.orig):
+            raise DuplicateAttemptError("This attempt_id was already processed") from e
+        if "uq_user_problem" in str(e.orig):
+            # a concurrent submit recorded the first attempt of the same problem
+            raise ConcurrentSubmissionError("Problem progress was created by a concurrent submission") from e
+        if "problem_id_fkey" in str(e.orig):
+            # graded from a snapshot read before the problem was deleted
+            raise InvalidProblemError("A problem in this submission no longer exists") from e
+        raise
 
     return {
         "correct_count": correct_count,
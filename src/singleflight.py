@@ -0,0 +1,63 @@
+"""
+Single-flight call coalescing.
+
+Concurrent callers asking for the same key share one execution of the load
+function: the first caller (the leader) runs it, everyone else waits for its
+outcome. If the load raises, every waiter gets the same exception; a waiter
+that gives up after its timeout gets SingleFlightTimeout while the load keeps
+running for the others. Nothing is cached once the call completes.
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Hashable
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float | None = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            raise SingleFlightTimeout(f"timed out waiting for in-flight load of {key!r}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,199 @@
+"""
+Slow-query log with sampled EXPLAIN capture.
+
+install(engine, name) times every statement on an engine. Statements that take
+SLOW_QUERY_MS or longer are printed as one "SLOW QUERY {json}" line with:
+- the route that ran them
+- the shape of their parameters (types only, never values)
+- the statement
+They are also kept in a ring buffer of the last SLOW_QUERY_BUFFER entries,
+served by /api/debug/slow-queries.
+
+A SLOW_QUERY_EXPLAIN_SAMPLE fraction of slow SELECTs is queued for
+EXPLAIN (ANALYZE, BUFFERS). One background thread runs it, with the same
+parameters, on its own unpooled connection, so capturing a plan never holds the
+request's pooled connection. ANALYZE runs the query a second time, so only
+SELECTs are explained, under a statement timeout, inside a transaction that is
+rolled back. SELECTs with visible side effects are not run again: row locks
+(FOR UPDATE/SHARE, e.g. the outbox claim), sequence calls and pg_*lock
+functions (e.g. the content revision lock). They get a plain EXPLAIN instead.
+Side effects hidden inside other functions cannot be detected. The re-run
+sees committed data, so uncommitted writes of the original transaction are not
+visible to it. Plans that cannot be queued because the queue is full are
+dropped.
+"""
+from __future__ import annotations
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Mapping
+from flask import has_request_context, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.pool import NullPool
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Fraction of slow SELECTs whose plan is captured with EXPLAIN ANALYZE
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0.1"))
+# statement_timeout of a captured EXPLAIN ANALYZE
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "100"))
+# Plans waiting for the capture thread; further samples are dropped
+EXPLAIN_QUEUE_SIZE = 4
+
+_START_KEY = "slow_query_start"
+
+_entries: deque[dict[str, Any]] = deque(maxlen=SLOW_QUERY_BUFFER)
+_entries_lock = threading.Lock()
+_explain_queue: queue.Queue[tuple[dict[str, Any], URL, str, Any]] = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+_explain_engines: dict[str, Engine] = {}
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Types of the bound parameters, without their values."""
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, Mapping):
+        return {key: _type_name(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return None if parameters is None else _type_name(parameters)
+
+
+def current_route() -> str | None:
+    if not has_request_context():
+        return None
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    return f"{request.method} {rule}"
+
+
+# SELECTs that lock rows, advance sequences or take locks when executed
+_SIDE_EFFECTS = re.compile(
+    r"\bfor\s+(no\s+key\s+|key\s+)?(update|share)\b|\b(nextval|setval)\s*\(|\bpg_\w*lock\w*\s*\(",
+    re.IGNORECASE,
+)
+
+
+def _is_explainable(statement: str) -> bool:
+    return statement.lstrip().lower().startswith("select")
+
+
+def can_analyze(statement: str) -> bool:
+    """Whether running the statement again for EXPLAIN ANALYZE has no side effects we can see."""
+    return _is_explainable(statement) and not _SIDE_EFFECTS.search(statement)
+
+
+def install(engine: Engine, name: str) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info[_START_KEY].pop()) * 1000
+        if elapsed_ms >= SLOW_QUERY_MS:
+            record_slow_query(conn.engine.url, name, statement, parameters, executemany, elapsed_ms)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get(_START_KEY):
+            conn.info[_START_KEY].pop()
+
+
+def record_slow_query(url: URL, engine_name: str, statement: str, parameters: Any, executemany: bool,
+                      elapsed_ms: float) -> dict[str, Any]:
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "engine": engine_name,
+        "route": current_route(),
+        "duration_ms": round(elapsed_ms, 2),
+        "parameters": parameter_shape(parameters, executemany),
+        "statement": statement,
+        "plan": None,
+        "explain": "skipped",
+    }
+    print(f"SLOW QUERY {json.dumps(entry, default=str)}")
+    if not executemany and _is_explainable(statement) and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE:
+        try:
+            _explain_queue.put_nowait((entry, url, statement, parameters))
+            entry["explain"] = "pending"
+            _ensure_worker()
+        except queue.Full:
+            entry["explain"] = "dropped"
+    with _entries_lock:
+        _entries.append(entry)
+    return entry
+
+
+def _explain_engine(url: URL) -> Engine:
+    key = url.render_as_string(hide_password=False)
+    explain_engine = _explain_engines.get(key)
+    if explain_engine is None:
+        explain_engine = _explain_engines[key] = create_engine(
+            url, poolclass=NullPool, future=True,
+            connect_args={"application_name": "math-question-app-explain"},
+        )
+    return explain_engine
+
+
+def capture_plan(url: URL, statement: str, parameters: Any) -> str:
+    """
+    EXPLAIN (ANALYZE, BUFFERS) a driver-level SELECT on a new connection,
+    rolled back afterwards; plain EXPLAIN when can_analyze() refuses it.
+    """
+    options = "(ANALYZE, BUFFERS)" if can_analyze(statement) else ""
+    with _explain_engine(url).connect() as conn:
+        try:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+            rows = conn.exec_driver_sql(f"EXPLAIN {options} {statement}", parameters or ())
+            return "\n".join(row[0] for row in rows)
+        finally:
+            conn.rollback()
+
+
+def _explain_worker() -> None:
+    while True:
+        entry, url, statement, parameters = _explain_queue.get()
+        try:
+            plan = capture_plan(url, statement, parameters)
+            status = "captured" if can_analyze(statement) else "captured without analyze"
+        except Exception as e:
+            plan, status = None, f"failed: {type(e).__name__}: {e}"
+        with _entries_lock:
+            entry["plan"], entry["explain"] = plan, status
+        _explain_queue.task_done()
+
+
+def _ensure_worker() -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_explain_worker, name="slow-query-explain", daemon=True)
+            _worker.start()
+
+
+def recent_slow_queries() -> list[dict[str, Any]]:
+    """Buffered slow queries, newest first."""
+    with _entries_lock:
+        return [dict(entry) for entry in reversed(_entries)]
+
+
+def clear_slow_queries() -> None:
+    with _entries_lock:
+        _entries.clear()
@@ -0,0 +1,112 @@
+"""
+In-memory manifest of the built frontend (frontend/dist).
+
+The manifest is built once when the app starts. It records each file's size,
+content hash and precompressed .br/.gz variants, so serving a request never
+touches the filesystem to look a path up. Fingerprinted bundles (Vite's
+assets/name-<hash>.ext) are served with a year-long immutable Cache-Control.
+Other files, including index.html and everything copied from public/, are sent
+with no-cache and revalidated through their ETag.
+"""
+from __future__ import annotations
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from flask import Response, abort, request, send_file
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Vite/Rollup write fingerprinted output to build.assetsDir only, named
+# name-<hash>.ext with an 8-character base64url hash, e.g. index-BzX1a2_c.js.
+# Files elsewhere (public/ copies such as logo-original.svg) can change in place.
+HASHED_DIR = "assets/"
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+VARIANT_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+INDEX = "index.html"
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    size: int
+    etag: str
+    mimetype: str
+    immutable: bool
+    # content-coding -> (file path, size)
+    variants: dict[str, tuple[str, int]] = field(default_factory=dict)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+class StaticManifest:
+    def __init__(self, root: str, assets: dict[str, StaticAsset]):
+        self.root = root
+        self.assets = assets
+
+    @classmethod
+    def build(cls, root: str) -> "StaticManifest":
+        assets: dict[str, StaticAsset] = {}
+        if not os.path.isdir(root):
+            return cls(root, assets)
+        variant_suffixes = tuple(VARIANT_EXTENSIONS.values())
+        for dirpath, _, filenames in os.walk(root):
+            names = set(filenames)
+            for name in filenames:
+                if name.endswith(variant_suffixes) and name[:-3] in names:
+                    continue  # precompressed copy, attached to its original below
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                asset = StaticAsset(
+                    path=path,
+                    size=os.path.getsize(path),
+                    etag=_file_hash(path),
+                    mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    immutable=rel.startswith(HASHED_DIR) and bool(HASHED_NAME.search(name)),
+                )
+                for encoding, suffix in VARIANT_EXTENSIONS.items():
+                    if name + suffix in names:
+                        variant = path + suffix
+                        asset.variants[encoding] = (variant, os.path.getsize(variant))
+                assets[rel] = asset
+        return cls(root, assets)
+
+    def get(self, path: str) -> StaticAsset | None:
+        return self.assets.get(path)
+
+    def __len__(self) -> int:
+        return len(self.assets)
+
+
+def send_asset(asset: StaticAsset) -> Response:
+    """Send an asset, choosing a precompressed variant the client accepts."""
+    path, size, etag, encoding = asset.path, asset.size, asset.etag, None
+    if asset.variants:
+        encoding = request.accept_encodings.best_match([e for e in VARIANT_EXTENSIONS if e in asset.variants])
+        if encoding:
+            path, size = asset.variants[encoding]
+            etag = f"{asset.etag}-{encoding}"
+    response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if asset.variants:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def serve_path(manifest: StaticManifest, path: str) -> Response:
+    """Serve a file from the manifest, falling back to index.html for client-side routes."""
+    asset = manifest.get(path) if path else None
+    if asset is None:
+        asset = manifest.get(INDEX)
+        if asset is None:
+            abort(404)
+    return send_asset(asset)
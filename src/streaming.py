@@ -0,0 +1,61 @@
+import json
+from typing import Callable, Iterable, Iterator
+from flask import Response, stream_with_context
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Flush to the socket in roughly this many bytes instead of once per item
+STREAM_BUFFER_BYTES = 16 * 1024
+
+
+def _buffered(chunks: Iterable[str]) -> Iterator[bytes]:
+    buf: list[str] = []
+    size = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_BUFFER_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def iter_json_array(items: Iterable) -> Iterator[str]:
+    """Encode items as a JSON array, one element at a time."""
+    yield "["
+    first = True
+    for item in items:
+        if not first:
+            yield ","
+        first = False
+        yield json.dumps(item, separators=(",", ":"))
+    yield "]"
+
+
+def iter_ndjson(items: Iterable) -> Iterator[str]:
+    """Encode items as newline-delimited JSON."""
+    for item in items:
+        yield json.dumps(item, separators=(",", ":"))
+        yield "\n"
+
+
+def stream_items(items: Iterable, fmt: str, on_close: Callable[[], None] | None = None) -> Response:
+    """Build a streamed response for `items` in `fmt` ("ndjson" or "stream").
+
+    `on_close` runs once the body is fully sent or the client disconnects, so
+    callers can keep a DB session open for the lifetime of the stream.
+    """
+    if fmt == "ndjson":
+        body, mimetype = iter_ndjson(items), NDJSON_MIMETYPE
+    else:
+        body, mimetype = iter_json_array(items), "application/json"
+
+    def generate():
+        try:
+            yield from _buffered(body)
+        finally:
+            if on_close is not None:
+                on_close()
+
+    return Response(stream_with_context(generate()), mimetype=mimetype)
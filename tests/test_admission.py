@@ -0,0 +1,97 @@
+import threading
+import uuid
+from http import HTTPStatus
+import pytest
+from src.admission import AdmissionController, AdmissionRejected, TokenBucket, submit_admission
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    for _ in range(2):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.wait_time() == 0
+
+
+def test_per_user_limit_does_not_spend_other_users_tokens():
+    clock = FakeClock()
+    ctl = AdmissionController(user_rate=1, user_burst=1, global_rate=100, global_burst=100,
+                              max_concurrent=1, max_queue=0, queue_timeout=0.01, clock=clock)
+    with ctl.admit("a"):
+        pass
+    with pytest.raises(AdmissionRejected) as exc:
+        with ctl.admit("a"):
+            pass
+    assert exc.value.retry_after == pytest.approx(1.0)
+    with ctl.admit("b"):
+        pass
+
+
+def test_bounded_queue_rejects_when_slots_are_busy():
+    ctl = AdmissionController(user_rate=100, user_burst=100, global_rate=100, global_burst=100,
+                              max_concurrent=1, max_queue=0, queue_timeout=0.05)
+    entered, release = threading.Event(), threading.Event()
+
+    def hold_slot():
+        with ctl.admit("a"):
+            entered.set()
+            release.wait(5)
+
+    t = threading.Thread(target=hold_slot)
+    t.start()
+    entered.wait(5)
+    try:
+        with pytest.raises(AdmissionRejected, match="queued"):
+            with ctl.admit("b"):
+                pass
+    finally:
+        release.set()
+        t.join()
+
+
+def test_queue_rejection_gives_tokens_back():
+    clock = FakeClock()
+    ctl = AdmissionController(user_rate=1, user_burst=1, global_rate=100, global_burst=2,
+                              max_concurrent=1, max_queue=0, queue_timeout=0.05, clock=clock)
+    with ctl.admit("a"):
+        with pytest.raises(AdmissionRejected, match="queued"):
+            with ctl.admit("b"):
+                pass
+    # "b" never ran, so it was not charged: no time has passed and it is admitted
+    with ctl.admit("b"):
+        pass
+
+
+def test_rates_must_be_positive():
+    settings = dict(user_rate=1, user_burst=1, global_rate=1, global_burst=1,
+                    max_concurrent=1, max_queue=0, queue_timeout=1)
+    for name, value in (("user_rate", 0), ("global_rate", -1), ("user_burst", 0), ("max_concurrent", 0)):
+        with pytest.raises(ValueError):
+            AdmissionController(**{**settings, name: value})
+
+
+def test_submit_returns_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(submit_admission, "user_burst", 1)
+    monkeypatch.setattr(submit_admission, "user_rate", 0.01)
+    submit_admission.reset()
+    try:
+        payload = {"answers": [{"problem_id": 1, "option_id": 2}]}
+        first = client.post("/api/lessons/1/submit", json={**payload, "attempt_id": str(uuid.uuid4())})
+        assert first.status_code == HTTPStatus.OK
+        second = client.post("/api/lessons/1/submit", json={**payload, "attempt_id": str(uuid.uuid4())})
+        assert second.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert int(second.headers["Retry-After"]) >= 1
+    finally:
+        monkeypatch.undo()
+        submit_admission.reset()
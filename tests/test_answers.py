@@ -0,0 +1,39 @@
+import uuid
+from http import HTTPStatus
+import pytest
+from src.models import Problem
+from src.services.answers import answer_hash, canonicalize_answer
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("6", "6"),
+    (" 6.0 ", "6"),
+    ("06", "6"),
+    ("12/2", "6"),
+    ("2 * 3", "6"),
+    ("0.5", "1/2"),
+    ("2/4", "1/2"),
+    ("-3", "-3"),
+    ("10.05", "201/20"),
+    ("8 ÷ 2", "4"),
+    ("Hello  World", "hello world"),
+    ("1/0", "1/0"),
+])
+def test_canonicalize_answer(raw, expected):
+    assert canonicalize_answer(raw) == expected
+
+
+def test_problem_stores_hash_on_ingest():
+    p = Problem(lesson_id=1, type="input", prompt="?", correct_answer_text="12")
+    assert p.correct_answer_hash == answer_hash("12.0")
+    p.correct_answer_text = "1/2"
+    assert p.correct_answer_hash == answer_hash("0.5")
+
+
+def test_submit_accepts_equivalent_numeric_answer(client):
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()),
+        "answers": [{"problem_id": 2, "value": "24/2"}],
+    })
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.get_json()["correct_count"] == 1
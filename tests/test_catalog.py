@@ -0,0 +1,48 @@
+import pytest
+from src.models import Lesson
+from src.services.answers import answer_hash
+from src.services.catalog import CompactCatalog, load_compact_catalog
+from src.services.lessons import _load_lesson_catalog
+
+
+def test_compact_catalog_matches_lesson_catalog(client, db_session):
+    catalog = load_compact_catalog(db_session)
+    lesson_ids = db_session.query(Lesson.id).order_by(Lesson.id).all()
+    assert list(catalog.lesson_ids) == [lid for lid, in lesson_ids]
+    for lid, in lesson_ids:
+        assert catalog.lesson_detail(lid) == _load_lesson_catalog(db_session, lid)
+    assert catalog.lesson_detail(10 ** 9) is None
+
+
+def test_grading_lookups(client, db_session):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    catalog = load_compact_catalog(db_session)
+    mcq, text = catalog.lesson_problems(lesson_id)
+    assert (mcq.type, text.type) == ("mcq", "input")
+    assert text.correct_answer_hash == answer_hash("12") and mcq.correct_answer_hash is None
+
+    options = {o["text"]: o["id"] for o in mcq.options()}
+    assert mcq.option_is_correct(options["4"]) is True
+    assert mcq.option_is_correct(options["3"]) is False
+    # options of another problem are not accepted
+    assert text.option_is_correct(options["4"]) is None
+    assert catalog.find_problem(lesson_id, text.id).id == text.id
+    assert catalog.find_problem(lesson_id, 10 ** 9) is None
+
+
+def test_build_from_rows():
+    catalog = CompactCatalog.build(
+        [(1, "A", "a"), (3, "B", "b"), (5, "Empty", "")],
+        [(10, 1, "mcq", None, None, "p10"), (11, 1, "input", None, "7", "p11"), (4, 3, "mcq", None, None, "p4")],
+        [(100, 10, "yes", True), (101, 10, "no", False), (50, 4, "no", False)],
+    )
+    assert len(catalog) == 3
+    assert [p.id for p in catalog.lesson_problems(1)] == [10, 11]
+    assert catalog.lesson_detail(3)["problems"] == [{"id": 4, "type": "mcq", "prompt": "p4",
+                                                     "options": [{"id": 50, "text": "no"}]}]
+    assert catalog.lesson_detail(5)["problems"] == []
+    assert catalog.find_problem(1, 11).correct_answer_hash == answer_hash("7")
+    # repeated option texts share one string object
+    assert catalog.option_texts[1] is catalog.option_texts[2]
+    with pytest.raises(ValueError):
+        CompactCatalog.build([(1, "A", "a")], [(10, 2, "mcq", None, None, "p")], [])
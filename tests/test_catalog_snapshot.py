@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import text
+from src.models import Lesson, Problem
+from src.services import catalog_snapshot
+from src.services.catalog import CompactCatalog, load_compact_catalog
+from src.services.catalog_snapshot import MappedCatalog, write_snapshot
+from src.services.lessons import _load_lesson_catalog, clear_catalog_cache
+
+
+@pytest.fixture()
+def snapshot_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.snap")
+    monkeypatch.setattr(catalog_snapshot, "CATALOG_SNAPSHOT_PATH", path)
+    catalog_snapshot.reset_snapshot()
+    clear_catalog_cache()
+    yield path
+    catalog_snapshot.reset_snapshot()
+    clear_catalog_cache()
+
+
+def test_mapped_catalog_matches_database(client, db_session, snapshot_path):
+    catalog = load_compact_catalog(db_session)
+    assert write_snapshot(catalog, snapshot_path) == 1
+    mapped = MappedCatalog.open(snapshot_path)
+    assert mapped.version == 1
+    assert len(mapped) == len(catalog) and list(mapped.option_texts) == catalog.option_texts
+    for lesson_id in catalog.lesson_ids:
+        assert mapped.lesson_detail(lesson_id) == _load_lesson_catalog(db_session, lesson_id)
+
+
+def test_routes_use_snapshot(client, db_session, snapshot_path):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    write_snapshot(load_compact_catalog(db_session), snapshot_path)
+    # a raw SQL edit does not bump the content revision: the snapshot still answers
+    db_session.execute(text("UPDATE problems SET prompt = 'raw edit' WHERE lesson_id = :l"), {"l": lesson_id})
+    db_session.commit()
+
+    detail = client.get(f"/api/lessons/{lesson_id}").get_json()
+    assert [p["prompt"] for p in detail["problems"]] == ["2+2=?", "3x4?"]
+    problem_id = detail["problems"][1]["id"]
+    correct = next(o["id"] for o in detail["problems"][0]["options"] if o["text"] == "4")
+    resp = client.post(f"/api/lessons/{lesson_id}/submit", json={
+        "attempt_id": "snapshot-1",
+        "answers": [{"problem_id": detail["problems"][0]["id"], "option_id": correct},
+                    {"problem_id": problem_id, "value": "12"}],
+    })
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["correct_count"] == 2
+    resp = client.post(f"/api/lessons/{lesson_id}/submit", json={
+        "attempt_id": "snapshot-2",
+        "answers": [{"problem_id": detail["problems"][0]["id"], "option_id": 10 ** 9}],
+    })
+    assert resp.status_code == 400
+
+
+def test_lessons_changed_after_export_come_from_database(client, db_session, snapshot_path):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    write_snapshot(load_compact_catalog(db_session), snapshot_path)
+    assert MappedCatalog.open(snapshot_path).content_revision > 0
+    problem = db_session.query(Problem).filter_by(lesson_id=lesson_id, type="input").one()
+    problem.prompt = "changed"
+    problem.correct_answer_text = "13"
+    problem_id = problem.id
+    db_session.commit()
+
+    detail = client.get(f"/api/lessons/{lesson_id}").get_json()
+    assert [p["prompt"] for p in detail["problems"]] == ["2+2=?", "changed"]
+    resp = client.post(f"/api/lessons/{lesson_id}/submit", json={
+        "attempt_id": "snapshot-changed-1",
+        "answers": [{"problem_id": problem_id, "value": "13"}],
+    })
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["correct_count"] == 1
+
+
+def test_problem_deleted_behind_the_snapshot_is_rejected(client, db_session, snapshot_path):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    problem_id = db_session.query(Problem.id).filter_by(lesson_id=lesson_id, type="input").scalar()
+    write_snapshot(load_compact_catalog(db_session), snapshot_path)
+    # deleted without bumping the revision, so the snapshot still lists the problem
+    db_session.execute(text("DELETE FROM problems WHERE id = :p"), {"p": problem_id})
+    db_session.commit()
+
+    resp = client.post(f"/api/lessons/{lesson_id}/submit", json={
+        "attempt_id": "snapshot-deleted-1",
+        "answers": [{"problem_id": problem_id, "value": "12"}],
+    })
+    assert resp.status_code == 422
+    assert resp.get_json()["error"] == "InvalidProblem"
+
+
+def test_new_version_is_swapped_in(snapshot_path, monkeypatch):
+    write_snapshot(CompactCatalog.build([(1, "Old", "")], [], []), snapshot_path)
+    old = catalog_snapshot.get_snapshot()
+    assert old.version == 1 and old.lesson_detail(1)["title"] == "Old"
+
+    assert write_snapshot(CompactCatalog.build([(1, "New", "")], [], []), snapshot_path) == 2
+    # not rechecked before the interval has passed
+    assert catalog_snapshot.get_snapshot() is old
+    monkeypatch.setattr(catalog_snapshot, "CATALOG_SNAPSHOT_CHECK_INTERVAL", 0)
+    new = catalog_snapshot.get_snapshot()
+    assert new.version == 2 and new.lesson_detail(1)["title"] == "New"
+    # the replaced mapping stays readable for requests still using it
+    assert old.lesson_detail(1)["title"] == "Old"
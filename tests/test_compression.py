@@ -0,0 +1,31 @@
+import gzip
+import json
+from http import HTTPStatus
+from src import compression
+
+
+def test_lesson_detail_is_gzipped_and_cached(client, monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION_MIN_SIZE", 0)
+    monkeypatch.setattr(compression, "brotli", None)
+    compression.clear_cache()
+    calls = []
+    real_compress = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda data, enc: calls.append(enc) or real_compress(data, enc))
+
+    plain = client.get("/api/lessons/1").get_json()
+    for _ in range(3):
+        resp = client.get("/api/lessons/1", headers={"Accept-Encoding": "gzip, deflate"})
+        assert resp.status_code == HTTPStatus.OK
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["Vary"]
+        assert json.loads(gzip.decompress(resp.get_data())) == plain
+    assert calls == ["gzip"]
+
+
+def test_small_or_unaccepted_responses_are_not_compressed(client):
+    resp = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    resp = client.get("/api/lessons/1", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in resp.headers
+    resp = client.get("/api/lessons?format=stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
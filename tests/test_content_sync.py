@@ -0,0 +1,111 @@
+from src.models import Lesson, LessonTombstone, Problem, ProblemOption
+
+
+def _changes(client, since, **params):
+    resp = client.get("/api/lessons/changes", query_string={"since": since, **params})
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def _latest_revision(client):
+    data = _changes(client, 0, limit=500)
+    while data["has_more"]:
+        data = _changes(client, data["revision"], limit=500)
+    return data["revision"]
+
+
+def test_full_sync_sends_whole_lessons(client, db_session):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    data = _changes(client, 0, limit=500)
+    lesson = next(item for item in data["lessons"] if item["id"] == lesson_id)
+    assert [p["prompt"] for p in lesson["problems"]] == ["2+2=?", "3x4?"]
+    assert [o["text"] for o in lesson["problems"][0]["options"]] == ["3", "4", "5"]
+    assert "is_correct" not in lesson["problems"][0]["options"][0]
+    assert data["revision"] >= lesson["revision"] > 0
+
+    since = _latest_revision(client)
+    assert _changes(client, since) == {"since": since, "revision": since, "has_more": False,
+                                       "lessons": [], "deleted": []}
+
+
+def test_problem_and_option_changes_bump_their_lesson(client, db_session):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    since = _latest_revision(client)
+
+    problem = db_session.query(Problem).filter_by(lesson_id=lesson_id, type="input").one()
+    old_revision = problem.revision
+    problem.prompt = "3 times 4?"
+    db_session.commit()
+    assert problem.revision > old_revision
+    data = _changes(client, since)
+    assert [item["id"] for item in data["lessons"]] == [lesson_id]
+    assert data["lessons"][0]["problems"][1]["prompt"] == "3 times 4?"
+    assert data["revision"] == data["lessons"][0]["revision"] > since
+
+    since = data["revision"]
+    mcq_id = db_session.query(Problem.id).filter_by(lesson_id=lesson_id, type="mcq").scalar()
+    db_session.add(ProblemOption(problem_id=mcq_id, text="6", is_correct=False))
+    db_session.commit()
+    data = _changes(client, since)
+    assert [item["id"] for item in data["lessons"]] == [lesson_id]
+    assert [o["text"] for o in data["lessons"][0]["problems"][0]["options"]] == ["3", "4", "5", "6"]
+
+    # unchanged objects in the session do not bump anything
+    since = data["revision"]
+    db_session.query(Problem).filter_by(lesson_id=lesson_id).all()
+    db_session.commit()
+    assert _changes(client, since)["lessons"] == []
+
+
+def test_lesson_detail_cache_follows_revisions(client, db_session):
+    lesson_id = db_session.query(Lesson.id).order_by(Lesson.id.desc()).first()[0]
+    assert client.get(f"/api/lessons/{lesson_id}").status_code == 200  # cached now
+
+    problem = db_session.query(Problem).filter_by(lesson_id=lesson_id, type="input").one()
+    old_prompt = problem.prompt
+    problem.prompt = "4 times 3?"
+    db_session.commit()
+    detail = client.get(f"/api/lessons/{lesson_id}").get_json()
+    assert [p["prompt"] for p in detail["problems"]][1] == "4 times 3?"
+
+    problem = db_session.query(Problem).filter_by(lesson_id=lesson_id, type="input").one()
+    problem.prompt = old_prompt
+    db_session.commit()
+
+
+def test_deleted_lesson_is_sent_as_tombstone(client, db_session):
+    lesson = Lesson(title="Doomed", description="", order_index=99)
+    db_session.add(lesson)
+    db_session.commit()
+    lesson_id = lesson.id
+    since = _latest_revision(client)
+
+    db_session.delete(db_session.get(Lesson, lesson_id))
+    db_session.commit()
+    assert db_session.get(LessonTombstone, lesson_id) is not None
+    data = _changes(client, since)
+    assert data["deleted"] == [lesson_id]
+    assert data["lessons"] == []
+
+
+def test_changes_are_paged_in_revision_order(client, db_session):
+    since = _latest_revision(client)
+    lessons = [Lesson(title=f"Sync {i}", description="", order_index=100 + i) for i in range(3)]
+    db_session.add_all(lessons)
+    db_session.commit()
+    lesson_ids = [lesson.id for lesson in lessons]
+    db_session.delete(db_session.get(Lesson, lesson_ids[0]))
+    db_session.commit()
+
+    first = _changes(client, since, limit=1)
+    assert first["has_more"] and [item["id"] for item in first["lessons"]] == [lesson_ids[1]]
+    second = _changes(client, first["revision"], limit=2)
+    assert not second["has_more"]
+    assert [item["id"] for item in second["lessons"]] == [lesson_ids[2]]
+    assert second["deleted"] == [lesson_ids[0]]
+
+
+def test_changes_validation(client):
+    assert client.get("/api/lessons/changes?since=-1").status_code == 400
+    assert client.get("/api/lessons/changes?limit=0").status_code == 400
+    assert client.get("/api/lessons/changes?limit=501").status_code == 400
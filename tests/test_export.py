@@ -0,0 +1,37 @@
+import gzip
+import json
+import pytest
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, Table, func, select
+from src.models import Submission, UserProblemProgress
+from src.services.export import arrow_schema, export_table
+
+
+def test_export_jsonl_gz_in_chunks(client, db_session, tmp_path):
+    total = db_session.scalar(select(func.count(UserProblemProgress.id)))
+    path = tmp_path / "upp.columns.jsonl.gz"
+    result = export_table(db_session, "user_problem_progress", str(path), "jsonl.gz", chunk_size=1)
+
+    with gzip.open(path, "rt") as f:
+        batches = [json.loads(line) for line in f]
+    assert result.rows == total == sum(len(b["id"]) for b in batches)
+    assert all(len(b["id"]) == 1 for b in batches)
+
+
+def test_export_parquet(client, db_session, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "submissions.parquet"
+    result = export_table(db_session, "submissions", str(path), "parquet", chunk_size=2)
+    assert pq.read_table(path).num_rows == result.rows
+    assert pq.read_schema(path) == arrow_schema(Submission.__table__)
+
+
+def test_parquet_schema_comes_from_column_types():
+    pa = pytest.importorskip("pyarrow")
+    table = Table("t", MetaData(), Column("id", Integer, primary_key=True),
+                  Column("score", Float, nullable=True), Column("seen_at", DateTime, nullable=True))
+    schema = arrow_schema(table)
+    assert [(f.name, f.type, f.nullable) for f in schema] == [
+        ("id", pa.int32(), False), ("score", pa.float64(), True), ("seen_at", pa.timestamp("us"), True)]
+    # a batch whose nullable columns are all null keeps the declared types
+    batch = pa.RecordBatch.from_pydict({"id": [1, 2], "score": [None, None], "seen_at": [None, None]}, schema=schema)
+    assert batch.schema == schema
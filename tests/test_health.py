@@ -0,0 +1,101 @@
+import time
+import pytest
+from src import health
+from src.db import SessionLocal, engine
+from src.health import HealthChecker, code_migration_head, probe_database
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def fresh_checker():
+    health.checker.reset()
+    yield health.checker
+    health.checker.reset()
+
+
+def test_checker_serves_cached_result_and_refreshes_in_background():
+    clock = FakeClock()
+    calls = []
+
+    def probe():
+        calls.append(clock.now)
+        return {"n": len(calls)}
+
+    checker = HealthChecker(probe, ttl=5, max_age=30, clock=clock)
+    assert checker.get() == ({"n": 1}, 0.0)
+    clock.now += 4
+    assert checker.get() == ({"n": 1}, 4.0)
+    assert len(calls) == 1
+
+    clock.now += 2
+    # the stale result is answered right away while the refresh runs
+    assert checker.get() == ({"n": 1}, 6.0)
+    checker.refresh_thread.join(timeout=5)
+    assert checker.get() == ({"n": 2}, 0.0)
+    assert len(calls) == 2
+
+
+def test_checker_starts_one_refresh_at_a_time():
+    clock = FakeClock()
+    calls = []
+
+    def probe():
+        calls.append(1)
+        if len(calls) > 1:
+            time.sleep(0.2)
+        return {"n": len(calls)}
+
+    checker = HealthChecker(probe, ttl=5, max_age=30, clock=clock)
+    checker.get()
+    clock.now += 10
+    for _ in range(20):
+        checker.get()
+    checker.refresh_thread.join(timeout=5)
+    assert len(calls) == 2
+
+
+def test_ready_reports_database_and_pools(client, fresh_checker):
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["status"] == "ok"
+    assert data["database"]["reachable"] and data["database"]["latency_ms"] >= 0
+    # the test database is built with create_all, not migrated
+    assert data["migrations"] == {"database": None, "code": code_migration_head(), "current": None}
+    assert data["pools"]["primary"]["capacity"] == 1
+    assert 0 <= data["pools"]["primary"]["saturation"] <= 1
+
+
+def test_ready_reports_migration_mismatch_and_failures(client, fresh_checker, monkeypatch):
+    reachable = {"checked_at": "2026-01-01T00:00:00", "reachable": True, "connect_ms": 1.0,
+                 "latency_ms": 0.5, "migration": "20240801_0001", "error": None}
+    monkeypatch.setattr(fresh_checker, "probe", lambda: reachable)
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "degraded"
+    assert resp.get_json()["migrations"]["current"] is False
+
+    fresh_checker.reset()
+    monkeypatch.setattr(fresh_checker, "probe", lambda: {**reachable, "reachable": False, "error": "down"})
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 503
+    assert resp.get_json()["status"] == "unavailable"
+    assert resp.get_json()["database"]["error"] == "down"
+
+
+def test_probe_does_not_need_the_pooled_connection(db_session):
+    db_session.close()
+    SessionLocal.remove()
+    with engine.connect():
+        # the only pooled connection is checked out; the probe opens its own
+        started = time.monotonic()
+        result = probe_database()
+    assert result["reachable"], result["error"]
+    assert time.monotonic() - started < 5
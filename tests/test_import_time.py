@@ -0,0 +1,58 @@
+"""
+Cold-import budgets for the app and the Vercel handlers in api/.
+
+Each module is imported in a fresh interpreter with -X importtime (the app
+three times, keeping the fastest, since single imports vary a lot on shared
+machines). The test fails when the module's cumulative import time goes over
+budget, when the app loads the services, schemas or health checks at import
+instead of in the views that need them, and when a handler loads SQLAlchemy,
+alembic or the Flask app at import instead of in the request that needs them.
+The app budget is close to the measured ~350ms with DATABASE_URL set, as in
+tests and deployments (Flask, SQLAlchemy and the pg8000 driver are most of
+it), so regressions show up. Budgets can be raised on slow machines with
+IMPORT_TIME_BUDGET_MS (app) and HANDLER_IMPORT_TIME_BUDGET_MS (api/*).
+"""
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "450"))
+HANDLER_BUDGET_MS = float(os.getenv("HANDLER_IMPORT_TIME_BUDGET_MS", "100"))
+HANDLERS = ["index", "seed", "migrate", "migrate-simple", "test-all"]
+HEAVY_MODULES = ("sqlalchemy", "alembic", "flask", "src")
+# loaded by the views that use them, not by `import app`
+LAZY_APP_MODULES = ("src.services", "src.schemas", "src.health", "pydantic")
+
+
+def import_profile(module: str, path: str) -> dict[str, float]:
+    """Cumulative import time in ms of each module imported by `import module`."""
+    env = dict(os.environ, VERCEL="1")  # no DB connection from create_app
+    code = f"import sys; sys.path.insert(0, {path!r}); __import__({module!r})"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test_app_import_within_budget():
+    times = import_profile("app", ROOT)
+    eager = sorted(name for name in times if name.startswith(LAZY_APP_MODULES))
+    assert not eager, f"importing app loads {eager[:5]}"
+    fastest = min([times["app"]] + [import_profile("app", ROOT)["app"] for _ in range(2)])
+    assert fastest <= APP_BUDGET_MS, f"importing app took {fastest:.0f}ms (budget {APP_BUDGET_MS:.0f}ms)"
+
+
+@pytest.mark.parametrize("handler", HANDLERS)
+def test_handler_import_is_lazy(handler):
+    times = import_profile(handler, os.path.join(ROOT, "api"))
+    heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"api/{handler}.py imports {heavy[:5]} at module load"
+    assert times[handler] <= HANDLER_BUDGET_MS, \
+        f"importing api/{handler}.py took {times[handler]:.0f}ms (budget {HANDLER_BUDGET_MS:.0f}ms)"
@@ -0,0 +1,24 @@
+import json
+from http import HTTPStatus
+
+
+def test_lessons_stream_formats_match_json(client):
+    plain = client.get("/api/lessons")
+    assert plain.status_code == HTTPStatus.OK
+    expected = plain.get_json()
+
+    streamed = client.get("/api/lessons?format=stream")
+    assert streamed.status_code == HTTPStatus.OK
+    assert streamed.is_streamed
+    assert json.loads(streamed.get_data(as_text=True)) == expected
+
+    ndjson = client.get("/api/lessons?format=ndjson")
+    assert ndjson.status_code == HTTPStatus.OK
+    assert ndjson.mimetype == "application/x-ndjson"
+    lines = ndjson.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+
+def test_lessons_unknown_format_returns_400(client):
+    resp = client.get("/api/lessons?format=xml")
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
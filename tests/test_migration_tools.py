@@ -0,0 +1,56 @@
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from src.db import engine
+from src import migration_tools
+
+
+@pytest.fixture()
+def ops():
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS mt_items"))
+        conn.execute(text("DROP TABLE IF EXISTS migration_checkpoints"))
+        conn.execute(text("CREATE TABLE mt_items (id SERIAL PRIMARY KEY, v INTEGER NOT NULL, doubled INTEGER)"))
+        conn.execute(text("INSERT INTO mt_items (v) SELECT g FROM generate_series(1, 2500) g"))
+        conn.commit()
+        migration_tools.reset_report()
+        yield Operations(MigrationContext.configure(conn))
+        conn.rollback()
+        conn.execute(text("DROP TABLE mt_items"))
+        conn.execute(text("DROP TABLE IF EXISTS migration_checkpoints"))
+        conn.commit()
+
+
+def test_batched_backfill_resumes_from_checkpoint(ops):
+    conn = ops.get_bind()
+    conn.execute(text(
+        "CREATE TABLE migration_checkpoints (name VARCHAR(200) PRIMARY KEY, last_key BIGINT, "
+        "rows_done BIGINT NOT NULL DEFAULT 0, completed_at TIMESTAMP, updated_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+    # an earlier run stopped after the first 1000 rows
+    conn.execute(text("INSERT INTO migration_checkpoints (name, last_key, rows_done) VALUES ('double-v', 1000, 1000)"))
+    conn.commit()
+
+    rows = migration_tools.batched_backfill("double-v", "mt_items", "doubled = t.v * 2", "t.doubled IS NULL",
+                                            batch_size=400, operations=ops)
+    assert rows == 1500
+    assert conn.scalar(text("SELECT count(*) FROM mt_items WHERE doubled = v * 2")) == 1500
+    checkpoint = conn.execute(text("SELECT last_key, rows_done, completed_at FROM migration_checkpoints")).one()
+    assert checkpoint.last_key == 2500 and checkpoint.rows_done == 2500 and checkpoint.completed_at
+    conn.commit()
+    assert migration_tools.batched_backfill("double-v", "mt_items", "doubled = 0", batch_size=400, operations=ops) == 0
+    assert [(s["name"], s["rows"]) for s in migration_tools.report()] == [("backfill double-v", 1500), ("backfill double-v", 0)]
+
+
+def test_create_index_concurrently(ops):
+    migration_tools.create_index_concurrently("ix_mt_items_pending", "mt_items", ["id"], where="doubled IS NULL",
+                                              operations=ops)
+    # a second run is a no-op
+    migration_tools.create_index_concurrently("ix_mt_items_pending", "mt_items", ["id"], where="doubled IS NULL",
+                                              operations=ops)
+    valid = ops.get_bind().scalar(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = 'ix_mt_items_pending'"
+    ))
+    assert valid is True
+    assert [s["name"] for s in migration_tools.report()] == ["create index ix_mt_items_pending"] * 2
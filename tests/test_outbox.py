@@ -0,0 +1,88 @@
+import uuid
+from http import HTTPStatus
+from sqlalchemy import select
+from src.models import OutboxCheckpoint, OutboxEvent
+from src.services import outbox
+from src.services.stats import SUBMISSION_GRADED
+
+
+def test_submit_writes_event_applied_once_by_worker(client, db_session):
+    outbox.drain(db_session)
+    attempt_id = str(uuid.uuid4())
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": attempt_id, "answers": [{"problem_id": 2, "value": "12"}],
+    })
+    assert resp.status_code == HTTPStatus.OK
+    event = db_session.execute(
+        select(OutboxEvent).where(OutboxEvent.topic == SUBMISSION_GRADED).order_by(OutboxEvent.id.desc())
+    ).scalars().first()
+    assert event.payload["attempt_id"] == attempt_id and event.processed_at is None
+    assert event.payload["problems"][0][:3] == [2, 1, 1]
+    db_session.rollback()
+
+    result = outbox.drain(db_session)
+    assert result.processed == 1 and result.last_event_id == event.id
+    assert outbox.drain(db_session).claimed == 0
+    checkpoint = db_session.get(OutboxCheckpoint, outbox.DEFAULT_CONSUMER)
+    assert checkpoint.last_event_id >= event.id
+    db_session.rollback()
+
+
+def test_submit_applies_a_bounded_batch_after_commit(client, db_session, monkeypatch):
+    outbox.drain(db_session)
+    monkeypatch.setattr(outbox, "INLINE_BATCH_SIZE", 1)
+    # left pending by an earlier request; the next submit applies only one event
+    outbox.enqueue(db_session, SUBMISSION_GRADED, {"attempt_id": "inline-old", "user_id": 1,
+                                                   "lesson_id": 1, "problems": []})
+    db_session.commit()
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()), "answers": [{"problem_id": 2, "value": "12"}],
+    })
+    assert resp.status_code == HTTPStatus.OK
+    db_session.rollback()
+    assert outbox.pending_count(db_session) == 1
+    checkpoint = db_session.get(OutboxCheckpoint, outbox.INLINE_CONSUMER)
+    assert checkpoint.events_processed >= 1
+
+    monkeypatch.setattr(outbox, "process_batch", lambda *args, **kwargs: 1 / 0)
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()), "answers": [{"problem_id": 2, "value": "12"}],
+    })
+    # a failing inline batch never fails the committed submit
+    assert resp.status_code == HTTPStatus.OK
+    db_session.rollback()
+    assert outbox.pending_count(db_session) == 2
+    monkeypatch.undo()
+    assert outbox.drain(db_session).processed == 2
+    db_session.rollback()
+
+
+def test_failing_handler_is_retried_without_blocking_others(db_session, monkeypatch):
+    outbox.drain(db_session)
+    calls = []
+
+    def flaky(db, payload):
+        calls.append(payload["n"])
+        if payload["n"] == 1:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(outbox, "HANDLERS", {"test.flaky": flaky})
+    monkeypatch.setattr(outbox, "MAX_ATTEMPTS", 2)
+    for n in range(3):
+        outbox.enqueue(db_session, "test.flaky", {"n": n})
+    db_session.commit()
+
+    first = outbox.process_batch(db_session, consumer="test")
+    assert (first.processed, first.failed) == (2, 1)
+    second = outbox.process_batch(db_session, consumer="test")
+    assert (second.processed, second.failed) == (0, 1)
+    # retry limit reached: the event stays pending with its error and is no longer claimed
+    assert outbox.process_batch(db_session, consumer="test").claimed == 0
+    failed = db_session.execute(select(OutboxEvent).where(OutboxEvent.topic == "test.flaky",
+                                                          OutboxEvent.processed_at.is_(None))).scalar_one()
+    assert failed.attempts == 2 and "boom" in failed.last_error
+    assert calls == [0, 1, 2, 1]
+    checkpoint = db_session.get(OutboxCheckpoint, "test")
+    assert (checkpoint.events_processed, checkpoint.events_failed) == (2, 2)
+    db_session.delete(failed)
+    db_session.commit()
@@ -0,0 +1,134 @@
+from datetime import date
+import pytest
+from sqlalchemy import text
+from src.db import engine
+from src.models import Lesson, SubmissionAttemptKey
+from src.services import partitioning
+from src.services.submit import claim_attempt, purge_attempt_keys
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture()
+def conn(client, db_session):
+    lesson_id = db_session.query(Lesson.id).first()[0]
+    db_session.close()  # the pool holds a single connection
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS pt_submissions, pt_submissions_legacy, pt_submissions_partitioned, "
+                          "pt_submissions_changes CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS pt_submissions_changes_log() CASCADE"))
+        conn.execute(text(
+            "CREATE TABLE pt_submissions (id SERIAL PRIMARY KEY, attempt_id VARCHAR(64) NOT NULL UNIQUE, "
+            "user_id INTEGER REFERENCES users (id), lesson_id INTEGER REFERENCES lessons (id), "
+            "created_at TIMESTAMP, correct_count INTEGER NOT NULL DEFAULT 0)"
+        ))
+        # 500 rows spread over January to October 2026
+        conn.execute(text(
+            "INSERT INTO pt_submissions (attempt_id, user_id, lesson_id, created_at) "
+            "SELECT 'pt-' || g, 1, :lesson, timestamp '2026-01-01' + make_interval(hours => g * 13) "
+            "FROM generate_series(1, 500) g"
+        ), {"lesson": lesson_id})
+        conn.commit()
+        yield conn
+        conn.rollback()
+        conn.execute(text("DROP TABLE IF EXISTS pt_submissions, pt_submissions_legacy CASCADE"))
+        conn.commit()
+
+
+def test_month_helpers():
+    assert partitioning.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert partitioning.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partitioning.partition_name("submissions", date(2026, 3, 1)) == "submissions_y2026m03"
+
+
+def test_convert_to_partitioned(conn):
+    result = partitioning.convert_to_partitioned(conn, "pt_submissions", batch_size=120, months_ahead=2, today=TODAY)
+    assert result.rows_copied == 500
+    assert partitioning.is_partitioned(conn, "pt_submissions")
+    months = [month for _, month in partitioning.list_partitions(conn, "pt_submissions")]
+    assert months[0] == date(2026, 1, 1) and months[-1] == date(2026, 12, 1) and len(months) == 12
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions")) == 500
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions_y2026m02")) > 0
+
+    # the id sequence moved with the table and keeps counting
+    new_id = conn.scalar(text(
+        "INSERT INTO pt_submissions (attempt_id, user_id, created_at) VALUES ('pt-new', 1, now()) RETURNING id"
+    ))
+    assert new_id == 501
+    indexes = set(conn.scalars(text("SELECT indexname FROM pg_indexes WHERE tablename = 'pt_submissions'")))
+    assert {"pt_submissions_pkey", "ix_pt_submissions_user_created", "ix_pt_submissions_attempt_id"} <= indexes
+    # the change log and its trigger are gone
+    assert conn.scalar(text("SELECT to_regclass('pt_submissions_changes')")) is None
+    assert conn.scalar(text("SELECT count(*) FROM pg_trigger WHERE tgname = 'pt_submissions_changes_log'")) == 0
+    conn.commit()
+    # converting again is a no-op
+    assert partitioning.convert_to_partitioned(conn, "pt_submissions", today=TODAY).rows_copied == 0
+
+
+def test_conversion_reconciles_rows_changed_behind_the_batches(conn):
+    def progress(rows_copied):
+        if rows_copied == 120:
+            # committed after the first batch: a row with an id below the copied
+            # range, a delete and an update of rows already copied
+            conn.execute(text("INSERT INTO pt_submissions (id, attempt_id, user_id, created_at) "
+                              "VALUES (-5, 'pt-late', 1, '2026-03-01')"))
+            conn.execute(text("DELETE FROM pt_submissions WHERE id = 3"))
+            conn.execute(text("UPDATE pt_submissions SET correct_count = 7 WHERE id = 4"))
+
+    partitioning.convert_to_partitioned(conn, "pt_submissions", batch_size=120, progress=progress, today=TODAY)
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions")) == 500
+    assert conn.scalar(text("SELECT attempt_id FROM pt_submissions WHERE id = -5")) == "pt-late"
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions WHERE id = 3")) == 0
+    assert conn.scalar(text("SELECT correct_count FROM pt_submissions WHERE id = 4")) == 7
+
+
+def test_failed_conversion_removes_the_change_log(conn):
+    def progress(rows_copied):
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        partitioning.convert_to_partitioned(conn, "pt_submissions", batch_size=120, progress=progress, today=TODAY)
+    assert conn.scalar(text("SELECT to_regclass('pt_submissions_changes')")) is None
+    assert not partitioning.is_partitioned(conn, "pt_submissions")
+    conn.execute(text("DROP TABLE pt_submissions_partitioned CASCADE"))
+    conn.commit()
+
+
+def test_rows_past_the_last_partition_go_to_default_until_split(conn):
+    partitioning.convert_to_partitioned(conn, "pt_submissions", months_ahead=0, today=date(2026, 10, 1))
+    # the maintenance job did not run for months: the insert still succeeds
+    conn.execute(text("INSERT INTO pt_submissions (attempt_id, user_id, created_at) "
+                      "VALUES ('pt-future', 1, '2027-01-15')"))
+    conn.commit()
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions_default")) == 1
+
+    created = partitioning.ensure_partitions(conn, "pt_submissions", months_ahead=1, today=TODAY)
+    assert created == ["pt_submissions_y2026m11", "pt_submissions_y2027m01"]
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions_default")) == 0
+    assert conn.scalar(text("SELECT attempt_id FROM pt_submissions_y2027m01")) == "pt-future"
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions")) == 501
+
+
+def test_rotate_partitions(conn):
+    partitioning.convert_to_partitioned(conn, "pt_submissions", months_ahead=0, today=date(2026, 10, 1))
+    created = partitioning.ensure_partitions(conn, "pt_submissions", months_ahead=2, today=TODAY)
+    assert created == ["pt_submissions_y2026m11", "pt_submissions_y2026m12"]
+
+    detached = partitioning.detach_old_partitions(conn, "pt_submissions", keep_months=6, today=TODAY)
+    assert detached == ["pt_submissions_y2026m01", "pt_submissions_y2026m02", "pt_submissions_y2026m03"]
+    assert conn.scalar(text("SELECT min(created_at) FROM pt_submissions")).date() >= partitioning.add_months(TODAY, -6)
+    # detached partitions stay around as plain tables for archiving
+    assert conn.scalar(text("SELECT count(*) FROM pt_submissions_y2026m01")) > 0
+    for name in detached:
+        conn.execute(text(f"DROP TABLE {name}"))
+    conn.commit()
+
+
+def test_attempt_keys_are_claimed_once_and_purged(client, db_session):
+    assert claim_attempt(db_session, 1, "key-window-1")
+    assert not claim_attempt(db_session, 1, "key-window-1")
+    db_session.get(SubmissionAttemptKey, "key-window-1").created_at = date(2020, 1, 1)
+    db_session.flush()
+    assert purge_attempt_keys(db_session, window_days=30) >= 1
+    assert claim_attempt(db_session, 1, "key-window-1")
+    db_session.rollback()
@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from src.models import ReviewState
+from src.services import practice
+from src.services.practice import MAX_INTERVAL_DAYS, UserQueue, reset_queues, schedule_review
+
+
+def test_schedule_review_intervals():
+    now = datetime(2024, 8, 1)
+    state = ReviewState(user_id=1, problem_id=1, ease=2.5, interval_days=0.0, repetitions=0, lapses=0)
+    intervals = []
+    for _ in range(3):
+        schedule_review(state, True, now)
+        intervals.append(state.interval_days)
+    assert intervals == [1.0, 6.0, 15.0]
+    schedule_review(state, False, now)
+    assert (state.repetitions, state.lapses, state.ease) == (0, 1, 2.3)
+    assert state.due_at < now + timedelta(hours=1)
+
+
+def test_schedule_review_interval_is_capped():
+    now = datetime(2024, 8, 1)
+    state = ReviewState(user_id=1, problem_id=1, ease=2.5, interval_days=0.0, repetitions=0, lapses=0)
+    for _ in range(40):
+        schedule_review(state, True, now)
+    assert state.interval_days == MAX_INTERVAL_DAYS
+
+
+def test_user_queue_skips_superseded_entries():
+    now = datetime(2024, 8, 1)
+    queue = UserQueue([(1, now - timedelta(days=2)), (2, now - timedelta(days=1)), (3, now + timedelta(days=1))])
+    assert queue.due_before(now, 10) == [1, 2]
+    queue.push(1, now + timedelta(days=3))
+    assert queue.due_before(now, 10) == [2]
+    assert queue.due_before(now + timedelta(days=5), 2) == [2, 3]
+
+
+def test_practice_next_returns_missed_problem(client, monkeypatch):
+    reset_queues()
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()),
+        "answers": [{"problem_id": 1, "option_id": 1}, {"problem_id": 2, "value": "12"}],  # wrong, right
+    })
+    assert resp.status_code == HTTPStatus.OK
+
+    later = datetime.utcnow() + timedelta(hours=1)
+    monkeypatch.setattr("src.services.practice._utcnow", lambda: later)
+    items = client.get("/api/practice/next?n=50").get_json()["items"]
+    ids = [item["id"] for item in items]
+    assert ids[0] == 1 and items[0]["new"] is False
+    assert "options" in items[0] and all("is_correct" not in o for o in items[0]["options"])
+    assert 2 not in ids  # answered correctly, next review in a day
+
+    assert client.get("/api/practice/next?n=0").status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_idle_and_excess_queues_are_evicted(db_session, monkeypatch):
+    reset_queues()
+    monkeypatch.setattr(practice, "PRACTICE_QUEUE_MAX_USERS", 2)
+    for user_id in (101, 102):
+        practice._get_queue(db_session, user_id)
+    practice._get_queue(db_session, 101)  # now the most recently used
+    practice._get_queue(db_session, 103)
+    assert list(practice._queues) == [101, 103]
+
+    # idle for longer than the TTL: dropped when the next heap is loaded
+    practice._queues[101].used_at -= practice.QUEUE_TTL_SECONDS
+    practice._get_queue(db_session, 104)
+    assert list(practice._queues) == [103, 104]
+    reset_queues()
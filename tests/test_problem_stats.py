@@ -0,0 +1,87 @@
+import threading
+import uuid
+from http import HTTPStatus
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from src.db import engine
+from src.models import ProblemStats
+from src.services.outbox import drain, enqueue, process_batch
+from src.services.stats import SUBMISSION_GRADED, reconcile_stats
+
+
+def _submit(client, answers):
+    resp = client.post("/api/lessons/1/submit", json={"attempt_id": str(uuid.uuid4()), "answers": answers})
+    assert resp.status_code == HTTPStatus.OK
+
+
+def _problem(data, problem_id):
+    return next(p for p in data["problems"] if p["problem_id"] == problem_id)
+
+
+def test_problem_stats_counters_and_reconcile(client, db_session):
+    drain(db_session)
+    before = client.get("/api/stats/problems?lesson_id=1").get_json()
+    base = {p["problem_id"]: p for p in before["problems"]}
+    _submit(client, [{"problem_id": 1, "option_id": 1}, {"problem_id": 2, "value": "12"}])  # wrong, right
+    _submit(client, [{"problem_id": 1, "option_id": 2}])  # right
+    # counters are applied by the outbox worker
+    assert drain(db_session).processed >= 2
+
+    data = client.get("/api/stats/problems?lesson_id=1").get_json()
+    mcq = _problem(data, 1)
+    assert mcq["attempts"] - base.get(1, {}).get("attempts", 0) == 2
+    assert mcq["correct"] - base.get(1, {}).get("correct", 0) == 1
+    assert data["lesson"]["attempts"] == sum(p["attempts"] for p in data["problems"])
+
+    # counters drift, reconciliation restores them from user_problem_progress
+    db_session.execute(update(ProblemStats).where(ProblemStats.problem_id == 1).values(attempts=0))
+    assert reconcile_stats(db_session) >= 1
+    db_session.commit()
+    assert client.get("/api/stats/problems?lesson_id=1").get_json() == data
+
+
+def test_reconcile_waits_for_a_batch_in_flight(db_session):
+    drain(db_session)
+    enqueue(db_session, SUBMISSION_GRADED, {"attempt_id": "reconcile-held", "user_id": 1, "lesson_id": 1,
+                                            "problems": []})
+    db_session.commit()
+    claimed, release = threading.Event(), threading.Event()
+    errors, finished = [], []
+
+    def held(db, payload):
+        claimed.set()
+        release.wait(5)
+
+    def worker():
+        other = create_engine(engine.url, poolclass=NullPool)
+        try:
+            with Session(other) as session:
+                finished.append(("worker", process_batch(session, "test", handlers={SUBMISSION_GRADED: held})))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            other.dispose()
+
+    def reconcile():
+        try:
+            reconcile_stats(db_session)
+            db_session.commit()
+            finished.append(("reconcile", None))
+        except Exception as e:
+            db_session.rollback()
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker), threading.Thread(target=reconcile)]
+    threads[0].start()
+    assert claimed.wait(5)
+    threads[1].start()
+    threads[1].join(0.3)
+    # the claimed batch holds row locks: reconcile waits for its commit
+    assert threads[1].is_alive()
+    release.set()
+    for t in threads:
+        t.join(10)
+    assert errors == []
+    assert [name for name, _ in finished] == ["worker", "reconcile"]
+    assert finished[0][1].processed == 1
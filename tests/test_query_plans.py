@@ -0,0 +1,44 @@
+import os
+import pytest
+from src.db import engine
+from src.query_plans import (
+    capture_hot_endpoints, check_statements, find_cost_growth, find_scan_issues, load_baseline,
+    seed_plan_check_data,
+)
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "query_plan_baseline.json")
+
+
+def _plan(*children):
+    return {"Node Type": "Limit", "Total Cost": 10.0, "Plans": list(children)}
+
+
+def test_seq_scan_on_large_table_is_flagged():
+    plan = _plan(
+        {"Node Type": "Seq Scan", "Relation Name": "submissions", "Filter": "(user_id = 1)"},
+        {"Node Type": "Seq Scan", "Relation Name": "lessons"},
+        {"Node Type": "Index Scan", "Relation Name": "user_problem_progress"},
+    )
+    rows = {"submissions": 50000, "lessons": 30, "user_problem_progress": 90000}
+    issues = find_scan_issues(plan, rows, "label", "SELECT 1", large_table_rows=10000)
+    assert [i.key for i in issues] == ["missing_index:submissions"]
+
+
+def test_cost_growth_against_baseline():
+    baseline = {"abc": {"total_cost": 1000.0}, "tiny": {"total_cost": 8.0}}
+    assert find_cost_growth("abc", 1400.0, baseline, "label", "SELECT 1", tolerance=0.5) == []
+    assert [i.kind for i in find_cost_growth("abc", 1600.0, baseline, "label", "SELECT 1", tolerance=0.5)] == [
+        "cost_growth"]
+    assert find_cost_growth("tiny", 20.0, baseline, "label", "SELECT 1", tolerance=0.5) == []
+    assert find_cost_growth("new", 1e9, baseline, "label", "SELECT 1") == []
+
+
+@pytest.mark.skipif(not os.getenv("QUERY_PLAN_CHECK"), reason="set QUERY_PLAN_CHECK=1 to run against Postgres")
+def test_hot_endpoint_plans_have_no_regressions(client):
+    with engine.begin() as conn:
+        seed_plan_check_data(conn)
+    captured = capture_hot_endpoints(client, engine)
+    with engine.connect() as conn:
+        report = check_statements(conn, captured, load_baseline(BASELINE))
+    assert captured
+    assert not report.issues, "\n".join(str(i) for i in report.issues)
@@ -0,0 +1,53 @@
+import os
+import uuid
+from http import HTTPStatus
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from src import db as database
+from src.db_metrics import engine_metrics, instrument
+
+
+@pytest.fixture()
+def replica(monkeypatch):
+    # a second database can be used with READ_DATABASE_URL_TEST; by default the
+    # "replica" is a separate engine on the test database
+    url = os.getenv("READ_DATABASE_URL_TEST", database.DATABASE_URL)
+    read_engine = create_engine(url, pool_size=1, max_overflow=0)
+    metrics = instrument(read_engine, "replica")
+    monkeypatch.setattr(database, "ReadSessionLocal", scoped_session(sessionmaker(bind=read_engine, autoflush=False)))
+    monkeypatch.setattr(database, "_primary_pins", {})
+    engine_metrics["primary"].reset()
+    yield metrics
+    database.ReadSessionLocal.remove()
+    del engine_metrics["replica"]
+    read_engine.dispose()
+
+
+def test_reads_use_replica_until_user_writes(client, replica, monkeypatch):
+    primary = engine_metrics["primary"]
+    assert client.get("/api/profile").status_code == HTTPStatus.OK
+    assert replica.statements > 0 and primary.statements == 0
+
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()),
+        "answers": [{"problem_id": 2, "value": "12"}],
+    })
+    assert resp.status_code == HTTPStatus.OK
+    replica.reset()
+    primary.reset()
+    assert client.get("/api/profile").status_code == HTTPStatus.OK
+    assert primary.statements > 0 and replica.statements == 0
+
+    monkeypatch.setattr(database, "_primary_pins", {})
+    client.get("/api/profile")
+    assert replica.statements > 0
+
+
+def test_debug_db_endpoint_is_gated(client, replica, monkeypatch):
+    assert client.get("/api/debug/db").status_code == HTTPStatus.NOT_FOUND
+    monkeypatch.setattr("src.routes.DEBUG_ENDPOINTS", True)
+    client.get("/api/profile")
+    data = client.get("/api/debug/db").get_json()
+    assert set(data) == {"primary", "replica"}
+    assert data["replica"]["checkouts"] >= 1
@@ -0,0 +1,50 @@
+import uuid
+from http import HTTPStatus
+import pytest
+from src.db import SessionLocal
+from src.db_metrics import engine_metrics
+
+
+@pytest.fixture()
+def plain_client(client):
+    # the `client` fixture keeps the last request context open (with-block);
+    # a plain test client tears each request down like a server does
+    return client.application.test_client()
+
+
+@pytest.fixture()
+def primary(client, db_session):
+    # release the fixture's session so the request creates and removes its own
+    db_session.close()
+    SessionLocal.remove()
+    metrics = engine_metrics["primary"]
+    metrics.reset()
+    return metrics
+
+
+@pytest.mark.parametrize("path", ["/api/profile", "/api/lessons/1", "/api/lessons?format=ndjson",
+                                  "/api/submissions", "/api/practice/next"])
+def test_one_checkout_per_read_request(plain_client, primary, path):
+    resp = plain_client.get(path)
+    assert resp.status_code == HTTPStatus.OK
+    resp.get_data()
+    resp.close()  # as the WSGI server does once the (streamed) body is sent
+    assert primary.checkouts == 1
+    assert not SessionLocal.registry.has()
+
+
+def test_submit_commits_on_one_connection(plain_client, primary):
+    resp = plain_client.post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()),
+        "answers": [{"problem_id": 1, "option_id": 2}, {"problem_id": 2, "value": "12"}],
+    })
+    assert resp.status_code == HTTPStatus.OK
+    assert primary.checkouts == 1
+    assert not SessionLocal.registry.has()
+
+    # errors are mapped by the shared decorator and roll back
+    resp = plain_client.post("/api/lessons/1/submit", json={"attempt_id": str(uuid.uuid4()),
+                                                      "answers": [{"problem_id": 999, "value": "1"}]})
+    assert resp.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert resp.get_json()["error"] == "InvalidProblem"
+    assert not SessionLocal.registry.has()
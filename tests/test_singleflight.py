@@ -0,0 +1,91 @@
+import threading
+import time
+import pytest
+from src.services import lessons
+from src.singleflight import SingleFlight, SingleFlightTimeout
+
+
+def _run_concurrently(n, target):
+    results, errors = [], []
+    start = threading.Barrier(n)
+
+    def worker():
+        start.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 42}
+
+    results, errors = _run_concurrently(8, lambda: flight.do("k", load, timeout=5))
+    assert not errors
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 8
+    assert not flight.in_flight("k")
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+
+    def load():
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    results, errors = _run_concurrently(4, lambda: flight.do("k", load, timeout=5))
+    assert not results
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_waiter_times_out_while_leader_finishes():
+    flight = SingleFlight()
+    started = threading.Event()
+    leader = []
+
+    def load():
+        started.set()
+        time.sleep(0.3)
+        return "done"
+
+    t = threading.Thread(target=lambda: leader.append(flight.do("k", load)))
+    t.start()
+    started.wait()
+    with pytest.raises(SingleFlightTimeout):
+        flight.do("k", load, timeout=0.05)
+    t.join()
+    assert leader == ["done"]
+
+
+def test_catalog_miss_loads_once(monkeypatch):
+    calls = []
+
+    def load(db, lesson_id):
+        calls.append(lesson_id)
+        time.sleep(0.2)
+        return {"id": lesson_id, "title": "T", "description": None, "problems": []}
+
+    lessons.clear_catalog_cache()
+    monkeypatch.setattr(lessons, "_load_lesson_catalog", load)
+    monkeypatch.setattr(lessons, "_lesson_revision", lambda db, lesson_id: 1)
+    results, errors = _run_concurrently(6, lambda: lessons.get_lesson_catalog(None, 999))
+    assert not errors and len(results) == 6
+    assert calls == [999]
+    lessons.get_lesson_catalog(None, 999)  # served from cache
+    assert calls == [999]
+    lessons.clear_catalog_cache()
@@ -0,0 +1,91 @@
+import time
+import pytest
+from sqlalchemy import text
+from src import slow_query
+from src.slow_query import can_analyze, parameter_shape
+
+
+@pytest.fixture()
+def slow_log(monkeypatch):
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_MS", 20.0)
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_EXPLAIN_SAMPLE", 1.0)
+    slow_query.clear_slow_queries()
+    yield
+    slow_query.clear_slow_queries()
+
+
+def _wait_for_plan(statement_part: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        entry = next(e for e in slow_query.recent_slow_queries() if statement_part in e["statement"])
+        if entry["explain"] != "pending":
+            return entry
+        time.sleep(0.02)
+    raise AssertionError(f"no plan captured for {statement_part}")
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"user_id": 1, "ids": (1, 2, 3), "name": "x"}) == \
+        {"user_id": "int", "ids": "tuple[3]", "name": "str"}
+    assert parameter_shape((1, "secret", None)) == ["int", "str", "NoneType"]
+    assert parameter_shape([(1, "a"), (2, "b")], executemany=True) == {"rows": 2, "row": ["int", "str"]}
+
+
+def test_slow_select_is_logged_and_explained(db_session, slow_log, capsys):
+    db_session.execute(text("SELECT pg_sleep(0.05), :tag AS tag"), {"tag": "secret-value"})
+    db_session.execute(text("SELECT 1"))
+    db_session.rollback()
+
+    entry = _wait_for_plan("pg_sleep")
+    assert entry["duration_ms"] >= 20 and entry["engine"] == "primary"
+    assert entry["route"] is None
+    assert entry["parameters"] == ["str"]
+    assert entry["explain"] == "captured", entry["explain"]
+    assert "actual time=" in entry["plan"] and "Execution Time" in entry["plan"]
+    assert not any("SELECT 1" == e["statement"] for e in slow_query.recent_slow_queries())
+    out = capsys.readouterr().out
+    assert "SLOW QUERY" in out and "secret-value" not in out
+
+
+def test_writes_are_logged_but_never_explained(db_session, slow_log, monkeypatch):
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_MS", 0.0)
+    db_session.execute(text("CREATE TEMP TABLE slow_query_probe (id int)"))
+    db_session.execute(text("INSERT INTO slow_query_probe SELECT g FROM generate_series(1, 10) g"))
+    db_session.rollback()
+    entry = next(e for e in slow_query.recent_slow_queries() if "INSERT INTO slow_query_probe" in e["statement"])
+    assert entry["explain"] == "skipped" and entry["plan"] is None
+
+
+def test_debug_endpoint_lists_slow_queries_with_route(client, slow_log, monkeypatch):
+    assert client.get("/api/debug/slow-queries").status_code == 404
+
+    monkeypatch.setattr("src.routes.DEBUG_ENDPOINTS", True)
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_MS", 0.0)
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_EXPLAIN_SAMPLE", 0.0)
+    assert client.get("/api/profile").status_code == 200
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_MS", 1e9)
+
+    data = client.get("/api/debug/slow-queries").get_json()
+    assert data["queries"]
+    routes = {e["route"] for e in data["queries"]}
+    assert routes == {"GET /api/profile"}
+    assert all(e["explain"] == "skipped" for e in data["queries"])
+
+
+def test_side_effecting_selects_are_not_analyzed(db_session, slow_log):
+    assert can_analyze("SELECT id FROM lessons WHERE id = %s")
+    for statement in ("SELECT id FROM outbox_events ORDER BY id LIMIT 10 FOR UPDATE SKIP LOCKED",
+                      "SELECT id FROM users FOR NO KEY UPDATE",
+                      "SELECT pg_advisory_xact_lock(480048)",
+                      "SELECT nextval('content_revision_seq')"):
+        assert not can_analyze(statement), statement
+
+    seq_before = db_session.scalar(text("SELECT last_value FROM content_revision_seq"))
+    db_session.execute(text("SELECT pg_sleep(0.03), nextval('content_revision_seq')"))
+    db_session.rollback()
+    entry = _wait_for_plan("nextval")
+    assert entry["explain"] == "captured without analyze"
+    assert "actual time=" not in entry["plan"]
+    # only the original statement advanced the sequence
+    assert db_session.scalar(text("SELECT last_value FROM content_revision_seq")) == seq_before + 1
+    db_session.rollback()
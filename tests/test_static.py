@@ -0,0 +1,59 @@
+import gzip
+from http import HTTPStatus
+import pytest
+from app import create_app
+from src.static_manifest import IMMUTABLE_CACHE_CONTROL
+
+
+@pytest.fixture()
+def static_client(tmp_path, monkeypatch):
+    (tmp_path / "index.html").write_text("<html>app</html>")
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    script = b"console.log('hi');" * 20
+    (assets / "index-BzX1a2_c.js").write_bytes(script)
+    (assets / "index-BzX1a2_c.js.gz").write_bytes(gzip.compress(script))
+    (assets / "vendor-a-b3Cd9e.js").write_bytes(b"vendor")
+    (tmp_path / "favicon.ico").write_bytes(b"icon")
+    # copied from public/ unhashed; they look like name-<hash>.ext but can change
+    (tmp_path / "og-background.png").write_bytes(b"png")
+    (tmp_path / "logo-original.svg").write_bytes(b"<svg/>")
+    monkeypatch.setenv("FRONTEND_DIST_DIR", str(tmp_path))
+    app = create_app()
+    assert len(app.extensions["static_manifest"]) == 6
+    with app.test_client() as c:
+        yield c, script
+
+
+def test_hashed_assets_are_immutable_and_precompressed(static_client):
+    client, script = static_client
+    resp = client.get("/assets/index-BzX1a2_c.js")
+    assert resp.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_data() == script
+
+    resp = client.get("/assets/index-BzX1a2_c.js", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert gzip.decompress(resp.get_data()) == script
+
+
+def test_index_revalidates_with_etag(static_client):
+    client, _ = static_client
+    resp = client.get("/")
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["Cache-Control"] == "no-cache"
+    etag = resp.headers["ETag"]
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == HTTPStatus.NOT_MODIFIED
+    # client-side routes and unknown files fall back to index.html
+    resp = client.get("/lessons/3")
+    assert resp.get_data() == b"<html>app</html>" and resp.headers["ETag"] == etag
+    assert client.get("/favicon.ico").headers["Cache-Control"] == "no-cache"
+
+
+def test_only_fingerprinted_build_assets_are_immutable(static_client):
+    client, _ = static_client
+    # Vite hashes are base64url and may contain "-"
+    assert client.get("/assets/vendor-a-b3Cd9e.js").headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert client.get("/og-background.png").headers["Cache-Control"] == "no-cache"
+    assert client.get("/logo-original.svg").headers["Cache-Control"] == "no-cache"
@@ -25,4 +25,89 @@ def test_streak_missed_day_resets(monkeypatch):
     today = date(2024, 8, 4)
     monkeypatch.setattr("src.services.streak.utc_today", lambda: today)
     new, inc, _ = calculate_new_streak(date(2024, 8, 1), 5)
-    assert new == 1 and inc is True 
\ No newline at end of file
+    assert new == 1 and inc is True 
+
+
+def test_streaks_from_days_runs_and_gaps():
+    from src.services.streak import streaks_from_days
+    d = date(2024, 8, 10).toordinal()
+    assert streaks_from_days([], d) == (0, 0)
+    # runs of 3 and 2, last run ends yesterday
+    days = [d - 9, d - 8, d - 7, d - 2, d - 1]
+    assert streaks_from_days(days, d) == (2, 3)
+    # last activity two days ago: current streak is broken
+    assert streaks_from_days(days[:-1], d) == (0, 3)
+    assert streaks_from_days([d], d) == (1, 1)
+
+
+def test_recompute_streaks_from_submissions(db_session):
+    from datetime import datetime
+    from src.models import Lesson, Submission, User
+    from src.services.streak import recompute_streaks
+
+    lesson = Lesson(title="Streak Lesson", description="Test", order_index=99)
+    user = User(id=4242, username="streak-recompute", current_streak=9, best_streak=1)
+    db_session.add_all([lesson, user])
+    db_session.flush()
+    for i, day in enumerate([1, 2, 3, 6, 7, 7]):
+        db_session.add(Submission(attempt_id=f"streak-recompute-{i}", user_id=user.id, lesson_id=lesson.id,
+                                  created_at=datetime(2024, 8, day, 12)))
+    db_session.commit()
+
+    result = recompute_streaks(db_session, chunk_size=2, today=date(2024, 8, 8))
+    assert result.users >= 1
+    db_session.refresh(user)
+    assert (user.current_streak, user.best_streak) == (2, 3)
+    assert user.last_activity_utc_date == date(2024, 8, 7)
+
+
+def test_recompute_keeps_best_streak_from_archived_history(db_session):
+    from datetime import datetime
+    from src.models import Lesson, Submission, User
+    from src.services.streak import recompute_streaks
+
+    lesson = Lesson(title="Archived Streak Lesson", description="Test", order_index=99)
+    # older submissions were detached with their partition
+    user = User(id=4243, username="streak-archived", current_streak=0, best_streak=30,
+                last_activity_utc_date=date(2024, 8, 9))
+    db_session.add_all([lesson, user])
+    db_session.flush()
+    db_session.add(Submission(attempt_id="streak-archived-1", user_id=user.id, lesson_id=lesson.id,
+                              created_at=datetime(2024, 8, 7, 12)))
+    db_session.commit()
+
+    recompute_streaks(db_session, today=date(2024, 8, 8))
+    db_session.refresh(user)
+    assert (user.current_streak, user.best_streak) == (1, 30)
+    assert user.last_activity_utc_date == date(2024, 8, 9)
+
+
+def test_recompute_locks_users_while_reading_their_submissions(db_session, monkeypatch):
+    import pytest
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from sqlalchemy.pool import NullPool
+    from src.db import engine
+    from src.models import User
+    from src.services import streak
+
+    user = User(id=4244, username="streak-locked", current_streak=0, best_streak=0)
+    db_session.add(user)
+    db_session.commit()
+    other = create_engine(engine.url, poolclass=NullPool)
+    attempts = []
+    real_streaks_from_days = streak.streaks_from_days
+
+    def streaks_from_days(days, today):
+        if not attempts:
+            # a submit for a user of the chunk cannot commit before the rewrite
+            with other.connect() as conn:
+                with pytest.raises((OperationalError, ProgrammingError), match="55P03"):
+                    conn.execute(text("SELECT 1 FROM users WHERE id = 4244 FOR UPDATE NOWAIT"))
+            attempts.append(1)
+        return real_streaks_from_days(days, today)
+
+    monkeypatch.setattr(streak, "streaks_from_days", streaks_from_days)
+    streak.recompute_streaks(db_session, chunk_size=10_000, today=date(2024, 8, 8))
+    assert attempts
+    other.dispose()
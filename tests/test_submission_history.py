@@ -0,0 +1,37 @@
+import uuid
+from http import HTTPStatus
+
+
+def _submit(client, lesson_id=1):
+    resp = client.post(f"/api/lessons/{lesson_id}/submit", json={
+        "attempt_id": str(uuid.uuid4()),
+        "answers": [{"problem_id": 1, "option_id": 2}],
+    })
+    assert resp.status_code == HTTPStatus.OK
+
+
+def test_submission_history_keyset_pagination(client):
+    for _ in range(3):
+        _submit(client)
+    total = len(client.get("/api/submissions?limit=100").get_json()["items"])
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/submissions?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url).get_json()
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == total >= 3
+    assert len(set(seen)) == len(seen)
+
+    by_lesson = client.get("/api/submissions?lesson_id=999").get_json()
+    assert by_lesson == {"items": [], "next_cursor": None}
+
+
+def test_submission_history_rejects_bad_cursor(client):
+    assert client.get("/api/submissions?cursor=!!!").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/api/submissions?limit=0").status_code == HTTPStatus.BAD_REQUEST
@@ -1,5 +1,8 @@
 import uuid
 from http import HTTPStatus
+import pytest
+from src.schemas import InputAnswer, McqAnswer
+from src.services.submit import ValidationError, parse_submit_payload
 
 
 def make_attempt_id():
@@ -58,4 +61,38 @@ def test_submit_invalid_problem_returns_422(client):
             {"problem_id": 999, "option_id": 1},
         ],
     })
-    assert resp.status_code == HTTPStatus.UNPROCESSABLE_ENTITY 
\ No newline at end of file
+    assert resp.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_submit_validation_errors_have_locations(client):
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": make_attempt_id(),
+        "answers": [
+            {"problem_id": 1, "option_id": 2},
+            {"problem_id": 1, "option_id": "two"},
+        ],
+    })
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+    body = resp.get_json()
+    assert body["error"] == "Validation"
+    assert body["details"][0]["loc"] == ["answers", 1, "mcq", "option_id"]
+
+    resp = client.post("/api/lessons/1/submit", data="not json", content_type="application/json")
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+    # an answer of the wrong kind for its problem
+    resp = client.post("/api/lessons/1/submit", json={
+        "attempt_id": make_attempt_id(), "answers": [{"problem_id": 2, "option_id": 1}]})
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_parse_submit_payload():
+    payload = parse_submit_payload(b'{"attempt_id": "a", "answers": [{"problem_id": 1, "option_id": 2}, '
+                                   b'{"problem_id": 2, "value": 12}]}')
+    assert payload.answers == [McqAnswer(problem_id=1, option_id=2), InputAnswer(problem_id=2, value="12")]
+    for bad in ({"attempt_id": "", "answers": [{"problem_id": 1, "value": "1"}]},
+                {"attempt_id": "a", "answers": []},
+                {"attempt_id": "a", "answers": [7]},
+                {"attempt_id": "a", "answers": [{"problem_id": "1", "value": "1"}]},
+                {"attempt_id": "a", "answers": [{"problem_id": 1}]}):
+        with pytest.raises(ValidationError):
+            parse_submit_payload(bad)
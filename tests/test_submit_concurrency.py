@@ -0,0 +1,116 @@
+import threading
+import uuid
+from http import HTTPStatus
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from app import create_app
+from src import db as database
+from src import routes
+from src.admission import submit_admission
+from src.models import Lesson, Problem, ProblemOption, Submission, User, UserProblemProgress
+from src.services import submit
+from src.services.submit import ConcurrentSubmissionError, process_submission
+
+WORKERS = 6
+SUBMITS_PER_WORKER = 5
+
+
+def correct_answers(db: Session, lesson_id: int):
+    answers = []
+    for problem in db.scalars(select(Problem).where(Problem.lesson_id == lesson_id).order_by(Problem.id)):
+        if problem.type == "mcq":
+            option_id = db.scalar(select(ProblemOption.id).where(ProblemOption.problem_id == problem.id,
+                                                                 ProblemOption.is_correct))
+            answers.append({"problem_id": problem.id, "option_id": option_id})
+        else:
+            answers.append({"problem_id": problem.id, "value": problem.correct_answer_text})
+    return answers
+
+
+@pytest.fixture()
+def wide_engine(client, db_session, monkeypatch):
+    # one connection per worker, as separate server processes would have
+    db_session.close()
+    database.SessionLocal.remove()
+    engine = create_engine(database.DATABASE_URL, pool_size=WORKERS, max_overflow=0)
+    monkeypatch.setattr(database, "SessionLocal", scoped_session(sessionmaker(bind=engine, autoflush=False)))
+    max_concurrent = submit_admission.max_concurrent
+    submit_admission.max_concurrent = WORKERS
+    submit_admission.reset()
+    yield engine
+    submit_admission.max_concurrent = max_concurrent
+    submit_admission.reset()
+    engine.dispose()
+
+
+def test_stale_user_raises_concurrent_submission_error(wide_engine):
+    make_session = sessionmaker(bind=wide_engine, autoflush=False)
+    with make_session() as first, make_session() as second:
+        lesson_id = first.scalar(select(func.max(Lesson.id)))
+        answers = correct_answers(first, lesson_id)
+        stale = first.get(User, 1)  # noqa: F841  (read before the other submit commits)
+        process_submission(second, 1, lesson_id, {"attempt_id": str(uuid.uuid4()), "answers": answers})
+        second.commit()
+        with pytest.raises(ConcurrentSubmissionError):
+            process_submission(first, 1, lesson_id, {"attempt_id": str(uuid.uuid4()), "answers": answers})
+
+
+def test_conflicting_view_is_retried(client, monkeypatch):
+    calls = []
+
+    def flaky(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ConcurrentSubmissionError("lost the race")
+        return process_submission(*args)
+
+    monkeypatch.setattr(submit, "process_submission", flaky)
+    monkeypatch.setattr(routes, "SUBMIT_CONFLICT_RETRIES", 1)
+    resp = create_app().test_client().post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()), "answers": [{"problem_id": 2, "value": "12"}]})
+    assert resp.status_code == HTTPStatus.OK and len(calls) == 2
+
+    calls.clear()
+    monkeypatch.setattr(routes, "SUBMIT_CONFLICT_RETRIES", 0)
+    resp = create_app().test_client().post("/api/lessons/1/submit", json={
+        "attempt_id": str(uuid.uuid4()), "answers": [{"problem_id": 2, "value": "12"}]})
+    assert resp.status_code == HTTPStatus.CONFLICT
+    assert resp.get_json()["error"] == "ConcurrentUpdate"
+
+
+def test_concurrent_submits_keep_totals_consistent(wide_engine, monkeypatch):
+    monkeypatch.setattr(routes, "SUBMIT_CONFLICT_RETRIES", 100)
+    app = create_app()
+    with Session(wide_engine) as db:
+        lesson_id = db.scalar(select(func.max(Lesson.id)))
+        answers = correct_answers(db, lesson_id)
+        before = db.get(User, 1)
+        xp_before, version_before = before.total_xp, before.version
+
+    statuses = []
+
+    def worker():
+        client = app.test_client()
+        for _ in range(SUBMITS_PER_WORKER):
+            resp = client.post(f"/api/lessons/{lesson_id}/submit",
+                               json={"attempt_id": str(uuid.uuid4()), "answers": answers})
+            statuses.append(resp.status_code)
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = WORKERS * SUBMITS_PER_WORKER
+    assert statuses == [HTTPStatus.OK] * total
+    with Session(wide_engine) as db:
+        user = db.get(User, 1)
+        assert user.total_xp == xp_before + total * len(answers) * 10
+        assert user.version == version_before + total
+        # no lost updates on the per-problem counters either
+        attempts = db.scalars(select(UserProblemProgress.attempts).join(Problem).where(
+            UserProblemProgress.user_id == 1, Problem.lesson_id == lesson_id)).all()
+        assert attempts == [total] * len(answers)
+        assert db.scalar(select(func.count()).select_from(Submission).where(Submission.lesson_id == lesson_id)) == total